@@ -230,9 +230,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # REST_FRAMEWORK
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
@@ -290,6 +288,48 @@ SIMPLE_JWT = {
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME", "")
 TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Секрет для заголовка X-Telegram-Bot-Api-Secret-Token (регистрирует setup_bot)
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+# Очереди обновлений вебхука: <TELEGRAM_UPDATE_QUEUE>.<chat_id % SHARDS>,
+# на каждую очередь — воркер с --concurrency=1 (порядок внутри чата)
+TELEGRAM_UPDATE_QUEUE = os.getenv("TELEGRAM_UPDATE_QUEUE", "telegram-updates")
+TELEGRAM_UPDATE_SHARDS = int(os.getenv("TELEGRAM_UPDATE_SHARDS", 4))
+
+# Время жизни кэша chat_id → пользователь для команд бота (секунды);
+# сбрасывается при подключении, отключении и изменении настроек
+TELEGRAM_IDENTITY_CACHE_TIMEOUT = int(os.getenv("TELEGRAM_IDENTITY_CACHE_TIMEOUT", 300))
+
+# Доставка сообщений: параллелизм, лимиты Telegram и повторы
+TELEGRAM_DELIVERY = {
+    "MAX_WORKERS": int(os.getenv("TELEGRAM_DELIVERY_WORKERS", 8)),
+    "GLOBAL_RATE": int(os.getenv("TELEGRAM_GLOBAL_RATE", 30)),  # сообщений/сек
+    "PER_CHAT_RATE": 1,  # сообщений/сек в один чат
+    "MAX_RETRIES": 3,
+    "TIMEOUT": 10,
+    "MAX_CHAT_BUCKETS": 10000,  # per-chat лимитеров в памяти процесса (LRU)
+}
+
+# Cache (Redis; встроенный бэкенд Django поверх redis-py)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://localhost:6379/1"),
+        "KEY_PREFIX": "habitflow",
+    }
+}
+
+# Время жизни кэша публичной ленты (секунды); сбрасывается и по событиям
+PUBLIC_FEED_CACHE_TIMEOUT = int(os.getenv("PUBLIC_FEED_CACHE_TIMEOUT", 300))
+
+# Время жизни кэша статистики пользователя (секунды); сбрасывается
+# при новых выполнениях
+USER_STATS_CACHE_TIMEOUT = int(os.getenv("USER_STATS_CACHE_TIMEOUT", 60))
+
+# Время жизни кэша пользователя для JWT-аутентификации (секунды);
+# сбрасывается при изменении пользователя
+USER_AUTH_CACHE_TIMEOUT = int(os.getenv("USER_AUTH_CACHE_TIMEOUT", 60))
 
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -301,6 +341,9 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 минут
 
+# Задание выгрузки в очереди или в работе дольше этого считается брошенным
+EXPORT_JOB_TIMEOUT = CELERY_TASK_TIME_LIMIT + 5 * 60
+
 # CORS
 CORS_ALLOWED_ORIGINS = (
     os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
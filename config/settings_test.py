@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     "drf_spectacular",
     # Local apps
     "habits",
+    "users",
     "telegram_bot",
 ]
 
@@ -73,6 +74,7 @@ HABIT_VALIDATION = {
     "MAX_DURATION_SECONDS": 3600,
     "MIN_COMPLETION_TIME_SECONDS": 0,
     "MAX_COMPLETION_TIME_SECONDS": 3600,
+    "MIN_FREQUENCY_DAYS": 1,
     "MAX_BREAK_DAYS": 7,
     "PLEASANT_HABIT_RULES": {
         "no_reward": "Приятные привычки не могут иметь вознаграждения",
@@ -143,6 +145,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "users.authentication.CachedJWTAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+    ],
 }
 
 # Test-specific settings
@@ -152,9 +158,10 @@ PASSWORD_HASHERS = [
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
 TELEGRAM_BOT_TOKEN = "test_token"
+TELEGRAM_API_URL = "http://127.0.0.1:9"  # тесты не должны ходить в Telegram
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш не откатывается вместе с транзакцией теста — чистим вручную"""
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_FEED_PREFIX = "habits:public-feed"
+GENERATION_KEY = f"{PUBLIC_FEED_PREFIX}:generation"
+HITS_KEY = f"{PUBLIC_FEED_PREFIX}:hits"
+MISSES_KEY = f"{PUBLIC_FEED_PREFIX}:misses"
+DEFAULT_PUBLIC_FEED_TIMEOUT = 300
+
+USER_STATS_PREFIX = "habits:user-stats"
+DEFAULT_USER_STATS_TIMEOUT = 60
+
+
+def schedule_invalidation(invalidate, *args):
+    """Сброс кэша при изменении данных: сразу и повторно после коммита.
+
+    Второй сброс убирает записи, которые параллельный запрос успел
+    закэшировать по еще не закоммиченным данным.
+    """
+    invalidate(*args)
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+def _incr(key):
+    """Атомарный счетчик в кэше (создается при первом обращении)"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def public_feed_key(request):
+    """Ключ страницы ленты: поколение + хост + параметры запроса.
+
+    Смена поколения делает недействительными все страницы сразу,
+    без перебора ключей.
+    """
+    params = "&".join(
+        f"{name}={value}"
+        for name, values in sorted(request.query_params.lists())
+        for value in values
+    )
+    digest = hashlib.md5(f"{request.get_host()}?{params}".encode()).hexdigest()
+    return f"{PUBLIC_FEED_PREFIX}:{_generation()}:{digest}"
+
+
+def get_public_feed(key):
+    """Закэшированный ответ ленты или None"""
+    data = cache.get(key)
+    _incr(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_public_feed(key, data):
+    timeout = getattr(
+        settings, "PUBLIC_FEED_CACHE_TIMEOUT", DEFAULT_PUBLIC_FEED_TIMEOUT
+    )
+    cache.set(key, data, timeout=timeout)
+
+
+def invalidate_public_feed():
+    """Сбросить все страницы публичной ленты"""
+    _incr(GENERATION_KEY)
+    logger.debug("Public habits feed cache invalidated")
+
+
+def schedule_public_feed_invalidation():
+    schedule_invalidation(invalidate_public_feed)
+
+
+def public_feed_stats():
+    """Счетчики попаданий и промахов кэша ленты"""
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+def user_stats_key(user_id):
+    """Ключ статистики пользователя; дата в ключе сбрасывает ее в полночь"""
+    return f"{USER_STATS_PREFIX}:{user_id}:{timezone.localdate()}"
+
+
+def get_user_stats(user_id):
+    """Закэшированная статистика пользователя или None"""
+    return cache.get(user_stats_key(user_id))
+
+
+def set_user_stats(user_id, data):
+    timeout = getattr(settings, "USER_STATS_CACHE_TIMEOUT", DEFAULT_USER_STATS_TIMEOUT)
+    cache.set(user_stats_key(user_id), data, timeout=timeout)
+
+
+def invalidate_user_stats(user_id):
+    cache.delete(user_stats_key(user_id))
+
+
+def schedule_user_stats_invalidation(user_id):
+    schedule_invalidation(invalidate_user_stats, user_id)
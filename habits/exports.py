@@ -0,0 +1,322 @@
+"""Потоковый экспорт привычек и выполнений.
+
+Генераторы отдают данные кусками: строки читаются из базы через
+``iterator(chunk_size=...)`` и сразу сериализуются, поэтому память не
+зависит от объема истории.
+"""
+
+import csv
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Prefetch, Q, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from .models import DailyHabitStats, ExportJob, Habit, HabitCompletion
+from .services import with_completion_totals
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Как часто фоновая выгрузка сохраняет прогресс (в строках)
+EXPORT_PROGRESS_STEP = 5000
+
+# Сколько кусков генератора занимают заголовок и окончание файла (не строки данных)
+EXPORT_FRAME_PIECES = {"csv": (1, 0), "json": (1, 1)}
+
+# Задание в очереди или в работе дольше этого считается брошенным
+# (воркер убит по CELERY_TASK_TIME_LIMIT, OOM, потеряно сообщение)
+DEFAULT_EXPORT_JOB_TIMEOUT = 35 * 60
+
+# Сколько последних выполнений вкладывать в JSON-экспорт привычек
+HABIT_EXPORT_COMPLETIONS = 30
+
+HABIT_CSV_HEADER = [
+    "ID",
+    "Действие",
+    "Место",
+    "Время",
+    "Периодичность",
+    "Длительность (сек)",
+    "Приятная привычка",
+    "Вознаграждение",
+    "Связанная привычка",
+    "Публичная",
+    "Создано",
+    "Выполнений",
+]
+
+COMPLETION_CSV_HEADER = [
+    "ID",
+    "ID привычки",
+    "Действие",
+    "Выполнено в",
+    "Выполнено",
+    "Заметка",
+]
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """``?format=`` выбирает формат выгрузки, а не рендерер DRF.
+
+    Иначе ``format=csv`` без CSV-рендерера заканчивается 404; ошибки
+    выгрузки отдаются первым рендерером (JSON).
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _habits(user):
+    return (
+        with_completion_totals(Habit.objects.filter(user=user))
+        .select_related("related_habit")
+        .order_by("id")
+    )
+
+
+def _completion_rows(user):
+    return (
+        HabitCompletion.objects.filter(habit__user=user)
+        .order_by("completed_at", "id")
+        .values_list(
+            "id", "habit_id", "habit__action", "completed_at", "is_completed", "note"
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _json_header(user, key):
+    header = json.dumps(
+        {
+            "export_date": timezone.now().isoformat(),
+            "user": {"username": user.username, "email": user.email},
+        },
+        ensure_ascii=False,
+    )
+    # Открываем массив внутри объекта заголовка: {"...": ..., "key": [
+    return f'{header[:-1]}, "{key}": ['
+
+
+def _json_array(header, items):
+    """Объект с массивом, собираемый по одному элементу"""
+    yield header
+    for index, item in enumerate(items):
+        prefix = "," if index else ""
+        yield prefix + json.dumps(item, ensure_ascii=False)
+    yield "]}"
+
+
+def iter_habits_csv(user):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HABIT_CSV_HEADER)
+    for habit in _habits(user).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow(
+            [
+                habit.id,
+                habit.action,
+                habit.place,
+                habit.time.strftime("%H:%M") if habit.time else "",
+                habit.frequency,
+                habit.duration,
+                "Да" if habit.is_pleasant else "Нет",
+                habit.reward or "",
+                habit.related_habit.action if habit.related_habit else "",
+                "Да" if habit.is_public else "Нет",
+                habit.created_at.strftime("%Y-%m-%d %H:%M"),
+                habit.completions_total,
+            ]
+        )
+
+
+def iter_habits_json(user):
+    recent = HabitCompletion.objects.order_by("-completed_at", "-id")[
+        :HABIT_EXPORT_COMPLETIONS
+    ]
+    habits = (
+        _habits(user)
+        .prefetch_related(
+            Prefetch("completions", queryset=recent, to_attr="recent_completions")
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    def items():
+        for habit in habits:
+            yield {
+                "id": habit.id,
+                "action": habit.action,
+                "place": habit.place,
+                "time": habit.time.strftime("%H:%M") if habit.time else None,
+                "frequency": habit.frequency,
+                "duration_seconds": habit.duration,
+                "is_pleasant": habit.is_pleasant,
+                "reward": habit.reward,
+                "related_habit_id": habit.related_habit_id,
+                "is_public": habit.is_public,
+                "created_at": habit.created_at.isoformat(),
+                "updated_at": habit.updated_at.isoformat(),
+                "full_description": habit.full_description,
+                "completions_total": habit.completions_total,
+                "completions": [
+                    {
+                        "completed_at": completion.completed_at.isoformat(),
+                        "is_completed": completion.is_completed,
+                        "note": completion.note,
+                    }
+                    for completion in habit.recent_completions
+                ],
+            }
+
+    return _json_array(_json_header(user, "habits"), items())
+
+
+def iter_completions_csv(user):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COMPLETION_CSV_HEADER)
+    for pk, habit_id, action, completed_at, is_completed, note in _completion_rows(
+        user
+    ):
+        yield writer.writerow(
+            [
+                pk,
+                habit_id,
+                action,
+                completed_at.isoformat(),
+                "Да" if is_completed else "Нет",
+                note,
+            ]
+        )
+
+
+def iter_completions_json(user):
+    items = (
+        {
+            "id": pk,
+            "habit_id": habit_id,
+            "action": action,
+            "completed_at": completed_at.isoformat(),
+            "is_completed": is_completed,
+            "note": note,
+        }
+        for pk, habit_id, action, completed_at, is_completed, note in _completion_rows(
+            user
+        )
+    )
+    return _json_array(_json_header(user, "completions"), items)
+
+
+EXPORTERS = {
+    ("habits", "csv"): (iter_habits_csv, "text/csv"),
+    ("habits", "json"): (iter_habits_json, "application/json"),
+    ("completions", "csv"): (iter_completions_csv, "text/csv"),
+    ("completions", "json"): (iter_completions_json, "application/json"),
+}
+
+
+def export_filename(user, scope, format_type):
+    return f"{scope}_{user.username}_{timezone.localdate()}.{format_type}"
+
+
+def streaming_export(user, scope, format_type):
+    """StreamingHttpResponse с выгрузкой; None для неизвестного формата"""
+    exporter = EXPORTERS.get((scope, format_type))
+    if exporter is None:
+        return None
+
+    generate, content_type = exporter
+    response = StreamingHttpResponse(generate(user), content_type=content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="{export_filename(user, scope, format_type)}"'
+    )
+    return response
+
+
+def export_rows_total(user, scope):
+    """Ожидаемое число строк выгрузки (для прогресса фоновой задачи)"""
+    if scope == "completions":
+        total = DailyHabitStats.objects.filter(user=user).aggregate(total=Sum("count"))[
+            "total"
+        ]
+        return total or 0
+    return Habit.objects.filter(user=user).count()
+
+
+def write_export_file(job):
+    """Записать выгрузку задания в файловое хранилище.
+
+    Данные идут из тех же генераторов, что и потоковый ответ, через
+    временный файл (при ``compress`` — сжатый gzip); прогресс
+    сохраняется каждые EXPORT_PROGRESS_STEP строк. Число записанных
+    строк данных (без заголовка и окончания) остается в
+    ``job.rows_written``.
+    """
+    generate, _ = EXPORTERS[(job.scope, job.format)]
+    frame = sum(EXPORT_FRAME_PIECES[job.format])
+    jobs = ExportJob.objects.filter(pk=job.pk)
+
+    with tempfile.TemporaryFile() as tmp:
+        stream = gzip.GzipFile(fileobj=tmp, mode="wb") if job.compress else tmp
+        pieces = 0
+        for piece in generate(job.user):
+            stream.write(piece.encode("utf-8"))
+            pieces += 1
+            # До окончания файла прогресс занижен не больше чем на строку
+            rows = pieces - frame
+            if rows > 0 and rows % EXPORT_PROGRESS_STEP == 0:
+                jobs.update(rows_written=rows)
+        job.rows_written = max(pieces - frame, 0)
+        if job.compress:
+            stream.close()
+
+        tmp.seek(0)
+        name = export_filename(job.user, job.scope, job.format)
+        if job.compress:
+            name += ".gz"
+        job.file.save(name, File(tmp), save=False)
+
+    return name
+
+
+def fail_export_job(job_id, message):
+    """Отметить незавершенное задание как неудачное"""
+    return (
+        ExportJob.objects.filter(pk=job_id)
+        .exclude(status__in=[ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED])
+        .update(
+            status=ExportJob.STATUS_FAILED,
+            error_message=message,
+            finished_at=timezone.now(),
+        )
+    )
+
+
+def fail_stale_export_jobs(jobs):
+    """Закрыть брошенные задания, чтобы выгрузку можно было поставить снова.
+
+    В очереди задание считается брошенным по ``created_at``, в работе — по
+    ``started_at``; срок задается EXPORT_JOB_TIMEOUT (секунды).
+    """
+    now = timezone.now()
+    timeout = getattr(settings, "EXPORT_JOB_TIMEOUT", DEFAULT_EXPORT_JOB_TIMEOUT)
+    cutoff = now - timedelta(seconds=timeout)
+    return jobs.filter(
+        Q(status=ExportJob.STATUS_PENDING, created_at__lt=cutoff)
+        | Q(status=ExportJob.STATUS_RUNNING, started_at__lt=cutoff)
+    ).update(
+        status=ExportJob.STATUS_FAILED,
+        error_message="Превышено время выполнения выгрузки",
+        finished_at=now,
+    )
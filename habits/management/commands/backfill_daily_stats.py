@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from habits.services import rebuild_daily_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Пересборка дневной статистики привычек из истории выполнений"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Пересобрать только для указанного пользователя (можно несколько)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Размер пачки для вставки (по умолчанию 2000)",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options["usernames"]:
+            users = User.objects.filter(username__in=options["usernames"])
+
+        self.stdout.write("📊 Пересборка дневной статистики...")
+
+        created = rebuild_daily_stats(users=users, batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Создано строк статистики: {created}"))
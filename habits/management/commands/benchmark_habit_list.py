@@ -0,0 +1,140 @@
+import math
+import time
+from datetime import time as clock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from habits.models import Habit
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 10000
+
+
+def percentile(samples, fraction):
+    """Перцентиль по ближайшему рангу"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def allowed_host():
+    """Хост из ALLOWED_HOSTS для запросов тестового клиента"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер задержки списка привычек (свои + публичные) при росте "
+        "публичной ленты; данные создаются в транзакции и откатываются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,100000,1000000",
+            help="Размеры публичной ленты через запятую",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Запросов на каждый размер (по умолчанию 50)",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=5,
+            help="Глубина обхода ленты по курсору за запрос (по умолчанию 5)",
+        )
+        parser.add_argument(
+            "--pagination",
+            choices=["cursor", "page"],
+            default="cursor",
+            help="Режим пагинации (по умолчанию cursor)",
+        )
+        parser.add_argument(
+            "--max-ratio",
+            type=float,
+            default=0,
+            help="Ошибка, если p95 на последнем размере больше первого в N раз",
+        )
+
+    def _seed(self, owner, count):
+        habits = (
+            Habit(
+                user=owner,
+                place="Парк",
+                time=clock(8, 0),
+                action=f"Публичная {index}",
+                duration=60,
+                is_public=True,
+            )
+            for index in range(count)
+        )
+        batch = []
+        for habit in habits:
+            batch.append(habit)
+            if len(batch) == SEED_BATCH_SIZE:
+                Habit.objects.bulk_create(batch)
+                batch = []
+        Habit.objects.bulk_create(batch)
+
+    def _measure(self, client, options):
+        """Время обхода ``pages`` страниц ленты (мс) для каждого запроса"""
+        samples = []
+        url = f"/api/habits/?pagination={options['pagination']}"
+        for _ in range(options["requests"]):
+            started = time.perf_counter()
+            next_url = url
+            for _ in range(options["pages"]):
+                response = client.get(next_url)
+                if response.status_code != 200:
+                    raise CommandError(f"HTTP {response.status_code}: {next_url}")
+                next_url = response.data.get("next")
+                if not next_url:
+                    break
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options["sizes"].split(","))
+        except ValueError:
+            raise CommandError("--sizes: ожидаются целые числа через запятую")
+
+        self.stdout.write(f"{'public':>10}{'p50, мс':>12}{'p95, мс':>12}")
+        results = []
+        with transaction.atomic():
+            reader = User.objects.create_user(username="benchmark_reader")
+            owner = User.objects.create_user(username="benchmark_owner")
+            self._seed(reader, 20)
+
+            client = APIClient(SERVER_NAME=allowed_host())
+            client.force_authenticate(user=reader)
+
+            seeded = 0
+            for size in sizes:
+                self._seed(owner, size - seeded)
+                seeded = size
+
+                samples = self._measure(client, options)
+                p50, p95 = percentile(samples, 0.5), percentile(samples, 0.95)
+                results.append(p95)
+                self.stdout.write(f"{size:>10}{p50:>12.1f}{p95:>12.1f}")
+
+            # Данные бенчмарка в базе не остаются
+            transaction.set_rollback(True)
+
+        ratio = results[-1] / results[0] if results[0] else 0
+        self.stdout.write(f"p95 {sizes[-1]} / {sizes[0]}: {ratio:.2f}")
+        if options["max_ratio"] and ratio > options["max_ratio"]:
+            raise CommandError(
+                f"p95 растет с размером ленты: {ratio:.2f} > {options['max_ratio']}"
+            )
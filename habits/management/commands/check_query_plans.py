@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from habits.query_plans import CRITICAL_QUERIES, check_query_plans
+
+
+class Command(BaseCommand):
+    help = "Проверка через EXPLAIN, что критичные запросы используют индексы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--query",
+            action="append",
+            dest="names",
+            choices=sorted(CRITICAL_QUERIES),
+            help="Проверить только указанный запрос (можно несколько)",
+        )
+        parser.add_argument(
+            "--show-plans",
+            action="store_true",
+            help="Вывести планы всех запросов",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🔍 Проверка планов запросов ({connection.vendor})...")
+
+        failed = []
+        for name, (plan, scans) in check_query_plans(names=options["names"]).items():
+            if scans:
+                failed.append(name)
+                self.stdout.write(
+                    self.style.ERROR(f"❌ {name}: полный просмотр {', '.join(scans)}")
+                )
+            else:
+                self.stdout.write(f"✅ {name}")
+            if scans or options["show_plans"]:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(f"Запросы без индекса: {', '.join(failed)}")
+
+        self.stdout.write(self.style.SUCCESS("Все запросы используют индексы"))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:34
+
+from django.db import migrations, models
+
+
+def fill_reminder_minute(apps, schema_editor):
+    Habit = apps.get_model("habits", "Habit")
+
+    batch = []
+    for habit in Habit.objects.only("id", "time").iterator(chunk_size=2000):
+        habit.reminder_minute = habit.time.hour * 60 + habit.time.minute
+        batch.append(habit)
+        if len(batch) >= 2000:
+            Habit.objects.bulk_update(batch, ["reminder_minute"])
+            batch = []
+
+    if batch:
+        Habit.objects.bulk_update(batch, ["reminder_minute"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="reminder_minute",
+            field=models.PositiveSmallIntegerField(
+                db_index=True,
+                editable=False,
+                help_text="Минута суток (0–1439), вычисляется из времени выполнения",
+                null=True,
+                verbose_name="Минута напоминания",
+            ),
+        ),
+        migrations.RunPython(fill_reminder_minute, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_stats(apps, schema_editor):
+    HabitCompletion = apps.get_model("habits", "HabitCompletion")
+    DailyHabitStats = apps.get_model("habits", "DailyHabitStats")
+
+    rows = (
+        HabitCompletion.objects.annotate(date=TruncDate("completed_at"))
+        .values("habit_id", "habit__user_id", "date")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(
+            DailyHabitStats(
+                user_id=row["habit__user_id"],
+                habit_id=row["habit_id"],
+                date=row["date"],
+                count=row["total"],
+            )
+        )
+        if len(batch) >= 2000:
+            DailyHabitStats.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        DailyHabitStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_habit_reminder_minute"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyHabitStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Выполнений"),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_habit_stats",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика привычки за день",
+                "verbose_name_plural": "Статистика привычек по дням",
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "date"], name="habits_dail_user_id_70fbce_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "date"), name="unique_daily_stats_per_habit"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,149 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def _streak_runs(dates):
+    current = longest = 0
+    previous = None
+    for date in dates:
+        if previous is not None and (date - previous).days == 1:
+            current += 1
+        elif date != previous:
+            current = 1
+        longest = max(longest, current)
+        previous = date
+    return current, longest
+
+
+def fill_streaks(apps, schema_editor):
+    """Начальные значения серий по дневным агрегатам"""
+    Habit = apps.get_model("habits", "Habit")
+    DailyHabitStats = apps.get_model("habits", "DailyHabitStats")
+    HabitCompletion = apps.get_model("habits", "HabitCompletion")
+    UserStreak = apps.get_model("habits", "UserStreak")
+
+    last_completed = dict(
+        HabitCompletion.objects.values("habit_id")
+        .annotate(last=Max("completed_at"))
+        .values_list("habit_id", "last")
+        .order_by()
+    )
+
+    habit_dates = {}
+    user_dates = {}
+    rows = DailyHabitStats.objects.order_by("date").values_list(
+        "habit_id", "user_id", "date"
+    )
+    for habit_id, user_id, date in rows.iterator():
+        habit_dates.setdefault(habit_id, []).append(date)
+        user_dates.setdefault(user_id, []).append(date)
+
+    habits = []
+    for habit in Habit.objects.filter(pk__in=habit_dates).only("id").iterator():
+        habit.current_streak, habit.longest_streak = _streak_runs(habit_dates[habit.pk])
+        habit.last_completed_at = last_completed.get(habit.pk)
+        habits.append(habit)
+    Habit.objects.bulk_update(
+        habits,
+        ["current_streak", "longest_streak", "last_completed_at"],
+        batch_size=1000,
+    )
+
+    streaks = []
+    for user_id, dates in user_dates.items():
+        current, longest = _streak_runs(dates)
+        streaks.append(
+            UserStreak(
+                user_id=user_id,
+                current_streak=current,
+                longest_streak=longest,
+                last_active_date=dates[-1],
+            )
+        )
+    UserStreak.objects.bulk_create(streaks, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0003_dailyhabitstats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="current_streak",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Текущая серия (дней)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="last_completed_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Последнее выполнение",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="longest_streak",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Лучшая серия (дней)"
+            ),
+        ),
+        migrations.CreateModel(
+            name="UserStreak",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "current_streak",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Текущая серия (дней)"
+                    ),
+                ),
+                (
+                    "longest_streak",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Лучшая серия (дней)"
+                    ),
+                ),
+                (
+                    "last_active_date",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="Последний активный день"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="habit_streak",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Серия пользователя",
+                "verbose_name_plural": "Серии пользователей",
+            },
+        ),
+        migrations.RunPython(fill_streaks, migrations.RunPython.noop),
+    ]
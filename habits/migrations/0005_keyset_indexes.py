@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0004_streak_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="habit_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["is_public", "created_at", "id"],
+                name="habit_public_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habitcompletion",
+            index=models.Index(
+                fields=["completed_at", "id"], name="completion_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("habits", "Привычки"),
+                            ("completions", "История выполнений"),
+                        ],
+                        default="habits",
+                        max_length=20,
+                        verbose_name="Данные",
+                    ),
+                ),
+                (
+                    "format",
+                    models.CharField(
+                        choices=[("csv", "CSV"), ("json", "JSON")],
+                        default="csv",
+                        max_length=10,
+                        verbose_name="Формат",
+                    ),
+                ),
+                (
+                    "compress",
+                    models.BooleanField(default=False, verbose_name="Сжать (gzip)"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("done", "Готово"),
+                            ("failed", "Ошибка"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "rows_total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Всего строк"
+                    ),
+                ),
+                (
+                    "rows_written",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Записано строк"
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        upload_to="exports/%Y/%m/",
+                        verbose_name="Файл выгрузки",
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True, verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выгрузка",
+                "verbose_name_plural": "Выгрузки",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "created_at"],
+                        name="habits_expo_user_id_95f368_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+import habits.models
+
+
+def fill_progress(apps, schema_editor):
+    """Снимки прогресса по существующей истории выполнений"""
+    HabitCompletion = apps.get_model("habits", "HabitCompletion")
+    HabitProgress = apps.get_model("habits", "HabitProgress")
+
+    snapshots = {}
+    rows = (
+        HabitCompletion.objects.values("habit_id", "completed_at__hour")
+        .annotate(count=Count("id"))
+        .values_list("habit_id", "completed_at__hour", "count")
+        .order_by()
+    )
+    for habit_id, hour, count in rows.iterator():
+        snapshot = snapshots.setdefault(
+            habit_id,
+            HabitProgress(habit_id=habit_id, hour_histogram=[0] * 24),
+        )
+        snapshot.hour_histogram[hour] += count
+        snapshot.total_completions += count
+
+    HabitProgress.objects.bulk_create(snapshots.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0006_exportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_completions",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Всего выполнений"
+                    ),
+                ),
+                (
+                    "hour_histogram",
+                    models.JSONField(
+                        default=habits.models.empty_hour_histogram,
+                        verbose_name="Выполнения по часам",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "habit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_snapshot",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прогресс привычки",
+                "verbose_name_plural": "Прогресс привычек",
+            },
+        ),
+        migrations.RunPython(fill_progress, migrations.RunPython.noop),
+    ]
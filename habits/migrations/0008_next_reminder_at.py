@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:15
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Копия habits.reminders.next_reminder_at на момент миграции: дальнейшие
+# изменения расписания не должны менять результат уже написанной миграции
+def frequency_days(frequency):
+    days = settings.HABIT_VALIDATION["ALLOWED_FREQUENCIES"].get(frequency, 1)
+    try:
+        return int(days) or 1
+    except (ValueError, TypeError):
+        return 1
+
+
+def next_reminder_at(habit, notify, after):
+    if habit.time is None:
+        return None
+
+    habit_time = habit.time
+    if isinstance(habit_time, str):
+        habit_time = time.fromisoformat(habit_time)
+
+    try:
+        zone = ZoneInfo(notify.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = timezone.get_default_timezone()
+    before = timedelta(minutes=notify.remind_before_minutes)
+
+    day = timezone.localtime(after, zone).date()
+    if habit.last_completed_at is not None:
+        last = timezone.localtime(habit.last_completed_at, zone).date()
+        day = max(day, last + timedelta(days=frequency_days(habit.frequency)))
+
+    while True:
+        fire_at = datetime.combine(day, habit_time, tzinfo=zone) - before
+        if fire_at > after:
+            return fire_at.astimezone(dt_timezone.utc)
+        day += timedelta(days=1)
+
+
+def fill_next_reminder_at(apps, schema_editor):
+    Habit = apps.get_model("habits", "Habit")
+    NotificationSettings = apps.get_model("telegram_bot", "NotificationSettings")
+
+    settings_by_user = {
+        notify.telegram_user.django_user_id: notify
+        for notify in NotificationSettings.objects.filter(
+            telegram_user__is_active=True, enable_habit_reminders=True
+        ).select_related("telegram_user")
+    }
+    now = timezone.now()
+
+    batch = []
+    habits = Habit.objects.filter(user_id__in=settings_by_user).only(
+        "id", "user_id", "time", "frequency", "last_completed_at"
+    )
+    for habit in habits.iterator(chunk_size=2000):
+        habit.next_reminder_at = next_reminder_at(
+            habit, settings_by_user[habit.user_id], now
+        )
+        batch.append(habit)
+        if len(batch) >= 2000:
+            Habit.objects.bulk_update(batch, ["next_reminder_at"])
+            batch = []
+
+    if batch:
+        Habit.objects.bulk_update(batch, ["next_reminder_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0007_habitprogress"),
+        ("telegram_bot", "0003_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="habit",
+            name="reminder_minute",
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="next_reminder_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="Следующее напоминание",
+            ),
+        ),
+        migrations.RunPython(fill_next_reminder_at, migrations.RunPython.noop),
+    ]
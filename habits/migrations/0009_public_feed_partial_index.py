@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0008_next_reminder_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="habit",
+            name="habit_public_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["created_at", "id"],
+                name="habit_public_created_idx",
+            ),
+        ),
+    ]
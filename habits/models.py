@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from .validators import (
@@ -12,6 +12,9 @@ from .validators import (
     validate_too_frequent_completion,
 )
 
+# Поля привычки, от которых зависит расписание напоминаний
+REMINDER_FIELDS = {"time", "frequency"}
+
 
 class Habit(models.Model):
     """Модель привычки"""
@@ -90,6 +93,28 @@ class Habit(models.Model):
         help_text="Могут ли другие пользователи видеть эту привычку",
     )
 
+    # Индекс планировщика напоминаний: момент следующего напоминания (UTC)
+    # по часовому поясу и настройкам пользователя (см. habits.reminders).
+    # Пересчитывается в save(), при изменении настроек и при отправке напоминания
+    next_reminder_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Следующее напоминание",
+    )
+
+    # Денормализованные счетчики серий, обновляются при записи выполнений
+    current_streak = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Текущая серия (дней)"
+    )
+    longest_streak = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Лучшая серия (дней)"
+    )
+    last_completed_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="Последнее выполнение"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -97,6 +122,19 @@ class Habit(models.Model):
         verbose_name = "Привычка"
         verbose_name_plural = "Привычки"
         ordering = ["time"]
+        indexes = [
+            # Keyset-пагинация по (created_at, id): своя лента и публичная
+            models.Index(
+                fields=["user", "created_at", "id"], name="habit_user_created_idx"
+            ),
+            # Частичный индекс: фильтр по булеву полю (WHERE is_public)
+            # не использует составной индекс с is_public на SQLite
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_public=True),
+                name="habit_public_created_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 name="duration_max_120_seconds",
@@ -131,6 +169,20 @@ class Habit(models.Model):
 
         super().clean()
 
+    def save(self, *args, **kwargs):
+        """Синхронизируем следующее напоминание со временем и периодичностью"""
+        from .reminders import next_reminder_at, reminder_settings
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or REMINDER_FIELDS & set(update_fields):
+            self.next_reminder_at = next_reminder_at(
+                self, reminder_settings(self.user_id), timezone.now()
+            )
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "next_reminder_at"}
+
+        super().save(*args, **kwargs)
+
     @property
     def frequency_days(self):
         """Возвращает периодичность в днях из настроек"""
@@ -166,19 +218,15 @@ class Habit(models.Model):
             )
 
     def days_since_last_completion(self):
-        """Возвращает количество дней с последнего выполнения привычки."""
-        last_completion = (
-            self.completions.filter(is_completed=True).order_by("-completed_at").first()
-        )
+        """Возвращает количество дней с последнего выполнения привычки.
 
-        if last_completion:
-            today = timezone.now().date()
-            last_date = (
-                last_completion.completed_at.date()
-            )  # Используем date() для сравнения
-            return (today - last_date).days
+        Читает поддерживаемое поле last_completed_at, без запросов к выполнениям.
+        """
+        if self.last_completed_at is None:
+            return None  # Никогда не выполнялась
 
-        return None  # Никогда не выполнялась
+        last_date = timezone.localdate(self.last_completed_at)
+        return (timezone.localdate() - last_date).days
 
 
 class HabitCompletion(models.Model):
@@ -209,6 +257,8 @@ class HabitCompletion(models.Model):
         ordering = ["-completed_at"]
         indexes = [
             models.Index(fields=["habit", "completed_at"]),
+            # Keyset-пагинация ленты выполнений по (completed_at, id)
+            models.Index(fields=["completed_at", "id"], name="completion_keyset_idx"),
         ]
         constraints = [
             # Ограничение: нельзя выполнять привычку реже, чем 1 раз в 7 дней
@@ -222,27 +272,245 @@ class HabitCompletion(models.Model):
     def clean(self):
         """Валидация выполнения привычки"""
         if not self.pk:  # Только при создании нового выполнения
+            # completed_at заполняется auto_now_add уже при записи
+            completed_at = self.completed_at or timezone.now()
+
             # Проверяем, что привычка не выполняется слишком редко
-            validate_completion_frequency(self.habit, self.completed_at)
+            validate_completion_frequency(self.habit, completed_at)
 
             # Проверяем, что привычка не выполняется слишком часто
-            validate_too_frequent_completion(self.habit, self.completed_at)
+            validate_too_frequent_completion(self.habit, completed_at)
 
         super().clean()
 
     def save(self, *args, **kwargs):
-        """Переопределяем save для проверки периодичности"""
-        if not self.pk:  # Только при создании нового выполнения
-            # Проверяем, можно ли выполнять привычку по периодичности
-            if not self.habit.can_be_completed_today():
-                min_interval = self.habit.frequency_days
-                last_completion = self.habit.completions.latest("completed_at")
-                days_since_last = (timezone.now() - last_completion.completed_at).days
-
-                raise ValidationError(
-                    f"Привычку можно выполнять раз в {min_interval} дней. "
-                    f"Прошло только {days_since_last} дней."
-                )
-
-        self.full_clean()
-        super().save(*args, **kwargs)
+        """Переопределяем save для проверки периодичности.
+
+        Все проверки идут по habit.last_completed_at. Строка привычки
+        блокируется до конца транзакции, поэтому параллельные выполнения
+        проверяются по очереди и видят уже обновленное поле.
+        """
+        # Вместе с записью обновляются агрегаты и серии (сигналы post_save)
+        with transaction.atomic():
+            if not self.pk:  # Только при создании нового выполнения
+                self.habit = Habit.objects.select_for_update().get(pk=self.habit_id)
+                self._habit_locked = True
+
+                # Проверяем, можно ли выполнять привычку по периодичности
+                if not self.habit.can_be_completed_today():
+                    min_interval = self.habit.frequency_days
+                    days_since_last = (
+                        timezone.now() - self.habit.last_completed_at
+                    ).days
+
+                    raise ValidationError(
+                        f"Привычку можно выполнять раз в {min_interval} дней. "
+                        f"Прошло только {days_since_last} дней."
+                    )
+
+            self.full_clean()
+            super().save(*args, **kwargs)
+
+
+class UserStreak(models.Model):
+    """Серия дней подряд, в которые пользователь выполнял хоть одну привычку"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="habit_streak",
+        verbose_name="Пользователь",
+    )
+
+    current_streak = models.PositiveIntegerField(
+        default=0, verbose_name="Текущая серия (дней)"
+    )
+    longest_streak = models.PositiveIntegerField(
+        default=0, verbose_name="Лучшая серия (дней)"
+    )
+    last_active_date = models.DateField(
+        null=True, blank=True, verbose_name="Последний активный день"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Серия пользователя"
+        verbose_name_plural = "Серии пользователей"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.current_streak} / {self.longest_streak}"
+
+
+class DailyHabitStats(models.Model):
+    """Количество выполнений привычки за день.
+
+    Поддерживается инкрементально при создании и удалении выполнений
+    (habits.signals), пересобирается командой backfill_daily_stats.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_habit_stats",
+        verbose_name="Пользователь",
+    )
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        verbose_name="Привычка",
+    )
+
+    date = models.DateField(verbose_name="Дата")
+
+    count = models.PositiveIntegerField(default=0, verbose_name="Выполнений")
+
+    class Meta:
+        verbose_name = "Статистика привычки за день"
+        verbose_name_plural = "Статистика привычек по дням"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "date"], name="unique_daily_stats_per_habit"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} — {self.date}: {self.count}"
+
+
+HOURS_IN_DAY = 24
+
+
+def empty_hour_histogram():
+    return [0] * HOURS_IN_DAY
+
+
+class HabitProgress(models.Model):
+    """Снимок прогресса привычки для эндпоинта progress.
+
+    Общее число выполнений и гистограмма по часам (локальное время)
+    поддерживаются инкрементально при записи выполнений (habits.services);
+    серии и дата последнего выполнения хранятся на самой привычке.
+    """
+
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="progress_snapshot",
+        verbose_name="Привычка",
+    )
+
+    total_completions = models.PositiveIntegerField(
+        default=0, verbose_name="Всего выполнений"
+    )
+    hour_histogram = models.JSONField(
+        default=empty_hour_histogram, verbose_name="Выполнения по часам"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Прогресс привычки"
+        verbose_name_plural = "Прогресс привычек"
+
+    def __str__(self):
+        return f"{self.habit_id}: {self.total_completions}"
+
+    @property
+    def median_hour(self):
+        """Медианный час выполнения по гистограмме (None без выполнений)"""
+        total = sum(self.hour_histogram)
+        if not total:
+            return None
+
+        # Тот же элемент, что sorted(hours)[total // 2]
+        seen = 0
+        for hour, count in enumerate(self.hour_histogram):
+            seen += count
+            if seen > total // 2:
+                return hour
+
+
+class ExportJob(models.Model):
+    """Фоновая выгрузка данных пользователя в файл (habits.tasks.run_export_job)"""
+
+    SCOPE_CHOICES = [
+        ("habits", "Привычки"),
+        ("completions", "История выполнений"),
+    ]
+    FORMAT_CHOICES = [
+        ("csv", "CSV"),
+        ("json", "JSON"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "В очереди"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Готово"),
+        (STATUS_FAILED, "Ошибка"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+        verbose_name="Пользователь",
+    )
+
+    scope = models.CharField(
+        max_length=20, choices=SCOPE_CHOICES, default="habits", verbose_name="Данные"
+    )
+    format = models.CharField(
+        max_length=10, choices=FORMAT_CHOICES, default="csv", verbose_name="Формат"
+    )
+    compress = models.BooleanField(default=False, verbose_name="Сжать (gzip)")
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        verbose_name="Статус",
+    )
+    rows_total = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Всего строк"
+    )
+    rows_written = models.PositiveIntegerField(default=0, verbose_name="Записано строк")
+    file = models.FileField(
+        upload_to="exports/%Y/%m/", blank=True, verbose_name="Файл выгрузки"
+    )
+    error_message = models.TextField(blank=True, verbose_name="Ошибка")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Выгрузка"
+        verbose_name_plural = "Выгрузки"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.scope}.{self.format} ({self.status})"
+
+    @property
+    def progress(self):
+        """Доля выполнения в процентах (None, пока объем неизвестен)"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.rows_total:
+            return None
+        return min(round(self.rows_written / self.rows_total * 100), 99)
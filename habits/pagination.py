@@ -0,0 +1,179 @@
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q, prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset-пагинация по паре (``ordering_field``, id) от новых к старым.
+
+    Следующая страница выбирается условием ``(поле, id) < (курсор)`` по
+    составному индексу, поэтому стоимость страницы не зависит от глубины
+    и не нужен ``COUNT(*)``. Поддерживается только движение вперед.
+    """
+
+    ordering_field = "created_at"
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Некорректный курсор"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.ordering_field).isoformat()
+        raw = f"{value}|{instance.pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            value, pk = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+            return datetime.fromisoformat(value), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_branches(self, queryset, view):
+        """Части выборки, читаемые по отдельным индексам.
+
+        View может вернуть несколько непересекающихся веток из
+        ``get_keyset_branches(queryset)`` (например, «свои» и «чужие
+        публичные»): каждая читается своим индексом не дальше страницы, а
+        результаты сливаются в памяти — без OR и сортировки всего множества.
+        """
+        get_branches = getattr(view, "get_keyset_branches", None)
+        if get_branches is None:
+            return [queryset]
+        return get_branches(queryset)
+
+    def _ordered(self, queryset, cursor):
+        queryset = queryset.order_by(f"-{self.ordering_field}", "-id")
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f"{self.ordering_field}__lt": value})
+                | Q(**{self.ordering_field: value, "id__lt": pk})
+            )
+        return queryset
+
+    def _sort_key(self, instance):
+        return getattr(instance, self.ordering_field), instance.pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        # Лишняя строка показывает, есть ли следующая страница
+        limit = self.page_size_value + 1
+
+        branches = self.get_branches(queryset, view)
+        if len(branches) == 1:
+            page = list(self._ordered(branches[0], cursor)[:limit])
+        else:
+            page = []
+            for branch in branches:
+                branch = self._ordered(branch, cursor).prefetch_related(None)
+                page.extend(branch[:limit])
+            page.sort(key=self._sort_key, reverse=True)
+
+        self.has_next = len(page) > self.page_size_value
+        page = page[: self.page_size_value]
+        if len(branches) > 1:
+            # prefetch один раз и только для строк страницы
+            prefetch_related_objects(page, *queryset._prefetch_related_lookups)
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class HabitKeysetPagination(KeysetPagination):
+    ordering_field = "created_at"
+
+
+class CompletionKeysetPagination(KeysetPagination):
+    ordering_field = "completed_at"
+
+
+class StandardPagination(PageNumberPagination):
+    """Кастомная пагинация - 5 привычек на страницу.
+
+    С ``?pagination=cursor`` переключается на ``keyset_class``
+    (для бесконечной прокрутки).
+    """
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    page_query_param = "page"
+    mode_query_param = "pagination"
+    keyset_class = None
+
+    def _keyset(self, request):
+        if self.keyset_class is None:
+            return None
+        if request.query_params.get(self.mode_query_param) != "cursor":
+            return None
+        return self.keyset_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self._keyset(request)
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+        return super().get_previous_link()
+
+
+class HabitPagination(StandardPagination):
+    keyset_class = HabitKeysetPagination
+
+
+class CompletionPagination(StandardPagination):
+    keyset_class = CompletionKeysetPagination
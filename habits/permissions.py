@@ -12,23 +12,23 @@ class IsOwnerOrPublicReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Разрешаем чтение (GET, HEAD, OPTIONS) для публичных привычек
         if request.method in permissions.SAFE_METHODS:
-            return obj.is_public or obj.user == request.user
+            return obj.is_public or obj.user_id == request.user.pk
 
         # Для остальных методов разрешаем только владельцу
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
 
 
 class IsOwner(permissions.BasePermission):
     """Разрешение только для владельца объекта"""
 
     def has_object_permission(self, request, view, obj):
-        # Для привычек
-        if hasattr(obj, "user"):
-            return obj.user == request.user
+        # Для привычек (сравниваем id, не загружая пользователя)
+        if hasattr(obj, "user_id"):
+            return obj.user_id == request.user.pk
 
         # Для выполнений привычек
-        if hasattr(obj, "habit"):
-            return obj.habit.user == request.user
+        if hasattr(obj, "habit_id"):
+            return obj.habit.user_id == request.user.pk
 
         return False
 
@@ -41,7 +41,7 @@ class IsHabitOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Проверяем, что пользователь - владелец привычки
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
 
 
 class CanViewPublicHabits(permissions.BasePermission):
@@ -56,7 +56,7 @@ class CanViewPublicHabits(permissions.BasePermission):
             return False
 
         # Разрешаем просмотр, если привычка публичная ИЛИ пользователь - владелец
-        return obj.is_public or obj.user == request.user
+        return obj.is_public or obj.user_id == request.user.pk
 
 
 class HabitPermission(permissions.BasePermission):
@@ -82,10 +82,10 @@ class HabitPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Разрешаем безопасные методы для публичных привычек ИЛИ владельца
         if request.method in permissions.SAFE_METHODS:
-            return obj.is_public or obj.user == request.user
+            return obj.is_public or obj.user_id == request.user.pk
 
         # Для изменения/удаления - только владелец
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
 
 
 class HabitCompletionPermission(permissions.BasePermission):
@@ -96,5 +96,6 @@ class HabitCompletionPermission(permissions.BasePermission):
         return request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        # Только владелец привычки может управлять ее выполнениями
-        return obj.habit.user == request.user
+        # Только владелец привычки может управлять ее выполнениями;
+        # привычка приходит из select_related queryset'а, пользователь не нужен
+        return obj.habit.user_id == request.user.pk
@@ -0,0 +1,122 @@
+"""Проверка планов критичных запросов через EXPLAIN.
+
+Каждый запрос должен обслуживаться индексом: в плане не должно быть
+полного просмотра таблицы. На PostgreSQL план строится с
+``enable_seqscan = off`` — так на маленьком наборе данных видно, есть ли
+вообще подходящий индекс; на SQLite используется ``EXPLAIN QUERY PLAN``.
+"""
+
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from telegram_bot.models import TelegramConnectionCode, TelegramUser
+
+from .models import Habit, HabitCompletion
+from .services import completions_by_day
+
+# Строки плана с полным просмотром таблицы
+FULL_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)"),
+}
+
+
+def _user_habits(user_id):
+    return Habit.objects.filter(user_id=user_id).order_by("-created_at", "-id")[:6]
+
+
+def _visible_habits(user_id):
+    return Habit.objects.filter(Q(user_id=user_id) | Q(is_public=True)).order_by(
+        "-created_at", "-id"
+    )[:6]
+
+
+def _public_feed(user_id):
+    return Habit.objects.filter(is_public=True).order_by("-created_at", "-id")[:6]
+
+
+def _user_completions(user_id):
+    return HabitCompletion.objects.filter(habit__user_id=user_id).order_by(
+        "-completed_at", "-id"
+    )[:6]
+
+
+def _completions_by_day(user_id):
+    return completions_by_day(user_id, timezone.localdate() - timedelta(days=30))
+
+
+def _due_reminders(user_id):
+    from .tasks import _due_reminders
+
+    return _due_reminders(timezone.now())
+
+
+def _telegram_user_by_chat(user_id):
+    return TelegramUser.objects.filter(telegram_id=user_id)
+
+
+def _active_connection_code(user_id):
+    return TelegramConnectionCode.objects.filter(
+        code="000000", is_used=False, expires_at__gt=timezone.now()
+    )
+
+
+# Имя запроса -> функция от id пользователя, возвращающая QuerySet
+CRITICAL_QUERIES = {
+    "habits.user_list": _user_habits,
+    "habits.visible_list": _visible_habits,
+    "habits.public_feed": _public_feed,
+    "completions.user_recent": _user_completions,
+    "stats.completions_by_day": _completions_by_day,
+    "reminders.due": _due_reminders,
+    "telegram.user_by_chat": _telegram_user_by_chat,
+    "telegram.active_code": _active_connection_code,
+}
+
+# Известные исключения по СУБД. Django пишет фильтр по булеву полю как
+# ``WHERE is_public`` без сравнения, и SQLite не строит по такому условию
+# MULTI-INDEX OR; на PostgreSQL тот же запрос идет через BitmapOr.
+KNOWN_FULL_SCANS = {
+    "sqlite": {"habits.visible_list"},
+}
+
+
+def explain(queryset):
+    """План запроса на текущей базе"""
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def full_scans(plan, vendor=None):
+    """Таблицы, которые план читает полным просмотром"""
+    pattern = FULL_SCAN_PATTERNS.get(vendor or connection.vendor)
+    if pattern is None:
+        return []
+    return [
+        match.group(1)
+        for line in plan.splitlines()
+        for match in [pattern.search(line)]
+        if match
+    ]
+
+
+def check_query_plans(user_id=0, names=None):
+    """Планы критичных запросов: {имя: (план, таблицы без индекса)}.
+
+    Запросы из KNOWN_FULL_SCANS для текущей СУБД пропускаются.
+    """
+    known = KNOWN_FULL_SCANS.get(connection.vendor, set())
+    results = {}
+    for name, build in CRITICAL_QUERIES.items():
+        if name in known or (names and name not in names):
+            continue
+        plan = explain(build(user_id))
+        results[name] = (plan, full_scans(plan))
+    return results
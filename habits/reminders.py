@@ -0,0 +1,95 @@
+"""Расписание напоминаний о привычках.
+
+У каждой привычки хранится ``next_reminder_at`` — момент (UTC) следующего
+напоминания с учетом часового пояса пользователя, ``remind_before_minutes``
+и периодичности привычки. Задача beat выбирает наступившие напоминания
+диапазоном по индексу и до отправки переносит каждое на следующее
+срабатывание. Без активного Telegram или с выключенными напоминаниями
+поле пустое и привычка в выборку не попадает.
+"""
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+from telegram_bot.models import NotificationSettings
+
+from .services import frequency_days
+
+
+def reminder_settings(user_id):
+    """Настройки пользователя, если напоминания ему нужны, иначе None"""
+    return NotificationSettings.objects.filter(
+        telegram_user__django_user_id=user_id,
+        telegram_user__is_active=True,
+        enable_habit_reminders=True,
+    ).first()
+
+
+def reminder_zone(notify):
+    """Часовой пояс из настроек (неизвестный — пояс сервера)"""
+    try:
+        return ZoneInfo(notify.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.get_default_timezone()
+
+
+def habit_day(fire_at, notify):
+    """День привычки (по часам пользователя), к которому относится напоминание"""
+    before = timedelta(minutes=notify.remind_before_minutes)
+    return timezone.localtime(fire_at + before, reminder_zone(notify)).date()
+
+
+def is_due_on(habit, day, notify):
+    """Нужно ли выполнять привычку в день ``day`` с учетом периодичности"""
+    if habit.last_completed_at is None:
+        return True
+    last = timezone.localtime(habit.last_completed_at, reminder_zone(notify)).date()
+    return (day - last).days >= frequency_days(habit.frequency)
+
+
+def next_reminder_at(habit, notify, after):
+    """Первое напоминание строго позже ``after`` (UTC) или None.
+
+    Напоминание приходит за ``remind_before_minutes`` до времени привычки
+    по часам пользователя, начиная с дня, когда привычку снова нужно
+    выполнять.
+    """
+    if notify is None or habit.time is None:
+        return None
+
+    habit_time = habit.time
+    if isinstance(habit_time, str):
+        habit_time = time.fromisoformat(habit_time)
+
+    zone = reminder_zone(notify)
+    before = timedelta(minutes=notify.remind_before_minutes)
+
+    day = timezone.localtime(after, zone).date()
+    if habit.last_completed_at is not None:
+        last = timezone.localtime(habit.last_completed_at, zone).date()
+        day = max(day, last + timedelta(days=frequency_days(habit.frequency)))
+
+    while True:
+        fire_at = datetime.combine(day, habit_time, tzinfo=zone) - before
+        if fire_at > after:
+            return fire_at.astimezone(dt_timezone.utc)
+        day += timedelta(days=1)
+
+
+def reschedule_user(user_id):
+    """Пересчитать напоминания всех привычек пользователя"""
+    from .models import Habit
+
+    notify = reminder_settings(user_id)
+    now = timezone.now()
+    habits = list(
+        Habit.objects.filter(user_id=user_id).only(
+            "id", "time", "frequency", "last_completed_at", "next_reminder_at"
+        )
+    )
+    for habit in habits:
+        habit.next_reminder_at = next_reminder_at(habit, notify, now)
+    Habit.objects.bulk_update(habits, ["next_reminder_at"])
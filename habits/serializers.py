@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Habit, HabitCompletion
+from .models import DailyHabitStats, ExportJob, Habit, HabitCompletion
+from .services import active_streak
 
 User = get_user_model()
 
@@ -15,21 +19,73 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class OwnHabitField(serializers.PrimaryKeyRelatedField):
+    """Привычка текущего пользователя.
+
+    Чужие привычки отсекаются фильтром по ``user_id`` в SQL. При
+    валидации списка привычки заранее загружаются одним запросом
+    (см. HabitCompletionListSerializer) и берутся из контекста.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Вы можете отмечать выполнение только своих привычек.",
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+        if request:
+            queryset = queryset.filter(user_id=request.user.pk)
+        return queryset
+
+    def to_internal_value(self, data):
+        owned = self.context.get("owned_habits")
+        if owned is None:
+            return super().to_internal_value(data)
+        try:
+            return owned[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
+class HabitCompletionListSerializer(serializers.ListSerializer):
+    """Список выполнений: привычки всех элементов — одним запросом"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            habit_ids = set()
+            for item in data:
+                try:
+                    habit_ids.add(int(item.get("habit")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            habit_field = self.child.fields["habit"]
+            self.context["owned_habits"] = habit_field.get_queryset().in_bulk(habit_ids)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.context.pop("owned_habits", None)
+
+
 class HabitCompletionSerializer(serializers.ModelSerializer):
     """Сериализатор для отметки выполнения привычки"""
 
+    habit = OwnHabitField(queryset=Habit.objects.all())
+
     class Meta:
         model = HabitCompletion
         fields = ["id", "habit", "completed_at", "is_completed", "note"]
         read_only_fields = ["id", "completed_at"]
+        list_serializer_class = HabitCompletionListSerializer
 
     def validate(self, data):
         """Валидация данных выполнения привычки"""
         habit = data.get("habit")
 
         # Проверяем, что привычка принадлежит текущему пользователю
+        # (по id — без загрузки пользователя)
         request = self.context.get("request")
-        if request and habit.user != request.user:
+        if request and habit.user_id != request.user.pk:
             raise serializers.ValidationError(
                 "Вы можете отмечать выполнение только своих привычек."
             )
@@ -44,7 +100,13 @@ class HabitSerializer(serializers.ModelSerializer):
     related_habit = serializers.PrimaryKeyRelatedField(
         queryset=Habit.objects.filter(is_pleasant=True), required=False, allow_null=True
     )
-    completions = HabitCompletionSerializer(many=True, read_only=True)
+    # История выполнений только по ?expand=completions (последние записи,
+    # см. HabitViewSet.get_queryset)
+    completions = HabitCompletionSerializer(
+        many=True, read_only=True, source="recent_completions"
+    )
+    completion_count = serializers.SerializerMethodField()
+    current_streak = serializers.SerializerMethodField()
     full_description = serializers.SerializerMethodField()  # И здесь тоже исправляем
 
     class Meta:
@@ -63,10 +125,44 @@ class HabitSerializer(serializers.ModelSerializer):
             "is_public",
             "created_at",
             "updated_at",
+            "completion_count",
+            "last_completed_at",
+            "current_streak",
+            "longest_streak",
             "completions",
             "full_description",
         ]
-        read_only_fields = ["id", "user", "created_at", "updated_at"]
+        read_only_fields = [
+            "id",
+            "user",
+            "created_at",
+            "updated_at",
+            "last_completed_at",
+            "longest_streak",
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get("expand_completions"):
+            fields.pop("completions")
+        return fields
+
+    def get_completion_count(self, obj):
+        """Количество выполнений: аннотация queryset или дневные агрегаты"""
+        total = getattr(obj, "completions_total", None)
+        if total is None:
+            total = DailyHabitStats.objects.filter(habit=obj).aggregate(
+                total=Sum("count")
+            )["total"]
+        return total or 0
+
+    def get_current_streak(self, obj):
+        """Текущая серия (0, если вчера и сегодня выполнений не было)"""
+        if obj.last_completed_at is None:
+            return 0
+        return active_streak(
+            obj.current_streak, timezone.localdate(obj.last_completed_at)
+        )
 
     def get_full_description(self, obj):
         """Метод для получения full_description из модели"""
@@ -132,3 +228,46 @@ class PublicHabitSerializer(serializers.ModelSerializer):
     def get_full_description(self, obj):
         """Метод для получения full_description из модели"""
         return obj.full_description
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Задание фоновой выгрузки"""
+
+    progress = serializers.IntegerField(read_only=True, allow_null=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "scope",
+            "format",
+            "compress",
+            "status",
+            "progress",
+            "rows_total",
+            "rows_written",
+            "error_message",
+            "download_url",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "id",
+            "status",
+            "rows_total",
+            "rows_written",
+            "error_message",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+    def get_download_url(self, obj):
+        """Ссылка на скачивание готового файла"""
+        if obj.status != ExportJob.STATUS_DONE:
+            return None
+        url = reverse("export-job-download", kwargs={"pk": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
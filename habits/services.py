@@ -0,0 +1,482 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .cache import schedule_user_stats_invalidation
+from .models import DailyHabitStats, Habit, HabitCompletion, HabitProgress, UserStreak
+from .validators import validate_completion_frequency, validate_too_frequent_completion
+
+
+def frequency_days(frequency):
+    """Периодичность в днях (защита от строковых значений в настройках)"""
+    days = settings.HABIT_VALIDATION["ALLOWED_FREQUENCIES"].get(frequency, 1)
+    try:
+        return int(days) or 1
+    except (ValueError, TypeError):
+        return 1
+
+
+def completion_date(completion):
+    """Локальная дата выполнения (та же, что у completed_at__date)"""
+    return timezone.localdate(completion.completed_at)
+
+
+def record_completion(completion):
+    """Учесть новое выполнение в дневном агрегате"""
+    date = completion_date(completion)
+    rows = DailyHabitStats.objects.filter(habit_id=completion.habit_id, date=date)
+
+    if rows.update(count=F("count") + 1):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyHabitStats.objects.create(
+                user_id=completion.habit.user_id,
+                habit_id=completion.habit_id,
+                date=date,
+                count=1,
+            )
+    except IntegrityError:
+        # Строку за этот день успел создать параллельный запрос
+        rows.update(count=F("count") + 1)
+
+
+def forget_completion(completion):
+    """Убрать удаленное выполнение из дневного агрегата"""
+    rows = DailyHabitStats.objects.filter(
+        habit_id=completion.habit_id, date=completion_date(completion)
+    )
+    # Сначала удаляем последнее выполнение дня, иначе строка со счетчиком 2
+    # после уменьшения до 1 была бы удалена целиком
+    rows.filter(count__lte=1).delete()
+    rows.filter(count__gt=1).update(count=F("count") - 1)
+
+
+def completion_hour(completion):
+    """Локальный час выполнения (тот же, что у completed_at__hour)"""
+    return timezone.localtime(completion.completed_at).hour
+
+
+def _count_hour(snapshot, hour, delta):
+    snapshot.hour_histogram[hour] = max(snapshot.hour_histogram[hour] + delta, 0)
+    snapshot.total_completions = max(snapshot.total_completions + delta, 0)
+
+
+def track_progress(completion, delta=1):
+    """Учесть выполнение (delta=1) или его удаление (-1) в снимке прогресса"""
+    snapshot, _ = HabitProgress.objects.select_for_update().get_or_create(
+        habit_id=completion.habit_id
+    )
+    _count_hour(snapshot, completion_hour(completion), delta)
+    snapshot.save(update_fields=["hour_histogram", "total_completions", "updated_at"])
+
+
+def _record_bulk_progress(completions):
+    """Снимки прогресса для пачки выполнений разных привычек"""
+    snapshots = (
+        HabitProgress.objects.select_for_update()
+        .filter(habit_id__in=[completion.habit_id for completion in completions])
+        .in_bulk(field_name="habit_id")
+    )
+    now = timezone.now()
+    created = []
+    for completion in completions:
+        snapshot = snapshots.get(completion.habit_id)
+        if snapshot is None:
+            snapshot = HabitProgress(habit_id=completion.habit_id)
+            created.append(snapshot)
+        snapshot.updated_at = now
+        _count_hour(snapshot, completion_hour(completion), 1)
+
+    HabitProgress.objects.bulk_update(
+        snapshots.values(), ["hour_histogram", "total_completions", "updated_at"]
+    )
+    HabitProgress.objects.bulk_create(created)
+
+
+def rebuild_daily_stats(users=None, batch_size=2000):
+    """Пересобрать агрегаты из истории выполнений.
+
+    Возвращает количество созданных строк.
+    """
+    completions = HabitCompletion.objects.all()
+    stats = DailyHabitStats.objects.all()
+    if users is not None:
+        completions = completions.filter(habit__user__in=users)
+        stats = stats.filter(user__in=users)
+
+    rows = (
+        completions.annotate(date=TruncDate("completed_at"))
+        .values("habit_id", "habit__user_id", "date")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+
+    created = 0
+    with transaction.atomic():
+        stats.delete()
+
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(
+                DailyHabitStats(
+                    user_id=row["habit__user_id"],
+                    habit_id=row["habit_id"],
+                    date=row["date"],
+                    count=row["total"],
+                )
+            )
+            if len(batch) >= batch_size:
+                DailyHabitStats.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            DailyHabitStats.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
+
+
+def completions_on(user, date):
+    """Количество выполнений пользователя за день"""
+    total = DailyHabitStats.objects.filter(user=user, date=date).aggregate(
+        total=Sum("count")
+    )["total"]
+    return total or 0
+
+
+def completions_since(user, date):
+    """Количество выполнений пользователя начиная с даты"""
+    total = DailyHabitStats.objects.filter(user=user, date__gte=date).aggregate(
+        total=Sum("count")
+    )["total"]
+    return total or 0
+
+
+def completions_by_day(user, since):
+    """Выполнения пользователя по дням начиная с даты"""
+    return (
+        DailyHabitStats.objects.filter(user=user, date__gte=since)
+        .values("date")
+        .annotate(count=Sum("count"))
+        .order_by("date")
+    )
+
+
+def with_completion_totals(queryset):
+    """Аннотация completions_total (число выполнений) по дневным агрегатам"""
+    totals = (
+        DailyHabitStats.objects.filter(habit=OuterRef("pk"))
+        .values("habit")
+        .annotate(total=Sum("count"))
+        .values("total")
+    )
+    return queryset.annotate(completions_total=Coalesce(Subquery(totals), 0))
+
+
+def streak_runs(dates):
+    """Серии по возрастающему списку дат: (текущая, лучшая).
+
+    Текущая — серия, заканчивающаяся последней датой.
+    """
+    current = longest = 0
+    previous = None
+    for date in dates:
+        if previous is not None and (date - previous).days == 1:
+            current += 1
+        elif date != previous:
+            current = 1
+        longest = max(longest, current)
+        previous = date
+    return current, longest
+
+
+def advance_streak(current, longest, last_date, date):
+    """Счетчики серии после выполнения в день ``date``.
+
+    Возвращает None, если выполнение задним числом и серию нужно
+    пересчитать по агрегатам.
+    """
+    if last_date is None:
+        return 1, max(longest, 1), date
+    if date == last_date:
+        return current, longest, last_date
+    if date < last_date:
+        return None
+    current = current + 1 if (date - last_date).days == 1 else 1
+    return current, max(longest, current), date
+
+
+def active_streak(current, last_date, today=None):
+    """Серия считается текущей, если последний день — сегодня или вчера"""
+    if last_date is None:
+        return 0
+    today = today or timezone.localdate()
+    return current if (today - last_date).days <= 1 else 0
+
+
+def _habit_dates(habit_id):
+    return (
+        DailyHabitStats.objects.filter(habit_id=habit_id)
+        .order_by("date")
+        .values_list("date", flat=True)
+    )
+
+
+def _user_dates(user_id):
+    return (
+        DailyHabitStats.objects.filter(user_id=user_id)
+        .order_by("date")
+        .values_list("date", flat=True)
+        .distinct()
+    )
+
+
+def refresh_habit_streak(habit_id):
+    """Полный пересчет серий привычки по дневным агрегатам"""
+    current, longest = streak_runs(_habit_dates(habit_id))
+    last_completed_at = HabitCompletion.objects.filter(habit_id=habit_id).aggregate(
+        last=Max("completed_at")
+    )["last"]
+    Habit.objects.filter(pk=habit_id).update(
+        current_streak=current,
+        longest_streak=longest,
+        last_completed_at=last_completed_at,
+    )
+
+
+def refresh_user_streak(user_id):
+    """Полный пересчет серии пользователя по дневным агрегатам"""
+    dates = list(_user_dates(user_id))
+    current, longest = streak_runs(dates)
+    UserStreak.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "current_streak": current,
+            "longest_streak": longest,
+            "last_active_date": dates[-1] if dates else None,
+        },
+    )
+
+
+def _update_habit_streak(completion, date):
+    if getattr(completion, "_habit_locked", False):
+        # HabitCompletion.save уже заблокировал и прочитал привычку
+        habit = completion.habit
+    else:
+        habit = (
+            Habit.objects.select_for_update()
+            .only("current_streak", "longest_streak", "last_completed_at")
+            .get(pk=completion.habit_id)
+        )
+    last_date = (
+        timezone.localdate(habit.last_completed_at) if habit.last_completed_at else None
+    )
+    counters = advance_streak(
+        habit.current_streak, habit.longest_streak, last_date, date
+    )
+    if counters is None:
+        refresh_habit_streak(habit.pk)
+        return
+
+    current, longest, _ = counters
+    last_completed_at = completion.completed_at
+    if habit.last_completed_at and habit.last_completed_at > last_completed_at:
+        last_completed_at = habit.last_completed_at
+
+    Habit.objects.filter(pk=habit.pk).update(
+        current_streak=current,
+        longest_streak=longest,
+        last_completed_at=last_completed_at,
+    )
+    habit.current_streak = current
+    habit.longest_streak = longest
+    habit.last_completed_at = last_completed_at
+
+
+def _update_user_streak(user_id, date):
+    streak, _ = UserStreak.objects.select_for_update().get_or_create(user_id=user_id)
+    counters = advance_streak(
+        streak.current_streak, streak.longest_streak, streak.last_active_date, date
+    )
+    if counters is None:
+        refresh_user_streak(user_id)
+        return
+
+    streak.current_streak, streak.longest_streak, streak.last_active_date = counters
+    streak.save(update_fields=["current_streak", "longest_streak", "last_active_date"])
+
+
+def _is_direct_deletion(origin):
+    """Удаляют само выполнение, а не привычку или пользователя каскадом"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is HabitCompletion
+
+
+def completion_created(completion):
+    """Все денормализованные данные после создания выполнения"""
+    date = completion_date(completion)
+    with transaction.atomic():
+        record_completion(completion)
+        track_progress(completion)
+        _update_habit_streak(completion, date)
+        _update_user_streak(completion.habit.user_id, date)
+    schedule_user_stats_invalidation(completion.habit.user_id)
+
+
+def completion_deleted(completion, origin=None):
+    """Все денормализованные данные после удаления выполнения.
+
+    При каскадном удалении привычки или пользователя пересчитывать
+    нечего — их агрегаты удаляются вместе с ними.
+    """
+    if origin is not None and not _is_direct_deletion(origin):
+        return
+
+    with transaction.atomic():
+        forget_completion(completion)
+        track_progress(completion, delta=-1)
+        refresh_habit_streak(completion.habit_id)
+        refresh_user_streak(completion.habit.user_id)
+    schedule_user_stats_invalidation(completion.habit.user_id)
+
+
+def calculate_user_streak(user):
+    """Текущая серия дней подряд с выполнениями (чтение счетчика)"""
+    streak = UserStreak.objects.filter(user=user).first()
+    if streak is None:
+        return 0
+    return active_streak(streak.current_streak, streak.last_active_date)
+
+
+def completion_error(habit, moment):
+    """Проверки периодичности выполнения без запросов.
+
+    Те же правила, что в HabitCompletion.save: Habit.can_be_completed_today
+    и валидаторы, все по habit.last_completed_at. Возвращает текст ошибки
+    или None.
+    """
+    if not habit.can_be_completed_today():
+        return (
+            "Cannot complete habit more frequently than "
+            f"{frequency_days(habit.frequency)} days"
+        )
+    try:
+        validate_completion_frequency(habit, moment)
+        validate_too_frequent_completion(habit, moment)
+    except ValidationError as e:
+        return " ".join(e.messages)
+    return None
+
+
+def _record_bulk_rollup(habits, date):
+    """+1 в дневном агрегате каждой привычки за дату (константное число запросов)"""
+    habit_ids = [habit.pk for habit in habits]
+    rows = DailyHabitStats.objects.filter(habit_id__in=habit_ids, date=date)
+    existing = set(rows.values_list("habit_id", flat=True))
+
+    if existing:
+        rows.filter(habit_id__in=existing).update(count=F("count") + 1)
+    DailyHabitStats.objects.bulk_create(
+        [
+            DailyHabitStats(user_id=habit.user_id, habit=habit, date=date, count=1)
+            for habit in habits
+            if habit.pk not in existing
+        ]
+    )
+
+
+def _as_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bulk_complete(user, habit_ids, note=""):
+    """Выполнить несколько привычек пользователя набором запросов.
+
+    Привычки читаются и блокируются одним запросом, правила периодичности
+    проверяются в памяти, выполнения вставляются одним bulk_create, а
+    агрегаты и серии (сигналы bulk_create не вызывает) обновляются пакетно.
+    Возвращает (successes, errors) в порядке habit_ids.
+    """
+    moment = timezone.now()
+    date = timezone.localdate(moment)
+    successes = []
+    errors = []
+
+    with transaction.atomic():
+        habits = (
+            Habit.objects.select_for_update()
+            .filter(user=user)
+            .in_bulk([pk for pk in map(_as_pk, habit_ids) if pk is not None])
+        )
+
+        completed = []
+        seen = set()
+        for habit_id in habit_ids:
+            habit = habits.get(_as_pk(habit_id))
+            if habit is None:
+                errors.append(
+                    {"habit_id": habit_id, "error": "Habit not found or access denied"}
+                )
+                continue
+            if habit.pk in seen:
+                errors.append({"habit_id": habit_id, "error": "Duplicate habit_id"})
+                continue
+            seen.add(habit.pk)
+
+            error = completion_error(habit, moment)
+            if error:
+                errors.append({"habit_id": habit_id, "error": error})
+                continue
+            completed.append((habit_id, habit))
+
+        if not completed:
+            return successes, errors
+
+        completions = HabitCompletion.objects.bulk_create(
+            [
+                HabitCompletion(habit=habit, is_completed=True, note=note)
+                for _, habit in completed
+            ]
+        )
+        habits = [habit for _, habit in completed]
+
+        _record_bulk_rollup(habits, date)
+        _record_bulk_progress(completions)
+
+        for habit, completion in zip(habits, completions):
+            last_date = (
+                timezone.localdate(habit.last_completed_at)
+                if habit.last_completed_at
+                else None
+            )
+            # Дата выполнения не раньше последней, пересчет не нужен
+            habit.current_streak, habit.longest_streak, _ = advance_streak(
+                habit.current_streak, habit.longest_streak, last_date, date
+            )
+            habit.last_completed_at = completion.completed_at
+        Habit.objects.bulk_update(
+            habits, ["current_streak", "longest_streak", "last_completed_at"]
+        )
+
+        _update_user_streak(user.pk, date)
+        schedule_user_stats_invalidation(user.pk)
+
+    for (habit_id, habit), completion in zip(completed, completions):
+        successes.append(
+            {
+                "habit_id": habit_id,
+                "action": habit.action,
+                "completion_id": completion.pk,
+                "completed_at": completion.completed_at,
+            }
+        )
+    return successes, errors
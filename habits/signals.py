@@ -0,0 +1,84 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from telegram_bot.models import NotificationSettings, TelegramUser
+
+from . import services
+from .cache import schedule_public_feed_invalidation, schedule_user_stats_invalidation
+from .models import Habit, HabitCompletion
+from .reminders import reschedule_user
+
+# Массовые изменения публичности (queryset.update не шлет post_save).
+# Аргументы: habit_ids.
+public_habits_changed = Signal()
+
+
+@receiver(post_save, sender=HabitCompletion)
+def completion_created(sender, instance, created, raw=False, **kwargs):
+    """Новое выполнение обновляет агрегаты и серии"""
+    if created and not raw:
+        services.completion_created(instance)
+
+
+@receiver(post_delete, sender=HabitCompletion)
+def completion_deleted(sender, instance, origin=None, **kwargs):
+    """Удаленное выполнение вычитается из агрегатов и серий"""
+    services.completion_deleted(instance, origin=origin)
+
+
+@receiver(post_delete, sender=Habit)
+def habit_deleted(sender, instance, origin=None, **kwargs):
+    """Вместе с привычкой пропадают ее дни — пересчитываем серию пользователя"""
+    if isinstance(origin, Habit) or getattr(origin, "model", None) is Habit:
+        services.refresh_user_streak(instance.user_id)
+
+
+@receiver(post_save, sender=Habit)
+def habit_saved(sender, instance, created, **kwargs):
+    """Изменение привычки может затронуть публичную ленту.
+
+    Новая приватная привычка в ленту не попадает; в остальных случаях
+    (в том числе снятие публичности) кэш ленты сбрасывается.
+    """
+    if created and not instance.is_public:
+        return
+    schedule_public_feed_invalidation()
+
+
+@receiver(post_delete, sender=Habit)
+def public_habit_deleted(sender, instance, **kwargs):
+    if instance.is_public:
+        schedule_public_feed_invalidation()
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def habit_stats_changed(sender, instance, **kwargs):
+    """Набор привычек входит в статистику пользователя"""
+    schedule_user_stats_invalidation(instance.user_id)
+
+
+@receiver(public_habits_changed)
+def public_habits_bulk_changed(sender, habit_ids=None, **kwargs):
+    schedule_public_feed_invalidation()
+
+
+@receiver([post_save, post_delete], sender=TelegramUser)
+def telegram_user_changed(sender, instance, raw=False, **kwargs):
+    """Подключение и отключение Telegram меняет расписание напоминаний"""
+    if not raw:
+        reschedule_user(instance.django_user_id)
+
+
+@receiver([post_save, post_delete], sender=NotificationSettings)
+def notification_settings_changed(sender, instance, raw=False, **kwargs):
+    """Часовой пояс, отступ и включение напоминаний меняют расписание"""
+    if raw:
+        return
+    user_id = (
+        TelegramUser.objects.filter(pk=instance.telegram_user_id)
+        .values_list("django_user_id", flat=True)
+        .first()
+    )
+    if user_id is not None:
+        reschedule_user(user_id)
@@ -1,124 +1,160 @@
 import logging
+from datetime import timedelta
 
-from celery import shared_task
+from celery import Task, shared_task
+from django.db import transaction
 from django.utils import timezone
 
-from habits.models import Habit
+from habits.exports import export_rows_total, fail_export_job, write_export_file
+from habits.models import ExportJob, Habit
+from habits.reminders import habit_day, is_due_on, next_reminder_at
+from habits.services import active_streak
+from telegram_bot.delivery import OutgoingMessage
 from telegram_bot.models import TelegramUser
+from telegram_bot.notifications import NotificationLog
 from telegram_bot.services import TelegramBotService
 
 logger = logging.getLogger(__name__)
 
 
+# Ширина окна напоминаний совпадает с периодом задачи в beat (каждые 5 минут)
+REMINDER_WINDOW_MINUTES = 5
+
+# Пропущенные дольше этого (простой beat) напоминания не отправляются,
+# а только переносятся на следующее срабатывание
+MAX_REMINDER_DELAY = timedelta(hours=1)
+
+
+def _window_end(now, width=REMINDER_WINDOW_MINUTES):
+    """Конец текущего окна напоминаний.
+
+    Окно выравнивается по границе ``width`` минут, поэтому запоздавший
+    запуск задачи не отправляет напоминания соседнего окна раньше времени.
+    """
+    start = now.replace(second=0, microsecond=0) - timedelta(minutes=now.minute % width)
+    return start + timedelta(minutes=width)
+
+
+def _due_reminders(now):
+    """Привычки, о которых нужно напомнить в текущем окне.
+
+    Диапазон по индексу ``next_reminder_at`` плюс join на TelegramUser и
+    NotificationSettings. Строки блокируются с ``skip_locked``: параллельный
+    запуск задачи пропускает уже забранные привычки, а повторов нет, потому
+    что напоминание переносится на следующее срабатывание до отправки.
+    """
+    return (
+        Habit.objects.filter(
+            next_reminder_at__lt=_window_end(now),
+            user__telegram_user__is_active=True,
+            user__telegram_user__notification_settings__enable_habit_reminders=True,
+        )
+        .select_related("user__telegram_user__notification_settings")
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("next_reminder_at")
+    )
+
+
+def _log_results(results, notification_type, describe):
+    """Сохраняет в историю успешно доставленные сообщения одной пачкой"""
+    log = NotificationLog()
+    delivered = 0
+
+    for result in results:
+        telegram_user, habit = result.message.context
+        if not result.ok:
+            logger.error(
+                f"Error sending {notification_type} to {telegram_user.chat_id}: "
+                f"{result.error}"
+            )
+            continue
+
+        log.add(telegram_user, notification_type, describe(habit), habit=habit)
+        delivered += 1
+
+    log.flush()
+    return delivered
+
+
 @shared_task
 def send_habit_reminders():
     """Отправка напоминаний о привычках"""
     now = timezone.now()
-    current_time = now.time()
+    bot_service = TelegramBotService()
 
-    # Находим привычки, которые нужно выполнить в ближайшие 5 минут
-    habits = Habit.objects.filter(is_active=True).select_related(
-        "user"
-    )  # Предполагаем, что добавили это поле
+    messages = []
+    # Напоминания забираются (переносятся на следующее срабатывание) в
+    # транзакции до отправки: пересекающиеся запуски их не дублируют
+    with transaction.atomic():
+        habits = list(_due_reminders(now))
+        for habit in habits:
+            telegram_user = habit.user.telegram_user
+            notify = telegram_user.notification_settings
+
+            # Пропущенные и уже выполненные (по периодичности) не напоминаем
+            fire_at = habit.next_reminder_at
+            if fire_at >= now - MAX_REMINDER_DELAY and is_due_on(
+                habit, habit_day(fire_at, notify), notify
+            ):
+                messages.append(
+                    bot_service.build_habit_reminder(
+                        chat_id=telegram_user.chat_id,
+                        habit=habit,
+                        context=(telegram_user, habit),
+                    )
+                )
 
-    bot_service = TelegramBotService()
-    notifications_sent = 0
+            habit.next_reminder_at = next_reminder_at(habit, notify, max(now, fire_at))
+        Habit.objects.bulk_update(habits, ["next_reminder_at"])
 
-    for habit in habits:
-        try:
-            # Проверяем время привычки (±5 минут)
-            habit_time = habit.time
-            time_diff = abs(
-                (current_time.hour * 60 + current_time.minute)
-                - (habit_time.hour * 60 + habit_time.minute)
-            )
+    notifications_sent = _log_results(
+        bot_service.send_messages(messages),
+        "habit_reminder",
+        lambda habit: f"Напоминание: {habit.action}",
+    )
 
-            if time_diff <= 5:  # В пределах 5 минут
-                # Проверяем, подключен ли пользователь к Telegram
-                try:
-                    telegram_user = TelegramUser.objects.get(
-                        user=habit.user, is_active=True
-                    )
-                    settings = telegram_user.notification_settings
-
-                    if settings.enable_habit_reminders:
-                        # Проверяем, не было ли уже напоминания сегодня
-                        from telegram_bot.models import SentNotification
-
-                        today_start = now.replace(
-                            hour=0, minute=0, second=0, microsecond=0
-                        )
-
-                        already_sent = SentNotification.objects.filter(
-                            telegram_user=telegram_user,
-                            habit=habit,
-                            notification_type="habit_reminder",
-                            sent_at__gte=today_start,
-                        ).exists()
-
-                        if not already_sent:
-                            bot_service.send_habit_reminder(
-                                chat_id=telegram_user.chat_id, habit=habit
-                            )
-
-                            # Сохраняем в историю
-                            SentNotification.objects.create(
-                                telegram_user=telegram_user,
-                                habit=habit,
-                                notification_type="habit_reminder",
-                                message_text=f"Напоминание: {habit.action}",
-                                is_delivered=True,
-                            )
-
-                            notifications_sent += 1
-
-                except TelegramUser.DoesNotExist:
-                    continue
-                except Exception as e:
-                    logger.error(f"Error sending reminder for habit {habit.id}: {e}")
-                    continue
+    return f"Sent {notifications_sent} habit reminders"
 
+
+def _build_reports(telegram_users, build):
+    """Готовит отчеты; ошибка для одного пользователя не прерывает рассылку"""
+    messages = []
+
+    for telegram_user in telegram_users:
+        try:
+            messages.append(
+                build(
+                    chat_id=telegram_user.chat_id,
+                    user=telegram_user.user,
+                    context=(telegram_user, None),
+                )
+            )
         except Exception as e:
-            logger.error(f"Error processing habit {habit.id}: {e}")
+            logger.error(f"Error building report for {telegram_user.chat_id}: {e}")
 
-    return f"Sent {notifications_sent} habit reminders"
+    return messages
 
 
 @shared_task
 def send_daily_summaries():
     """Отправка ежедневных отчетов"""
-    now = timezone.now()
-    current_time = now.time()
+    now = timezone.localtime()
 
     # Отправляем в 21:00
-    if current_time.hour == 21 and current_time.minute == 0:
+    if now.hour == 21 and now.minute == 0:
         bot_service = TelegramBotService()
 
         # Находим всех пользователей с активными Telegram аккаунтами
         telegram_users = TelegramUser.objects.filter(
             is_active=True, notification_settings__enable_daily_reminders=True
-        ).select_related("user", "notification_settings")
-
-        for telegram_user in telegram_users:
-            try:
-                bot_service.send_daily_summary(
-                    chat_id=telegram_user.chat_id, user=telegram_user.user
-                )
-
-                # Сохраняем в историю
-                from telegram_bot.models import SentNotification
+        ).select_related("django_user", "notification_settings")
 
-                SentNotification.objects.create(
-                    telegram_user=telegram_user,
-                    notification_type="daily_summary",
-                    message_text="Ежедневный отчет",
-                    is_delivered=True,
-                )
-
-            except Exception as e:
-                logger.error(
-                    f"Error sending daily summary to {telegram_user.chat_id}: {e}"
-                )
+        messages = _build_reports(telegram_users, bot_service.build_daily_summary)
+        _log_results(
+            bot_service.send_messages(messages),
+            "daily_summary",
+            lambda habit: "Ежедневный отчет",
+        )
 
     return "Daily summaries sent"
 
@@ -126,38 +162,28 @@ def send_daily_summaries():
 @shared_task
 def send_weekly_reports():
     """Отправка еженедельных отчетов (по воскресеньям)"""
-    now = timezone.now()
+    now = timezone.localtime()
 
     # Отправляем в воскресенье в 10:00
-    if now.weekday() == 6 and now.time().hour == 10 and now.time().minute == 0:
+    if now.weekday() == 6 and now.hour == 10 and now.minute == 0:
         bot_service = TelegramBotService()
 
         telegram_users = TelegramUser.objects.filter(
             is_active=True, notification_settings__enable_weekly_reports=True
-        ).select_related("user")
+        ).select_related("django_user")
 
-        for telegram_user in telegram_users:
-            try:
-                bot_service.send_weekly_report(
-                    chat_id=telegram_user.chat_id, user=telegram_user.user
-                )
+        messages = _build_reports(telegram_users, bot_service.build_weekly_report)
+        _log_results(
+            bot_service.send_messages(messages),
+            "weekly_report",
+            lambda habit: "Еженедельный отчет",
+        )
 
-                # Сохраняем в историю
-                from telegram_bot.models import SentNotification
+    return "Weekly reports sent"
 
-                SentNotification.objects.create(
-                    telegram_user=telegram_user,
-                    notification_type="weekly_report",
-                    message_text="Еженедельный отчет",
-                    is_delivered=True,
-                )
 
-            except Exception as e:
-                logger.error(
-                    f"Error sending weekly report to {telegram_user.chat_id}: {e}"
-                )
-
-    return "Weekly reports sent"
+# Серии, о которых оповещаем пользователя
+STREAK_MILESTONES = {3, 7, 14, 21, 30, 60, 90}
 
 
 @shared_task
@@ -167,25 +193,77 @@ def check_streak_alerts():
 
     telegram_users = TelegramUser.objects.filter(
         is_active=True, notification_settings__enable_streak_alerts=True
-    ).select_related("user")
+    ).select_related("django_user__habit_streak")
 
+    messages = []
     for telegram_user in telegram_users:
-        try:
-            user = telegram_user.user
-            streak = bot_service._calculate_streak(user)
-
-            # Оповещаем о значительных сериях
-            if streak in [3, 7, 14, 21, 30, 60, 90]:
-                message = (
-                    f"🎉 <b>Поздравляем!</b>\n\n"
-                    f"Вы достигли серии из <b>{streak} дней</b> подряд!\n\n"
-                    f"💪 Продолжайте в том же духе!\n"
-                    f"Это отличный результат!"
+        # Серия хранится счетчиком, пересчитывать историю не нужно
+        user_streak = getattr(telegram_user.user, "habit_streak", None)
+        if user_streak is None:
+            continue
+        streak = active_streak(user_streak.current_streak, user_streak.last_active_date)
+
+        # Оповещаем о значительных сериях
+        if streak in STREAK_MILESTONES:
+            messages.append(
+                OutgoingMessage(
+                    chat_id=telegram_user.chat_id,
+                    text=(
+                        f"🎉 <b>Поздравляем!</b>\n\n"
+                        f"Вы достигли серии из <b>{streak} дней</b> подряд!\n\n"
+                        f"💪 Продолжайте в том же духе!\n"
+                        f"Это отличный результат!"
+                    ),
+                    context=(telegram_user, None),
                 )
+            )
 
-                bot_service.send_message(chat_id=telegram_user.chat_id, text=message)
-
-        except Exception as e:
-            logger.error(f"Error checking streak for {telegram_user.chat_id}: {e}")
+    for result in bot_service.send_messages(messages):
+        if not result.ok:
+            logger.error(
+                f"Error sending streak alert to {result.message.chat_id}: "
+                f"{result.error}"
+            )
 
     return "Streak alerts checked"
+
+
+class ExportJobTask(Task):
+    """Задача выгрузки: при любом падении задание не остается «в работе»"""
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        job_id = kwargs.get("job_id", args[0] if args else None)
+        if job_id is not None:
+            fail_export_job(job_id, str(exc) or exc.__class__.__name__)
+
+
+# Мягкий лимит раньше жесткого CELERY_TASK_TIME_LIMIT, чтобы успеть
+# отметить задание неудачным (SoftTimeLimitExceeded ловится ниже)
+EXPORT_SOFT_TIME_LIMIT = 25 * 60
+
+
+@shared_task(base=ExportJobTask, soft_time_limit=EXPORT_SOFT_TIME_LIMIT)
+def run_export_job(job_id):
+    """Фоновая выгрузка: файл сохраняется в задании для повторных скачиваний"""
+    # Забираем задание атомарно, чтобы повторная доставка задачи его не дублировала
+    claimed = ExportJob.objects.filter(
+        pk=job_id, status=ExportJob.STATUS_PENDING
+    ).update(status=ExportJob.STATUS_RUNNING, started_at=timezone.now())
+    if not claimed:
+        return f"Export job {job_id} skipped"
+
+    job = ExportJob.objects.select_related("user").get(pk=job_id)
+    try:
+        job.rows_total = export_rows_total(job.user, job.scope)
+        job.save(update_fields=["rows_total"])
+
+        write_export_file(job)
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        fail_export_job(job_id, str(e) or e.__class__.__name__)
+        return f"Export job {job_id} failed"
+
+    job.status = ExportJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "status", "rows_written", "finished_at"])
+    return f"Export job {job_id} done"
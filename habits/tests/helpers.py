@@ -0,0 +1,38 @@
+"""Общие заготовки тестов выполнений.
+
+Даты выполнений фиксируются в марте 2026 года, а ``timezone.now``
+подменяется на время создания: от него зависят ``auto_now_add`` и
+проверки периодичности.
+"""
+
+from datetime import datetime, time
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from habits.models import Habit, HabitCompletion
+
+
+def at(day, hour=9):
+    """Момент ``day`` марта 2026 года в часовом поясе проекта"""
+    return timezone.make_aware(datetime(2026, 3, day, hour))
+
+
+def frozen_now(moment):
+    """Подменить текущее время на ``moment``"""
+    return patch("django.utils.timezone.now", return_value=moment)
+
+
+def create_habit(user, action="Зарядка", **fields):
+    """Полезная ежедневная привычка с обязательными полями по умолчанию"""
+    values = {"place": "Дом", "time": time(9, 0), "duration": 60, **fields}
+    return Habit.objects.create(user=user, action=action, **values)
+
+
+def complete(habit, day, hour=9, **fields):
+    """Выполнение привычки ``day`` марта в ``hour`` часов"""
+    moment = at(day, hour)
+    with frozen_now(moment):
+        return HabitCompletion.objects.create(
+            habit=habit, completed_at=moment, **fields
+        )
@@ -0,0 +1,167 @@
+"""Бюджет SQL-запросов для API-эндпоинтов.
+
+Каждый эндпоинт вызывается на наборах из 1, 10 и 100 привычек; число
+запросов не должно расти вместе с объемом данных. Таблица замеров
+выводится в отчет и, если задана переменная ``QUERY_BUDGET_REPORT``,
+дописывается в файл, чтобы отслеживать изменения между прогонами.
+"""
+
+import os
+import unittest
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, Optional
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from habits.models import Habit, HabitCompletion
+
+User = get_user_model()
+
+FIXTURE_SIZES = (1, 10, 100)
+
+
+@dataclass
+class Endpoint:
+    """Эндпоинт под контролем бюджета.
+
+    ``path`` и ``data`` — функции от набора данных (см. ``build_fixture``).
+    """
+
+    name: str
+    path: Callable[[Dict[str, Any]], str]
+    method: str = "get"
+    data: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    status_code: int = 200
+
+
+def build_fixture(size):
+    """Пользователь с ``size`` привычками и столько же публичных привычек
+    другого пользователя.
+
+    У каждой привычки одно выполнение позавчера: ее можно выполнить снова.
+    """
+    owner = User.objects.create_user(username=f"budget{size}", password="pass123")
+    other = User.objects.create_user(username=f"public{size}", password="pass123")
+
+    completed_at = timezone.make_aware(
+        datetime.combine(timezone.localdate() - timedelta(days=2), time(9, 0))
+    )
+
+    habits = []
+    for index in range(size):
+        habit = Habit.objects.create(
+            user=owner,
+            place="Дом",
+            time=time(9, 0),
+            action=f"Привычка {index}",
+            duration=60,
+        )
+        Habit.objects.create(
+            user=other,
+            place="Парк",
+            time=time(10, 0),
+            action=f"Публичная {index}",
+            duration=60,
+            is_public=True,
+        )
+        with patch("django.utils.timezone.now", return_value=completed_at):
+            HabitCompletion.objects.create(habit=habit, completed_at=completed_at)
+        habits.append(habit)
+
+    return {"user": owner, "habits": habits, "habit": habits[0]}
+
+
+def count_queries(endpoint, fixture):
+    """Число запросов одного вызова эндпоинта"""
+    client = APIClient()
+    client.force_authenticate(user=fixture["user"])
+    request = getattr(client, endpoint.method)
+    kwargs = {"format": "json"}
+    if endpoint.data is not None:
+        kwargs["data"] = endpoint.data(fixture)
+
+    # Меряем «холодный» запрос, без кэшированных ответов
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = request(endpoint.path(fixture), **kwargs)
+        if response.streaming:
+            # Потоковый ответ обращается к базе по мере чтения
+            b"".join(response.streaming_content)
+
+    assert (
+        response.status_code == endpoint.status_code
+    ), f"{endpoint.name}: HTTP {response.status_code}"
+    return len(context)
+
+
+def format_table(measurements, sizes=FIXTURE_SIZES):
+    """Таблица «эндпоинт × размер набора» в текстовом виде"""
+    width = max([len("endpoint")] + [len(name) for name in measurements])
+    header = "endpoint".ljust(width) + "".join(f"{size:>8}" for size in sizes)
+    lines = [header, "-" * len(header)]
+    for name, counts in measurements.items():
+        lines.append(name.ljust(width) + "".join(f"{count:>8}" for count in counts))
+    return "\n".join(lines)
+
+
+def write_report(table):
+    """Дописать таблицу в файл отчета, если он задан"""
+    path = os.environ.get("QUERY_BUDGET_REPORT")
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as report:
+        report.write(f"# {timezone.now().isoformat()}\n{table}\n\n")
+
+
+def budget_test(endpoint, known_regression=False):
+    """Тест-метод: число запросов ``endpoint`` одинаково на всех наборах.
+
+    ``known_regression`` помечает эндпоинт, который пока растет с данными:
+    тест ожидаемо падает и начнет «неожиданно проходить» после исправления.
+    """
+
+    def test(self):
+        counts = [
+            count_queries(endpoint, self.fixtures[size]) for size in FIXTURE_SIZES
+        ]
+        self.measurements[endpoint.name] = counts
+        self.assertEqual(
+            len(set(counts)),
+            1,
+            f"{endpoint.name}: число запросов растет с данными {counts}",
+        )
+
+    test.__doc__ = f"Бюджет запросов: {endpoint.name}"
+    if known_regression:
+        test = unittest.expectedFailure(test)
+    return test
+
+
+class QueryBudgetMixin:
+    """Наборы данных на класс тестов и таблица замеров по его завершении"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Вне setUpTestData: там атрибуты копируются для каждого теста
+        cls.measurements = {}
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fixtures = {size: build_fixture(size) for size in FIXTURE_SIZES}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.measurements:
+            table = format_table(dict(sorted(cls.measurements.items())))
+            print(f"\n{table}")
+            write_report(table)
+        super().tearDownClass()
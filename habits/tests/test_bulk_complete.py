@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from habits.models import DailyHabitStats, Habit, HabitCompletion, UserStreak
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class BulkCompleteTestCase(TestCase):
+    """Массовое выполнение привычек пакетными запросами"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulk", password="pass123")
+        self.habits = [
+            create_habit(self.user, f"Привычка {index}") for index in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def bulk_complete(self, habit_ids, day=5):
+        with frozen_now(at(day, 12)):
+            response = self.client.post(
+                "/api/completions/bulk_complete/",
+                {"habit_ids": habit_ids, "note": "пакет"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_report_and_side_effects(self):
+        """Выполнения, агрегаты и серии обновлены, как при одиночном создании"""
+        complete(self.habits[0], 4)
+
+        data = self.bulk_complete([habit.pk for habit in self.habits])
+
+        self.assertEqual(data["summary"], {"total": 3, "successful": 3, "failed": 0})
+        self.assertEqual(
+            [item["habit_id"] for item in data["successes"]],
+            [habit.pk for habit in self.habits],
+        )
+        self.assertEqual(
+            HabitCompletion.objects.filter(note="пакет").count(),
+            3,
+        )
+        self.assertEqual(
+            DailyHabitStats.objects.filter(date=at(5).date()).count(),
+            3,
+        )
+
+        first = Habit.objects.get(pk=self.habits[0].pk)
+        self.assertEqual((first.current_streak, first.longest_streak), (2, 2))
+        self.assertEqual(first.last_completed_at.date(), at(5).date())
+        self.assertEqual(UserStreak.objects.get(user=self.user).current_streak, 2)
+
+    def test_errors_are_reported_per_id(self):
+        """Чужие, несуществующие, повторные и слишком частые — в errors"""
+        other = create_habit(
+            User.objects.create_user(username="other", password="pass123"),
+            "Привычка 9",
+        )
+        complete(self.habits[1], 5)
+
+        habit_ids = [self.habits[0].pk, other.pk, 999999, self.habits[0].pk]
+        habit_ids.append(self.habits[1].pk)
+        data = self.bulk_complete(habit_ids)
+
+        self.assertEqual(len(data["successes"]), 1)
+        errors = {(item["habit_id"], item["error"]) for item in data["errors"]}
+        self.assertIn((other.pk, "Habit not found or access denied"), errors)
+        self.assertIn((999999, "Habit not found or access denied"), errors)
+        self.assertIn((self.habits[0].pk, "Duplicate habit_id"), errors)
+        self.assertEqual(len(data["errors"]), 4)
+
+    def test_query_count_does_not_depend_on_habit_count(self):
+        habits = [
+            create_habit(self.user, f"Привычка {index}") for index in range(3, 50)
+        ]
+        habit_ids = [habit.pk for habit in self.habits + habits]
+
+        with CaptureQueriesContext(connection) as context:
+            data = self.bulk_complete(habit_ids)
+
+        self.assertEqual(data["summary"]["successful"], 50)
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertLessEqual(len(statements), 10)
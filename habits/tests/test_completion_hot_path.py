@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from habits.models import Habit, HabitCompletion
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class CompletionHotPathTestCase(TestCase):
+    """Проверки периодичности идут по Habit.last_completed_at"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="hotpath", password="pass123")
+        self.habit = create_habit(self.user)
+
+    def completion_reads(self, context):
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and '"habits_habitcompletion"' in query["sql"]
+        ]
+
+    def test_completion_does_not_read_history(self):
+        complete(self.habit, 1)
+
+        with CaptureQueriesContext(connection) as context:
+            completion = complete(self.habit, 2)
+
+        self.assertEqual(self.completion_reads(context), [])
+        self.assertEqual(completion.completed_at, at(2))
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.last_completed_at, at(2))
+
+    def test_rejection_does_not_read_history(self):
+        complete(self.habit, 1)
+
+        with CaptureQueriesContext(connection) as context:
+            with self.assertRaises(ValidationError):
+                complete(self.habit, 1, 18)
+
+        self.assertEqual(self.completion_reads(context), [])
+        self.assertEqual(self.habit.completions.count(), 1)
+
+    def test_validators_use_locked_row(self):
+        """Устаревший экземпляр привычки не обходит проверку"""
+        stale = Habit.objects.get(pk=self.habit.pk)
+        complete(self.habit, 1)
+
+        with frozen_now(at(1, 18)):
+            with self.assertRaises(ValidationError):
+                HabitCompletion.objects.create(habit=stale)
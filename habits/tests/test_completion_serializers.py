@@ -1,7 +1,8 @@
 from datetime import datetime, time
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
 
 from habits.models import Habit, HabitCompletion
 from habits.serializers import HabitCompletionSerializer
@@ -71,3 +72,72 @@ class HabitCompletionSerializerTest(TestCase):
         )
 
         self.assertFalse(serializer.is_valid())
+
+
+class CompletionOwnershipQueriesTest(TestCase):
+    """Проверка владельца по id, без запроса на каждую запись"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="owner", password="pass12345")
+        cls.other = User.objects.create_user(username="other", password="pass12345")
+        cls.habits = Habit.objects.bulk_create(
+            Habit(
+                user=cls.user,
+                place="Дом",
+                time=time(9, 0),
+                action=f"Привычка {index}",
+                duration=60,
+            )
+            for index in range(10)
+        )
+        cls.foreign = Habit.objects.create(
+            user=cls.other, place="Дом", time=time(9, 0), action="Чужая", duration=60
+        )
+
+    def context(self):
+        request = RequestFactory().post("/")
+        request.user = self.user
+        return {"request": request}
+
+    def test_bulk_validation_single_query(self):
+        data = [{"habit": habit.pk, "is_completed": True} for habit in self.habits]
+        serializer = HabitCompletionSerializer(
+            data=data, many=True, context=self.context()
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_foreign_habit_rejected(self):
+        data = [{"habit": self.habits[0].pk}, {"habit": self.foreign.pk}]
+        serializer = HabitCompletionSerializer(
+            data=data, many=True, context=self.context()
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertIn("habit", serializer.errors[1])
+
+        single = HabitCompletionSerializer(
+            data={"habit": self.foreign.pk}, context=self.context()
+        )
+        self.assertFalse(single.is_valid())
+        self.assertIn("habit", single.errors)
+
+    def test_list_and_detail_without_lazy_loads(self):
+        HabitCompletion.objects.bulk_create(
+            HabitCompletion(habit=habit) for habit in self.habits
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        # Страница списка: count + выборка, независимо от числа записей
+        with self.assertNumQueries(2):
+            response = client.get("/api/completions/")
+        self.assertEqual(response.status_code, 200)
+
+        completion = HabitCompletion.objects.filter(habit=self.habits[0]).first()
+        with self.assertNumQueries(1):
+            response = client.get(f"/api/completions/{completion.pk}/")
+        self.assertEqual(response.status_code, 200)
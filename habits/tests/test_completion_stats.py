@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+from habits.views import _calculate_completion_stats
+
+User = get_user_model()
+
+
+class CompletionStatsQueriesTestCase(TestCase):
+    """Статистика выполнения не зависит по запросам от числа привычек"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="stats", password="pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def add_habits(self, count):
+        for index in range(count):
+            habit = create_habit(
+                self.user,
+                f"Привычка {index}",
+                frequency="weekly" if index % 2 else "daily",
+            )
+            complete(habit, 1)
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        return len(context)
+
+    def test_single_query(self):
+        """Вся статистика по привычкам собирается одним запросом"""
+        self.add_habits(5)
+
+        with self.assertNumQueries(1):
+            stats = _calculate_completion_stats(self.user)
+
+        self.assertEqual(len(stats["by_habit"]), 5)
+        self.assertEqual(stats["total_completed"], 5)
+        self.assertEqual(stats["by_frequency"]["daily"]["count"], 3)
+        self.assertEqual(stats["by_frequency"]["weekly"]["completed"], 2)
+
+    def test_stats_endpoint_query_count_is_constant(self):
+        """Число запросов эндпоинта не растет вместе с числом привычек"""
+
+        def request():
+            response = self.client.get("/api/completions/stats/")
+            self.assertEqual(response.status_code, 200)
+
+        self.add_habits(1)
+        baseline = self.count_queries(request)
+
+        self.add_habits(20)
+        self.assertEqual(self.count_queries(request), baseline)
+
+
+class DashboardStatsCacheTestCase(TestCase):
+    """Дашборд: два запроса на расчет и кэш до нового выполнения"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="dash", password="pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.habits = [
+            create_habit(self.user, f"Привычка {index}") for index in range(3)
+        ]
+        self.now = at(10, 12)
+
+    def stats(self):
+        with frozen_now(self.now):
+            response = self.client.get("/api/completions/stats/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sections(self):
+        """Сводка, неделя и списки собираются из одной выборки"""
+        complete(self.habits[0], 5)
+        complete(self.habits[1], 9)
+        complete(self.habits[1], 10)
+
+        with self.assertNumQueries(2):
+            data = self.stats()
+
+        self.assertEqual(data["summary"]["total_habits"], 3)
+        self.assertEqual(data["summary"]["completions_today"], 1)
+        self.assertEqual(
+            [row["count"] for row in data["weekly_completions"]], [1, 1, 1]
+        )
+        self.assertEqual(data["successful_habits"][0]["id"], self.habits[1].pk)
+        self.assertEqual(
+            [row["id"] for row in data["attention_needed"]], [self.habits[0].pk]
+        )
+        self.assertEqual(data["current_streak"], 2)
+
+    def test_cached_until_new_completion(self):
+        """Повторный запрос идет из кэша, новое выполнение его сбрасывает"""
+        self.stats()
+        with self.assertNumQueries(0):
+            self.stats()
+
+        complete(self.habits[2], 10, 12)
+
+        self.assertEqual(self.stats()["summary"]["completions_today"], 1)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from habits.models import DailyHabitStats, HabitCompletion
+from habits.services import calculate_user_streak, completion_created
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class DailyHabitStatsTestCase(TestCase):
+    """Инкрементальная поддержка дневных агрегатов выполнений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rollup", password="pass123")
+        self.habit = create_habit(self.user)
+
+    def test_completion_increments_rollup(self):
+        """Выполнение создает строку агрегата за свой день"""
+        complete(self.habit, 1)
+
+        stats = DailyHabitStats.objects.get(habit=self.habit)
+        self.assertEqual(stats.user, self.user)
+        self.assertEqual(stats.date, at(1).date())
+        self.assertEqual(stats.count, 1)
+
+    def test_delete_decrements_rollup(self):
+        """Удаление выполнения вычитается из агрегата"""
+        completion = complete(self.habit, 1)
+        completion.delete()
+
+        self.assertFalse(DailyHabitStats.objects.exists())
+
+    def test_delete_one_of_two_same_day(self):
+        """Удаление одного из двух выполнений дня оставляет строку со счетчиком 1"""
+        first = complete(self.habit, 1, 9)
+        # Второе выполнение в тот же день — в обход проверки периодичности
+        second = HabitCompletion(habit=self.habit, completed_at=at(1, 18))
+        with frozen_now(at(1, 18)):
+            HabitCompletion.objects.bulk_create([second])
+            completion_created(second)
+
+        first.delete()
+
+        stats = DailyHabitStats.objects.get(habit=self.habit)
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(HabitCompletion.objects.count(), 1)
+
+    def test_backfill_matches_incremental(self):
+        """Команда пересборки дает тот же результат, что и сигналы"""
+        for day in (1, 2, 3):
+            complete(self.habit, day)
+        expected = list(
+            DailyHabitStats.objects.order_by("date").values_list("date", "count")
+        )
+
+        DailyHabitStats.objects.all().delete()
+        call_command("backfill_daily_stats", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(
+            list(DailyHabitStats.objects.order_by("date").values_list("date", "count")),
+            expected,
+        )
+
+    def test_streak_reads_rollup(self):
+        """Серия считается по дням агрегата"""
+        for day in (1, 3, 4, 5):
+            complete(self.habit, day)
+
+        with frozen_now(at(5, 12)):
+            self.assertEqual(calculate_user_streak(self.user), 3)
@@ -0,0 +1,130 @@
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from habits.models import ExportJob
+from habits.tasks import ExportJobTask, run_export_job
+from habits.tests.helpers import complete, create_habit
+
+User = get_user_model()
+
+
+class ExportJobTestCase(TestCase):
+    """Фоновые выгрузки: очередь, выполнение и скачивание"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.user = User.objects.create_user(username="jobs", password="pass123")
+        habit = create_habit(self.user)
+        for day in (1, 2):
+            complete(habit, day)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_job(self, **data):
+        with patch("habits.views.run_export_job.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post("/api/exports/", data, format="json")
+        return response, delay
+
+    def test_create_enqueues_task(self):
+        response, delay = self.create_job(scope="completions", format="csv")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], ExportJob.STATUS_PENDING)
+        delay.assert_called_once_with(response.data["id"])
+
+    def test_duplicate_active_job_is_reused(self):
+        first, _ = self.create_job(scope="habits", format="json")
+        second, delay = self.create_job(scope="habits", format="json")
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data["id"], first.data["id"])
+        delay.assert_not_called()
+
+    def test_task_writes_compressed_file(self):
+        response, _ = self.create_job(scope="completions", format="csv", compress=True)
+        run_export_job(response.data["id"])
+
+        job = ExportJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual((job.rows_total, job.rows_written, job.progress), (2, 2, 100))
+
+        download = self.client.get(f"/api/exports/{job.pk}/download/")
+        self.assertEqual(download.status_code, 200)
+        content = gzip.decompress(b"".join(download.streaming_content)).decode()
+        self.assertEqual(len(content.strip().splitlines()), 3)
+
+        detail = self.client.get(f"/api/exports/{job.pk}/")
+        self.assertTrue(detail.data["download_url"].endswith("/download/"))
+
+    def test_task_runs_once(self):
+        response, _ = self.create_job(scope="habits", format="csv")
+        run_export_job(response.data["id"])
+
+        self.assertIn("skipped", run_export_job(response.data["id"]))
+
+    def test_download_before_ready(self):
+        response, _ = self.create_job(scope="habits", format="csv")
+
+        download = self.client.get(f"/api/exports/{response.data['id']}/download/")
+        self.assertEqual(download.status_code, 409)
+
+    def test_other_users_jobs_are_hidden(self):
+        response, _ = self.create_job(scope="habits", format="csv")
+        other = User.objects.create_user(username="stranger", password="pass123")
+        self.client.force_authenticate(user=other)
+
+        detail = self.client.get(f"/api/exports/{response.data['id']}/")
+        self.assertEqual(detail.status_code, 404)
+
+    def test_json_rows_exclude_header_and_footer(self):
+        response, _ = self.create_job(scope="completions", format="json")
+        run_export_job(response.data["id"])
+
+        job = ExportJob.objects.get(pk=response.data["id"])
+        self.assertEqual((job.rows_total, job.rows_written), (2, 2))
+
+    def test_stale_running_job_is_not_reused(self):
+        first, _ = self.create_job(scope="habits", format="csv")
+        ExportJob.objects.filter(pk=first.data["id"]).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+
+        with override_settings(EXPORT_JOB_TIMEOUT=30 * 60):
+            second, delay = self.create_job(scope="habits", format="csv")
+
+        self.assertEqual(second.status_code, 202)
+        self.assertNotEqual(second.data["id"], first.data["id"])
+        delay.assert_called_once_with(second.data["id"])
+        stale = ExportJob.objects.get(pk=first.data["id"])
+        self.assertEqual(stale.status, ExportJob.STATUS_FAILED)
+        self.assertIsNotNone(stale.finished_at)
+
+    def test_task_failure_marks_job_failed(self):
+        response, _ = self.create_job(scope="habits", format="csv")
+        ExportJob.objects.filter(pk=response.data["id"]).update(
+            status=ExportJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+
+        ExportJobTask().on_failure(
+            MemoryError(), "task-id", (response.data["id"],), {}, None
+        )
+
+        job = ExportJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertEqual(job.error_message, "MemoryError")
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits import exports
+from habits.models import HabitCompletion
+from habits.tests.helpers import complete, create_habit
+
+User = get_user_model()
+
+
+class StreamingExportTestCase(TestCase):
+    """Потоковая выгрузка привычек и полной истории выполнений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="export", password="pass123")
+        self.habit = create_habit(self.user)
+        for day in (1, 2, 3):
+            complete(self.habit, day, note=f"день {day}")
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, query):
+        response = self.client.get(f"/api/completions/export/?{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_habits_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export("format=csv"))))
+
+        self.assertEqual(rows[0], exports.HABIT_CSV_HEADER)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][-1], "3")
+
+    def test_habits_json_limits_nested_completions(self):
+        with patch.object(exports, "HABIT_EXPORT_COMPLETIONS", 2):
+            data = json.loads(self.export("format=json"))
+
+        self.assertEqual(data["user"]["username"], "export")
+        (habit,) = data["habits"]
+        self.assertEqual(habit["completions_total"], 3)
+        self.assertEqual(
+            [item["note"] for item in habit["completions"]], ["день 3", "день 2"]
+        )
+
+    def test_completions_history_csv(self):
+        """Вся история, а не последние записи"""
+        rows = list(
+            csv.reader(io.StringIO(self.export("format=csv&scope=completions")))
+        )
+
+        self.assertEqual(rows[0], exports.COMPLETION_CSV_HEADER)
+        self.assertEqual([row[-1] for row in rows[1:]], ["день 1", "день 2", "день 3"])
+
+    def test_completions_history_json(self):
+        data = json.loads(self.export("format=json&scope=completions"))
+
+        self.assertEqual(len(data["completions"]), 3)
+        self.assertEqual(data["completions"][0]["action"], "Зарядка")
+
+    def test_empty_history_is_valid_json(self):
+        HabitCompletion.objects.all().delete()
+        data = json.loads(self.export("format=json&scope=completions"))
+        self.assertEqual(data["completions"], [])
+
+    def test_unsupported_format(self):
+        response = self.client.get("/api/completions/export/?format=xml")
+        self.assertEqual(response.status_code, 400)
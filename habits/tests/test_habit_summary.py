@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits import views
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class HabitSummaryTestCase(TestCase):
+    """Список привычек отдает сводку вместо всей истории выполнений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="summary", password="pass123")
+        self.habit = create_habit(self.user)
+        for day in (1, 2, 3):
+            complete(self.habit, day)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_habit(self, query=""):
+        with frozen_now(at(3, 12)):
+            response = self.client.get(f"/api/habits/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"][0]
+
+    def test_list_returns_summary(self):
+        """Без expand — счетчики вместо вложенных выполнений"""
+        data = self.get_habit()
+
+        self.assertNotIn("completions", data)
+        self.assertEqual(data["completion_count"], 3)
+        self.assertEqual(data["current_streak"], 3)
+        self.assertEqual(data["longest_streak"], 3)
+        self.assertIsNotNone(data["last_completed_at"])
+
+    def test_expand_completions_is_windowed(self):
+        """expand=completions отдает только последние выполнения"""
+        with patch.object(views, "EXPANDED_COMPLETIONS_LIMIT", 2):
+            data = self.get_habit("?expand=completions")
+
+        expected = self.habit.completions.order_by("-completed_at")[:2]
+        self.assertEqual(
+            [item["id"] for item in data["completions"]],
+            [completion.id for completion in expected],
+        )
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits.models import Habit, HabitCompletion
+from habits.tests.helpers import at, complete, create_habit
+
+User = get_user_model()
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Опциональная keyset-пагинация (?pagination=cursor)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="cursor", password="pass123")
+        created = at(1)
+        self.habits = []
+        for index in range(7):
+            self.habits.append(
+                create_habit(self.user, f"Привычка {index}", is_public=True)
+            )
+        # Одинаковое время создания у части привычек — порядок решает id
+        Habit.objects.filter(pk__in=[h.pk for h in self.habits[:4]]).update(
+            created_at=created
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url):
+        """Пройти все страницы по ссылкам next"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def expected_ids(self):
+        return list(
+            Habit.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def test_habits_cursor_walks_all_pages(self):
+        """Страницы идут по (created_at, id) без пропусков и повторов"""
+        ids = self.walk("/api/habits/?pagination=cursor&page_size=3")
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_public_cursor(self):
+        """Публичная лента поддерживает тот же режим"""
+        ids = self.walk("/api/habits/public/?pagination=cursor&page_size=2")
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_page_number_is_default(self):
+        """Без параметра остается постраничная пагинация с count"""
+        response = self.client.get("/api/habits/")
+        self.assertEqual(response.data["count"], 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/habits/?pagination=cursor&cursor=broken")
+        self.assertEqual(response.status_code, 404)
+
+    def test_completions_cursor(self):
+        """Лента выполнений листается по (completed_at, id)"""
+        habit = self.habits[0]
+        for day in (1, 2, 3):
+            complete(habit, day)
+
+        ids = self.walk("/api/completions/?pagination=cursor&page_size=2")
+        expected = list(
+            HabitCompletion.objects.order_by("-completed_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(ids, expected)
+
+
+class HabitFeedBranchesTestCase(TestCase):
+    """Лента «свои + публичные» читается двумя ветками без DISTINCT"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="pass123")
+        self.other = User.objects.create_user(username="author", password="pass123")
+        for index in range(12):
+            # Чередуем свои (в том числе публичные) и чужие привычки
+            create_habit(
+                self.user if index % 3 == 0 else self.other,
+                f"Привычка {index}",
+                is_public=index % 2 == 0,
+            )
+        create_habit(self.other, "Чужая приватная")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def expected_ids(self):
+        visible = Habit.objects.filter(user=self.user) | Habit.objects.filter(
+            is_public=True
+        )
+        return list(visible.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def test_cursor_merges_branches(self):
+        """Страницы сливают ветки по (created_at, id) без повторов"""
+        ids = []
+        url = "/api/habits/?pagination=cursor&page_size=4&expand=completions"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_list_has_no_distinct(self):
+        with self.assertNumQueries(2) as context:
+            self.client.get("/api/habits/")
+        self.assertNotIn("DISTINCT", context.captured_queries[-1]["sql"])
+
+    def test_benchmark_command(self):
+        """Бенчмарк выводит перцентили и не оставляет данных"""
+        out = StringIO()
+        habits = Habit.objects.count()
+
+        call_command(
+            "benchmark_habit_list", sizes="10,50", requests=3, pages=2, stdout=out
+        )
+
+        self.assertIn("p95 50 / 10", out.getvalue())
+        self.assertEqual(Habit.objects.count(), habits)
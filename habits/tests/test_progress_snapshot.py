@@ -0,0 +1,84 @@
+from datetime import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits import services
+from habits.models import HabitProgress
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class HabitProgressSnapshotTestCase(TestCase):
+    """Снимок прогресса обновляется при записи выполнений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="progress", password="pass123")
+        self.habit = create_habit(self.user, time=time(7, 0))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def snapshot(self, habit=None):
+        return HabitProgress.objects.get(habit=habit or self.habit)
+
+    def test_histogram_and_median(self):
+        """Часы выполнений попадают в корзины, медиана — по гистограмме"""
+        for day, hour in ((1, 7), (2, 7), (3, 8), (4, 21)):
+            complete(self.habit, day, hour)
+
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.total_completions, 4)
+        self.assertEqual(
+            (snapshot.hour_histogram[7], snapshot.hour_histogram[8]), (2, 1)
+        )
+        # sorted([7, 7, 8, 21])[2] == 8
+        self.assertEqual(snapshot.median_hour, 8)
+
+    def test_delete_decrements(self):
+        """Удаление выполнения вычитается из снимка"""
+        complete(self.habit, 1, 7)
+        complete(self.habit, 2, 8).delete()
+
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.total_completions, 1)
+        self.assertEqual(snapshot.hour_histogram[8], 0)
+        self.assertEqual(snapshot.median_hour, 7)
+
+    def test_bulk_complete_updates_snapshots(self):
+        """Массовое выполнение обновляет снимки всех привычек"""
+        other = create_habit(self.user, "Чтение", time=time(7, 0))
+        complete(self.habit, 1, 9)
+
+        with frozen_now(at(3, 10)):
+            successes, errors = services.bulk_complete(
+                self.user, [self.habit.pk, other.pk]
+            )
+
+        self.assertEqual((len(successes), errors), (2, []))
+        self.assertEqual(self.snapshot().total_completions, 2)
+        self.assertEqual(self.snapshot(other).hour_histogram[10], 1)
+
+    def test_endpoint_reads_snapshot(self):
+        """Эндпоинт отдает данные снимка двумя запросами"""
+        for day in (1, 2, 4):
+            complete(self.habit, day, 7)
+
+        with frozen_now(at(4, 12)):
+            with self.assertNumQueries(2):
+                response = self.client.get(f"/api/habits/{self.habit.pk}/progress/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["completions"]["total"], 3)
+        self.assertEqual(response.data["completions"]["recent_30_days"], 3)
+        self.assertEqual(response.data["time_analysis"]["median_hour"], 7)
+        self.assertEqual(len(response.data["weekly_data"]), 3)
+
+    def test_endpoint_without_completions(self):
+        """Привычка без выполнений отдает пустой прогресс"""
+        response = self.client.get(f"/api/habits/{self.habit.pk}/progress/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["completions"]["total"], 0)
+        self.assertIsNone(response.data["time_analysis"]["median_hour"])
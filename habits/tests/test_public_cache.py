@@ -0,0 +1,98 @@
+from datetime import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits.cache import public_feed_stats
+from habits.models import Habit
+from habits.views import HabitViewSet
+
+User = get_user_model()
+
+
+class PublicFeedCacheTestCase(TestCase):
+    """Кэш публичной ленты и его сброс по событиям"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="feed", password="pass123")
+        self.habit = self.create_habit(is_public=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_habit(self, is_public):
+        return Habit.objects.create(
+            user=self.user,
+            place="Парк",
+            time=time(7, 0),
+            action="Бег",
+            duration=60,
+            is_public=is_public,
+        )
+
+    def feed_ids(self):
+        response = self.client.get("/api/habits/public/?page_size=50")
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_repeated_request_is_served_from_cache(self):
+        """Повторный запрос не обращается к базе"""
+        self.feed_ids()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.feed_ids(), [self.habit.pk])
+        self.assertEqual(public_feed_stats(), {"hits": 1, "misses": 1})
+
+    def test_pages_are_cached_separately(self):
+        """Параметры запроса входят в ключ"""
+        self.feed_ids()
+        response = self.client.get("/api/habits/public/?page_size=1")
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(public_feed_stats()["misses"], 2)
+
+    def test_private_habit_does_not_invalidate(self):
+        """Новая приватная привычка не сбрасывает кэш"""
+        self.feed_ids()
+        self.create_habit(is_public=False)
+
+        with self.assertNumQueries(0):
+            self.feed_ids()
+
+    def test_toggle_public_invalidates(self):
+        self.feed_ids()
+        self.client.patch(f"/api/habits/{self.habit.pk}/toggle_public/")
+
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_toggle_public_keeps_streak_counters(self):
+        """Переключение не перезаписывает счетчики серии устаревшим экземпляром"""
+        stale = Habit.objects.get(pk=self.habit.pk)
+        Habit.objects.filter(pk=self.habit.pk).update(current_streak=5)
+
+        with patch.object(HabitViewSet, "get_object", return_value=stale):
+            self.client.patch(f"/api/habits/{self.habit.pk}/toggle_public/")
+
+        self.habit.refresh_from_db()
+        self.assertFalse(self.habit.is_public)
+        self.assertEqual(self.habit.current_streak, 5)
+
+    def test_delete_invalidates(self):
+        self.feed_ids()
+        self.habit.delete()
+
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_bulk_update_public_invalidates(self):
+        private = self.create_habit(is_public=False)
+        self.feed_ids()
+
+        response = self.client.patch(
+            "/api/habits/bulk_update_public/",
+            {"habit_ids": [private.pk], "is_public": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertCountEqual(self.feed_ids(), [self.habit.pk, private.pk])
@@ -0,0 +1,54 @@
+from django.test import TestCase
+
+from habits.tests.query_budget import Endpoint, QueryBudgetMixin, budget_test
+
+ENDPOINTS = {
+    "habits.list": Endpoint("habits.list", lambda f: "/api/habits/?page_size=50"),
+    "habits.list.expand": Endpoint(
+        "habits.list.expand",
+        lambda f: "/api/habits/?page_size=50&expand=completions",
+    ),
+    "habits.retrieve": Endpoint(
+        "habits.retrieve", lambda f: f"/api/habits/{f['habit'].pk}/"
+    ),
+    "habits.public": Endpoint("habits.public", lambda f: "/api/habits/public/"),
+    "habits.my_habits": Endpoint(
+        "habits.my_habits", lambda f: "/api/habits/my_habits/"
+    ),
+    "habits.progress": Endpoint(
+        "habits.progress", lambda f: f"/api/habits/{f['habit'].pk}/progress/"
+    ),
+    "completions.stats": Endpoint(
+        "completions.stats", lambda f: "/api/completions/stats/"
+    ),
+    "completions.export": Endpoint(
+        "completions.export", lambda f: "/api/completions/export/?format=json"
+    ),
+    "completions.export.history": Endpoint(
+        "completions.export.history",
+        lambda f: "/api/completions/export/?format=csv&scope=completions",
+    ),
+    "completions.bulk_complete": Endpoint(
+        "completions.bulk_complete",
+        lambda f: "/api/completions/bulk_complete/",
+        method="post",
+        data=lambda f: {"habit_ids": [habit.pk for habit in f["habits"]]},
+    ),
+}
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Число запросов эндпоинтов не зависит от количества привычек"""
+
+    test_habits_list = budget_test(ENDPOINTS["habits.list"])
+    test_habits_list_expand = budget_test(ENDPOINTS["habits.list.expand"])
+    test_habits_retrieve = budget_test(ENDPOINTS["habits.retrieve"])
+    test_habits_public = budget_test(ENDPOINTS["habits.public"])
+    test_habits_my_habits = budget_test(ENDPOINTS["habits.my_habits"])
+    test_habits_progress = budget_test(ENDPOINTS["habits.progress"])
+    test_completions_stats = budget_test(ENDPOINTS["completions.stats"])
+    test_completions_export = budget_test(ENDPOINTS["completions.export"])
+    test_completions_export_history = budget_test(
+        ENDPOINTS["completions.export.history"]
+    )
+    test_completions_bulk_complete = budget_test(ENDPOINTS["completions.bulk_complete"])
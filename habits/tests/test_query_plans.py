@@ -0,0 +1,64 @@
+from datetime import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from habits.models import Habit
+from habits.query_plans import check_query_plans, full_scans
+from telegram_bot.models import TelegramConnectionCode, TelegramUser
+
+User = get_user_model()
+
+
+class QueryPlansTestCase(TestCase):
+    """Критичные запросы обслуживаются индексами"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(20):
+            user = User.objects.create_user(username=f"plan{index}", password="pass")
+            TelegramUser.objects.create(django_user=user, telegram_id=1000 + index)
+            TelegramConnectionCode.objects.create(django_user=user)
+            for number in range(5):
+                Habit.objects.create(
+                    user=user,
+                    place="Дом",
+                    time=time(9, number),
+                    action=f"Привычка {number}",
+                    duration=60,
+                    is_public=bool(number % 2),
+                )
+        cls.user = User.objects.get(username="plan0")
+
+    def test_no_full_scans(self):
+        """Ни один план не читает таблицу целиком"""
+        results = check_query_plans(user_id=self.user.pk)
+
+        self.assertTrue(results)
+        for name, (plan, scans) in results.items():
+            self.assertEqual(scans, [], f"{name}:\n{plan}")
+
+    def test_command(self):
+        """Команда завершается успешно и печатает все запросы"""
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+
+        self.assertIn("habits.public_feed", out.getvalue())
+        self.assertIn("telegram.user_by_chat", out.getvalue())
+
+    def test_full_scan_detection(self):
+        """Полный просмотр распознается в планах PostgreSQL и SQLite"""
+        postgres_plan = (
+            "Limit\n"
+            "  ->  Seq Scan on habits_habit  (cost=0.00..1.05 rows=5)\n"
+            "  ->  Index Scan using habit_user_created_idx on habits_habit"
+        )
+        sqlite_plan = (
+            "4 0 0 SCAN habits_habit\n"
+            "5 0 0 SCAN habits_habitcompletion USING INDEX completion_keyset_idx"
+        )
+
+        self.assertEqual(full_scans(postgres_plan, "postgresql"), ["habits_habit"])
+        self.assertEqual(full_scans(sqlite_plan, "sqlite"), ["habits_habit"])
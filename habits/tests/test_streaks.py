@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from habits import services
+from habits.models import HabitCompletion, UserStreak
+from habits.services import calculate_user_streak
+from habits.tests.helpers import at, complete, create_habit, frozen_now
+
+User = get_user_model()
+
+
+class StreakCountersTestCase(TestCase):
+    """Серии хранятся счетчиками и обновляются при записи выполнений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="streaks", password="pass123")
+        self.habit = create_habit(self.user)
+
+    def counters(self):
+        self.habit.refresh_from_db()
+        streak = UserStreak.objects.get(user=self.user)
+        return (
+            self.habit.current_streak,
+            self.habit.longest_streak,
+            streak.current_streak,
+            streak.longest_streak,
+        )
+
+    def test_consecutive_days_extend_streak(self):
+        """Каждый следующий день увеличивает серию"""
+        complete(self.habit, 1)
+        complete(self.habit, 2)
+        complete(self.habit, 3, 18)
+
+        self.assertEqual(self.counters(), (3, 3, 3, 3))
+        self.assertEqual(self.habit.last_completed_at, at(3, 18))
+
+    def test_gap_resets_current_streak(self):
+        """Пропуск дня начинает серию заново, лучшая серия сохраняется"""
+        for day in (1, 2, 3, 5):
+            complete(self.habit, day)
+
+        self.assertEqual(self.counters(), (1, 3, 1, 3))
+
+    def test_backdated_completion_recomputes(self):
+        """Выполнение задним числом закрывает разрыв в серии"""
+        for day in (1, 3, 4):
+            complete(self.habit, day)
+        # Валидация модели и auto_now_add не дают записать прошлую дату
+        completion = HabitCompletion.objects.bulk_create(
+            [HabitCompletion(habit=self.habit)]
+        )[0]
+        HabitCompletion.objects.filter(pk=completion.pk).update(completed_at=at(2))
+        completion.completed_at = at(2)
+        services.completion_created(completion)
+
+        self.assertEqual(self.counters(), (4, 4, 4, 4))
+        self.assertEqual(self.habit.last_completed_at, at(4))
+
+    def test_user_streak_spans_habits(self):
+        """Серия пользователя учитывает выполнения любых привычек"""
+        other = create_habit(self.user, "Чтение")
+        complete(self.habit, 1)
+        complete(other, 2)
+        complete(self.habit, 3)
+
+        self.assertEqual(self.counters(), (1, 1, 3, 3))
+
+    def test_delete_recomputes_streak(self):
+        """Удаление выполнения пересчитывает серии"""
+        complete(self.habit, 1)
+        middle = complete(self.habit, 2)
+        complete(self.habit, 3)
+        middle.delete()
+
+        self.assertEqual(self.counters(), (1, 1, 1, 1))
+
+    def test_habit_delete_recomputes_user_streak(self):
+        """Удаление привычки убирает ее дни из серии пользователя"""
+        other = create_habit(self.user, "Чтение")
+        complete(self.habit, 1)
+        complete(other, 2)
+        other.delete()
+
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual((streak.current_streak, streak.longest_streak), (1, 1))
+
+    def test_stale_streak_is_not_current(self):
+        """Серия обнуляется при чтении, если вчера ничего не выполнялось"""
+        for day in (1, 2):
+            complete(self.habit, day)
+
+        with frozen_now(at(3, 12)):
+            self.assertEqual(calculate_user_streak(self.user), 2)
+        with frozen_now(at(5, 12)):
+            self.assertEqual(calculate_user_streak(self.user), 0)
+
+    def test_progress_uses_stored_streaks(self):
+        """Эндпоинт прогресса отдает сохраненные серии привычки"""
+        for day in (1, 2, 4):
+            complete(self.habit, day)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with frozen_now(at(4, 12)):
+            response = client.get(f"/api/habits/{self.habit.pk}/progress/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["streak"], {"current": 1, "longest": 2})
@@ -0,0 +1,174 @@
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.tasks import send_habit_reminders
+from telegram_bot.delivery import DeliveryResult
+from telegram_bot.models import NotificationSettings, SentNotification, TelegramUser
+
+User = get_user_model()
+
+NOW = timezone.make_aware(datetime(2026, 3, 2, 8, 2))
+
+
+def deliver_all(messages):
+    return [DeliveryResult(message=m, ok=True) for m in messages]
+
+
+@patch("habits.tasks.timezone.now", return_value=NOW)
+@patch("habits.tasks.TelegramBotService.send_messages", side_effect=deliver_all)
+class SendHabitRemindersTestCase(TestCase):
+    """Тесты расписания напоминаний по next_reminder_at"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reminder", password="pass123")
+        self.telegram_user = TelegramUser.objects.create(
+            django_user=self.user, telegram_id=1001
+        )
+        # Часы пользователя совпадают с серверными, напоминание — в срок
+        self.settings = NotificationSettings.objects.create(
+            telegram_user=self.telegram_user, timezone="UTC", remind_before_minutes=0
+        )
+
+    def _habit(self, hour, minute, user=None):
+        return Habit.objects.create(
+            user=user or self.user,
+            place="Дом",
+            time=time(hour, minute),
+            action=f"Привычка {hour}:{minute}",
+            duration=60,
+        )
+
+    def test_next_reminder_follows_time(self, send_messages, _now):
+        """Следующее напоминание пересчитывается при изменении времени"""
+        habit = self._habit(8, 3)
+        self.assertEqual(habit.next_reminder_at, NOW.replace(minute=3))
+
+        habit.time = time(21, 30)
+        habit.save(update_fields=["time"])
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(hour=21, minute=30))
+
+    def test_only_habits_in_window_are_reminded(self, send_messages, _now):
+        """Напоминания уходят только для привычек текущего окна"""
+        due = self._habit(8, 4)
+        self._habit(8, 5)
+        self._habit(7, 59)
+
+        result = send_habit_reminders()
+
+        self.assertEqual(result, "Sent 1 habit reminders")
+        (messages,), _ = send_messages.call_args
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].chat_id, 1001)
+        self.assertEqual(messages[0].context, (self.telegram_user, due))
+
+    def test_reminder_is_sent_once_per_day(self, send_messages, _now):
+        """Повторный запуск в тот же день не дублирует напоминание"""
+        self._habit(8, 4)
+
+        send_habit_reminders()
+        send_habit_reminders()
+
+        self.assertEqual(SentNotification.objects.count(), 1)
+        (messages,), _ = send_messages.call_args
+        self.assertEqual(messages, [])
+
+    def test_disabled_settings_are_skipped(self, send_messages, _now):
+        """Пользователи с выключенными напоминаниями пропускаются"""
+        NotificationSettings.objects.update(enable_habit_reminders=False)
+        self._habit(8, 1)
+
+        send_habit_reminders()
+
+        self.assertEqual(send_messages.call_args.args[0], [])
+
+    def test_selection_is_single_query(self, send_messages, _now):
+        """Выборка не зависит от общего числа привычек"""
+        for minute in range(0, 60, 5):
+            self._habit(9, minute)
+        self._habit(8, 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            send_habit_reminders()
+
+        # выборка + перенос напоминаний + запись в историю (без savepoint теста)
+        statements = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 3, statements)
+
+    def test_sent_reminder_moves_to_next_day(self, send_messages, _now):
+        """После отправки напоминание переносится на следующее срабатывание"""
+        habit = self._habit(8, 4)
+
+        send_habit_reminders()
+
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(day=3, minute=4))
+
+    def test_reminder_is_claimed_before_sending(self, send_messages, _now):
+        """Напоминание переносится до отправки: сбой доставки не вызывает повтор"""
+        habit = self._habit(8, 4)
+        send_messages.side_effect = OSError
+
+        with self.assertRaises(OSError):
+            send_habit_reminders()
+
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(day=3, minute=4))
+
+    def test_user_timezone_and_offset(self, send_messages, _now):
+        """Время привычки — по часам пользователя, с отступом remind_before"""
+        self.settings.timezone = "Asia/Vladivostok"  # UTC+10
+        self.settings.remind_before_minutes = 15
+        self.settings.save()
+        habit = self._habit(18, 18)
+
+        # 18:18 во Владивостоке за 15 минут = 08:03 UTC
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(minute=3))
+        self.assertEqual(send_habit_reminders(), "Sent 1 habit reminders")
+
+    def test_settings_change_reschedules(self, send_messages, _now):
+        """Смена часового пояса пересчитывает расписание привычек"""
+        habit = self._habit(9, 0)
+
+        self.settings.timezone = "Europe/Moscow"  # UTC+3
+        self.settings.save()
+
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(day=3, hour=6, minute=0))
+
+        self.telegram_user.delete()
+        habit.refresh_from_db()
+        self.assertIsNone(habit.next_reminder_at)
+
+    @override_settings(
+        HABIT_VALIDATION={
+            **settings.HABIT_VALIDATION,
+            "ALLOWED_FREQUENCIES": {"daily": 1, "weekly": 7, "monthly": 30},
+        }
+    )
+    def test_frequency_skips_days(self, send_messages, _now):
+        """Еженедельная привычка после выполнения напоминает через неделю"""
+        habit = self._habit(8, 4)
+        habit.frequency = "weekly"
+        habit.last_completed_at = NOW - timedelta(days=1)
+        habit.save()
+
+        # Отправка из старого расписания пропускается: привычка еще не нужна
+        Habit.objects.filter(pk=habit.pk).update(next_reminder_at=NOW)
+        self.assertEqual(send_habit_reminders(), "Sent 0 habit reminders")
+
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, NOW.replace(day=8, minute=4))
@@ -1,30 +1,43 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import HabitCompletionViewSet, HabitViewSet
+from .views import ExportJobViewSet, HabitCompletionViewSet, HabitViewSet
 
 router = DefaultRouter()
 router.register(r"habits", HabitViewSet, basename="habit")
 router.register(r"completions", HabitCompletionViewSet, basename="completion")
+router.register(r"exports", ExportJobViewSet, basename="export-job")
 
-# Дополнительные маршруты для новых actions
+# Дополнительные маршруты для actions HabitCompletionViewSet
 habit_extra_urls = [
-    path("habits/stats/", HabitViewSet.as_view({"get": "stats"}), name="habit-stats"),
     path(
-        "habits/export/", HabitViewSet.as_view({"get": "export"}), name="habit-export"
+        "habits/stats/",
+        HabitCompletionViewSet.as_view({"get": "stats"}),
+        name="habit-stats",
+    ),
+    path(
+        "habits/<int:pk>/progress/",
+        HabitCompletionViewSet.as_view({"get": "progress"}),
+        name="habit-progress",
+    ),
+    path(
+        "habits/export/",
+        HabitCompletionViewSet.as_view({"get": "export"}),
+        name="habit-export",
     ),
     path(
         "habits/bulk_complete/",
-        HabitViewSet.as_view({"post": "bulk_complete"}),
+        HabitCompletionViewSet.as_view({"post": "bulk_complete"}),
         name="bulk-complete",
     ),
     path(
         "habits/bulk_update_public/",
-        HabitViewSet.as_view({"patch": "bulk_update_public"}),
+        HabitCompletionViewSet.as_view({"patch": "bulk_update_public"}),
         name="bulk-update-public",
     ),
 ]
 
-urlpatterns = [
+# Раньше маршрутов роутера: иначе habits/<pk>/ перехватывает habits/stats/ и т.п.
+urlpatterns = habit_extra_urls + [
     path("", include(router.urls)),
-] + habit_extra_urls
+]
@@ -50,14 +50,13 @@ def validate_habit_consistency(habit):
 
 
 def validate_completion_frequency(habit, completion_date):
-    """Проверка периодичности выполнения"""
+    """Проверка периодичности выполнения (по habit.last_completed_at, без запросов)"""
     max_break_days = settings.HABIT_VALIDATION["MAX_BREAK_DAYS"]
 
-    if not habit.completions.exists():
+    if habit.last_completed_at is None:
         return
 
-    last_completion = habit.completions.latest("completed_at")
-    days_since_last = (completion_date - last_completion.completed_at).days
+    days_since_last = (completion_date - habit.last_completed_at).days
 
     if days_since_last > max_break_days:
         raise ValidationError(
@@ -78,14 +77,13 @@ def validate_frequency_choice(frequency):
 
 def validate_too_frequent_completion(habit, completion_date):
     """Проверка, что привычка не выполняется слишком часто"""
-    if not habit.completions.exists():
+    if habit.last_completed_at is None:
         return
 
     # Получаем минимальный интервал из настроек
     min_interval_days = settings.HABIT_VALIDATION["MIN_FREQUENCY_DAYS"]
 
-    last_completion = habit.completions.latest("completed_at")
-    days_since_last = (completion_date - last_completion.completed_at).days
+    days_since_last = (completion_date - habit.last_completed_at).days
 
     if days_since_last < min_interval_days:
         raise ValidationError(
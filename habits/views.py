@@ -1,27 +1,46 @@
-import csv
-import json
-from datetime import date, datetime, timedelta
-
-from django.db import models
-from django.db.models import Count, DurationField, ExpressionWrapper, F
-from django.http import HttpResponse
+import os
+from datetime import date, timedelta
+
+from django.db import models, transaction
+from django.db.models import Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django_filters import BooleanFilter, DateFilter, NumberFilter
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import permissions, serializers, status, viewsets
+from rest_framework import mixins, permissions, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
-from .models import Habit, HabitCompletion
+from .cache import (
+    get_public_feed,
+    get_user_stats,
+    public_feed_key,
+    set_public_feed,
+    set_user_stats,
+)
+from .exports import ExportContentNegotiation, fail_stale_export_jobs, streaming_export
+from .models import ExportJob, Habit, HabitCompletion, HabitProgress
+from .pagination import CompletionPagination, HabitPagination, StandardPagination
 from .permissions import HabitCompletionPermission, HabitPermission
 from .serializers import (
+    ExportJobSerializer,
     HabitCompletionSerializer,
     HabitSerializer,
     PublicHabitSerializer,
 )
+from .services import (
+    active_streak,
+    bulk_complete,
+    calculate_user_streak,
+    frequency_days,
+    with_completion_totals,
+)
+from .signals import public_habits_changed
+from .tasks import run_export_job
 
 
 def filter_has_completions_today(queryset, name, value):
@@ -105,13 +124,16 @@ class HabitFilter(FilterSet):
         )
 
 
-class StandardPagination(PageNumberPagination):
-    """Кастомная пагинация - 5 привычек на страницу"""
+# Сколько последних выполнений отдавать при ?expand=completions
+EXPANDED_COMPLETIONS_LIMIT = 30
 
-    page_size = 5
-    page_size_query_param = "page_size"
-    max_page_size = 50
-    page_query_param = "page"
+
+def _recent_completions_prefetch():
+    """Последние выполнения каждой привычки одним запросом (оконная выборка)"""
+    recent = HabitCompletion.objects.order_by("-completed_at", "-id")[
+        :EXPANDED_COMPLETIONS_LIMIT
+    ]
+    return Prefetch("completions", queryset=recent, to_attr="recent_completions")
 
 
 class HabitViewSet(viewsets.ModelViewSet):
@@ -133,7 +155,7 @@ class HabitViewSet(viewsets.ModelViewSet):
 
     serializer_class = HabitSerializer  # Основной сериализатор
     permission_classes = [HabitPermission]  # Права доступа
-    pagination_class = StandardPagination  # Пагинация
+    pagination_class = HabitPagination  # Пагинация (?pagination=cursor — keyset)
     filter_backends = [DjangoFilterBackend]  # Фильтрация
     filterset_class = HabitFilter  # Класс фильтров
     ordering_fields = ["time", "created_at"]  # Поля для сортировки
@@ -172,6 +194,15 @@ class HabitViewSet(viewsets.ModelViewSet):
                 description="Фильтр по публичности",
                 type=openapi.TYPE_BOOLEAN,
             ),
+            openapi.Parameter(
+                "expand",
+                openapi.IN_QUERY,
+                description=(
+                    "completions — добавить последние "
+                    f"{EXPANDED_COMPLETIONS_LIMIT} выполнений каждой привычки"
+                ),
+                type=openapi.TYPE_STRING,
+            ),
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -219,19 +250,48 @@ class HabitViewSet(viewsets.ModelViewSet):
 
         if user.is_authenticated:
             # Свои привычки + публичные привычки других пользователей
-            return (
-                Habit.objects.filter(models.Q(user=user) | models.Q(is_public=True))
-                .distinct()
-                .select_related("user", "related_habit")
-                .prefetch_related("completions")
-            )
+            # Строки одной таблицы без join не дублируются — DISTINCT не нужен
+            queryset = Habit.objects.filter(
+                models.Q(user=user) | models.Q(is_public=True)
+            ).select_related("user", "related_habit")
+        else:
+            # Для неаутентифицированных пользователей - только публичные привычки
+            queryset = Habit.objects.filter(is_public=True).select_related("user")
 
-        # Для неаутентифицированных пользователей - только публичные привычки
-        return (
-            Habit.objects.filter(is_public=True)
-            .select_related("user")
-            .prefetch_related("completions")
-        )
+        return self._with_completions(queryset)
+
+    def get_keyset_branches(self, queryset):
+        """Ветки ленты для keyset-пагинации (?pagination=cursor).
+
+        Свои привычки и чужие публичные читаются по своим индексам
+        (habit_user_created_idx и частичный habit_public_created_idx) не
+        дальше одной страницы, поэтому стоимость страницы не зависит от
+        размера публичной ленты.
+        """
+        user = self.request.user
+        if self.action != "list" or not user.is_authenticated:
+            return [queryset]
+        return [
+            queryset.filter(user=user),
+            queryset.filter(is_public=True).exclude(user=user),
+        ]
+
+    def _expand_completions(self):
+        """Запрошена ли история выполнений (?expand=completions)"""
+        expand = self.request.query_params.get("expand", "")
+        return self.request.method == "GET" and "completions" in expand.split(",")
+
+    def _with_completions(self, queryset):
+        """Сводка по выполнениям и, по запросу, последние выполнения"""
+        queryset = with_completion_totals(queryset)
+        if self._expand_completions():
+            queryset = queryset.prefetch_related(_recent_completions_prefetch())
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand_completions"] = self._expand_completions()
+        return context
 
     def perform_create(self, serializer):
         """При создании привычки автоматически устанавливаем владельца"""
@@ -245,7 +305,7 @@ class HabitViewSet(viewsets.ModelViewSet):
         habit = self.get_object()
 
         # Проверяем, что привычка принадлежит пользователю
-        if habit.user != request.user:
+        if habit.user_id != request.user.pk:
             return Response(
                 {"error": "Вы не можете отмечать выполнение чужих привычек."},
                 status=status.HTTP_403_FORBIDDEN,
@@ -282,7 +342,15 @@ class HabitViewSet(viewsets.ModelViewSet):
         """
         Получить только публичные привычки.
         Доступно всем пользователям (включая неаутентифицированных).
+
+        Страницы ленты кэшируются; кэш сбрасывается при изменении
+        публичных привычек (см. habits.signals).
         """
+        cache_key = public_feed_key(request)
+        data = get_public_feed(cache_key)
+        if data is not None:
+            return Response(data)
+
         public_habits = Habit.objects.filter(is_public=True).select_related("user")
 
         # Используем пагинацию
@@ -290,10 +358,12 @@ class HabitViewSet(viewsets.ModelViewSet):
         if page is not None:
             # Используем PublicHabitSerializer который теперь включает is_public
             serializer = PublicHabitSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            data = self.get_paginated_response(serializer.data).data
+        else:
+            data = PublicHabitSerializer(public_habits, many=True).data
 
-        serializer = PublicHabitSerializer(public_habits, many=True)
-        return Response(serializer.data)
+        set_public_feed(cache_key, data)
+        return Response(data)
 
     @action(
         detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
@@ -303,8 +373,10 @@ class HabitViewSet(viewsets.ModelViewSet):
         Получить только свои привычки.
         Только для аутентифицированных пользователей.
         """
-        my_habits = Habit.objects.filter(user=request.user).select_related(
-            "related_habit"
+        my_habits = self._with_completions(
+            Habit.objects.filter(user=request.user).select_related(
+                "user", "related_habit"
+            )
         )
 
         # Используем пагинацию
@@ -327,7 +399,7 @@ class HabitViewSet(viewsets.ModelViewSet):
         habit = self.get_object()
 
         # Проверяем, что пользователь - владелец
-        if habit.user != request.user:
+        if habit.user_id != request.user.pk:
             return Response(
                 {"error": "Вы не можете изменять статус публичности чужих привычек."},
                 status=status.HTTP_403_FORBIDDEN,
@@ -335,7 +407,8 @@ class HabitViewSet(viewsets.ModelViewSet):
 
         # Меняем статус публичности
         habit.is_public = not habit.is_public
-        habit.save()
+        # Только флаг: счетчики серии могли измениться параллельным выполнением
+        habit.save(update_fields=["is_public", "updated_at"])
 
         return Response(
             {
@@ -346,9 +419,56 @@ class HabitViewSet(viewsets.ModelViewSet):
         )
 
 
-def _calculate_completion_stats(user):
+# Сколько дней назад начинается недельная статистика дашборда
+STATS_WEEK_DAYS = 7
+
+# Через сколько дней без выполнений привычка требует внимания
+ATTENTION_AFTER = timedelta(days=3)
+
+
+def _habit_stat_rows(user, today):
+    """Строки статистики по привычкам пользователя одним запросом.
+
+    Кроме общей суммы выполнений из дневных агрегатов каждая строка
+    содержит суммы за последние дни (``day_<n>`` — n дней назад) —
+    условная агрегация вместо отдельного запроса по дням.
+    """
+    by_day = {
+        f"day_{offset}": Coalesce(
+            Sum(
+                "daily_stats__count",
+                filter=Q(daily_stats__date=today - timedelta(days=offset)),
+            ),
+            0,
+        )
+        for offset in range(STATS_WEEK_DAYS + 1)
+    }
+    return list(
+        Habit.objects.filter(user=user)
+        .values(
+            "id",
+            "action",
+            "frequency",
+            "created_at",
+            "is_pleasant",
+            "last_completed_at",
+        )
+        .annotate(completed_total=Coalesce(Sum("daily_stats__count"), 0), **by_day)
+        .order_by("id")
+    )
+
+
+def _calculate_completion_stats(user, rows=None):
     """Рассчет статистики выполнения привычек"""
-    habits = Habit.objects.filter(user=user)
+    # Один запрос: по строке на привычку с суммой выполнений из дневных
+    # агрегатов; цикл ниже только раскладывает результат
+    if rows is None:
+        rows = (
+            Habit.objects.filter(user=user)
+            .values("id", "action", "frequency", "created_at")
+            .annotate(completed_total=Coalesce(Sum("daily_stats__count"), 0))
+            .order_by("id")
+        )
 
     stats = {
         "total_expected": 0,
@@ -357,13 +477,15 @@ def _calculate_completion_stats(user):
         "by_habit": [],
     }
 
-    for habit in habits:
+    now = timezone.now()
+
+    for row in rows:
         # Рассчитываем ожидаемое количество выполнений
-        days_active = (timezone.now() - habit.created_at).days + 1
-        expected = days_active / habit.frequency_days
+        days_active = (now - row["created_at"]).days + 1
+        expected = days_active / frequency_days(row["frequency"])
 
         # Фактическое количество выполнений
-        actual = habit.completions.count()
+        actual = row["completed_total"]
 
         # Процент выполнения для этой привычки
         percentage = (actual / expected * 100) if expected > 0 else 0
@@ -372,7 +494,7 @@ def _calculate_completion_stats(user):
         stats["total_completed"] += actual
 
         # Группировка по частоте
-        freq = habit.frequency
+        freq = row["frequency"]
         if freq not in stats["by_frequency"]:
             stats["by_frequency"][freq] = {"count": 0, "completed": 0, "percentage": 0}
 
@@ -382,12 +504,12 @@ def _calculate_completion_stats(user):
         # Статистика по конкретной привычке
         stats["by_habit"].append(
             {
-                "id": habit.id,
-                "action": habit.action,
+                "id": row["id"],
+                "action": row["action"],
                 "expected": round(expected, 1),
                 "actual": actual,
                 "percentage": round(percentage, 1),
-                "frequency": habit.frequency,
+                "frequency": freq,
             }
         )
 
@@ -416,163 +538,80 @@ def _calculate_completion_stats(user):
     return stats
 
 
-def _calculate_current_streak(user):
-    """Рассчет текущей серии последовательных дней с выполнением привычек"""
-    # Получаем все выполнения за последние 30 дней
-    month_ago = timezone.now() - timedelta(days=30)
+def _calculate_dashboard_stats(user):
+    """Данные дашборда статистики по строкам ``_habit_stat_rows``"""
+    today = timezone.localdate()
+    now = timezone.now()
+    rows = _habit_stat_rows(user, today)
 
-    completion_dates = (
-        HabitCompletion.objects.filter(habit__user=user, completed_at__gte=month_ago)
-        .dates("completed_at", "day")
-        .order_by("-completed_at")
-    )
-
-    if not completion_dates:
-        return 0
-
-    # Находим самую длинную последовательность дней подряд
-    streak = 1
-    current_date = completion_dates[0]
-
-    for i in range(1, len(completion_dates)):
-        prev_date = completion_dates[i]
-        days_diff = (current_date - prev_date).days
-
-        if days_diff == 1:
-            streak += 1
-            current_date = prev_date
-        else:
-            break
-
-    return streak
-
-
-def _calculate_habit_streak(habit):
-    """Рассчет текущей серии выполнения конкретной привычки"""
-    completions = habit.completions.order_by("-completed_at")
-
-    if not completions.exists():
-        return 0
-
-    streak = 0
-    current_date = completions.first().completed_at.date()
-
-    for completion in completions:
-        completion_date = completion.completed_at.date()
-
-        if completion_date == current_date:
-            continue
-
-        days_diff = (current_date - completion_date).days
-
-        if days_diff == 1:
-            streak += 1
-            current_date = completion_date
-        else:
-            break
-
-    return streak + 1  # +1 для дня первого выполнения
-
-
-def _export_to_csv(habits, user):
-    """Экспорт в CSV формат"""
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = (
-        f'attachment; filename="habits_{user.username}_{datetime.now().date()}.csv"'
-    )
-
-    writer = csv.writer(response)
-
-    # Заголовки
-    writer.writerow(
-        [
-            "ID",
-            "Действие",
-            "Место",
-            "Время",
-            "Периодичность",
-            "Длительность (сек)",
-            "Приятная привычка",
-            "Вознаграждение",
-            "Связанная привычка",
-            "Публичная",
-            "Создано",
-            "Выполнений",
-        ]
-    )
-
-    # Данные
-    for habit in habits:
-        writer.writerow(
-            [
-                habit.id,
-                habit.action,
-                habit.place,
-                habit.time.strftime("%H:%M") if habit.time else "",
-                habit.frequency,
-                habit.duration,
-                "Да" if habit.is_pleasant else "Нет",
-                habit.reward or "",
-                habit.related_habit.action if habit.related_habit else "",
-                "Да" if habit.is_public else "Нет",
-                habit.created_at.strftime("%Y-%m-%d %H:%M"),
-                habit.completions.count(),
-            ]
-        )
-
-    return response
+    pleasant_habits = sum(1 for row in rows if row["is_pleasant"])
 
+    # Статистика за неделю: только дни с выполнениями, от старых к новым
+    weekly_completions = []
+    for offset in range(STATS_WEEK_DAYS, -1, -1):
+        count = sum(row[f"day_{offset}"] for row in rows)
+        if count:
+            weekly_completions.append(
+                {
+                    "completed_at__date": today - timedelta(days=offset),
+                    "count": count,
+                }
+            )
 
-def _export_to_json(habits, user):
-    """Экспорт в JSON формат"""
-    data = {
-        "export_date": datetime.now().isoformat(),
-        "user": {
-            "username": user.username,
-            "email": user.email,
+    # Самые успешные привычки
+    successful_habits = sorted(rows, key=lambda row: -row["completed_total"])[:5]
+
+    # Привычки, требующие внимания (не выполнялись более 3 дней)
+    attention_needed = [
+        row
+        for row in rows
+        if row["last_completed_at"] and now - row["last_completed_at"] > ATTENTION_AFTER
+    ][:5]
+
+    return {
+        "summary": {
+            "total_habits": len(rows),
+            "pleasant_habits": pleasant_habits,
+            "useful_habits": len(rows) - pleasant_habits,
+            "completions_today": sum(row["day_0"] for row in rows),
         },
-        "habits": [],
+        "completion_rate": _calculate_completion_stats(user, rows),
+        "weekly_completions": weekly_completions,
+        "successful_habits": [
+            {
+                "id": row["id"],
+                "action": row["action"],
+                "completion_count": row["completed_total"],
+                "last_completed": row["last_completed_at"],
+            }
+            for row in successful_habits
+        ],
+        "attention_needed": [
+            {
+                "id": row["id"],
+                "action": row["action"],
+                "last_completion": row["last_completed_at"],
+            }
+            for row in attention_needed
+        ],
+        "current_streak": _calculate_current_streak(user),
     }
 
-    for habit in habits:
-        habit_data = {
-            "id": habit.id,
-            "action": habit.action,
-            "place": habit.place,
-            "time": habit.time.strftime("%H:%M") if habit.time else None,
-            "frequency": habit.frequency,
-            "duration_seconds": habit.duration,
-            "is_pleasant": habit.is_pleasant,
-            "reward": habit.reward,
-            "related_habit_id": habit.related_habit_id,
-            "is_public": habit.is_public,
-            "created_at": habit.created_at.isoformat(),
-            "updated_at": habit.updated_at.isoformat(),
-            "full_description": habit.full_description,
-            "completions": [],
-        }
 
-        # Добавляем последние 30 выполнений
-        recent_completions = habit.completions.order_by("-completed_at")[:30]
-        for completion in recent_completions:
-            habit_data["completions"].append(
-                {
-                    "completed_at": completion.completed_at.isoformat(),
-                    "is_completed": completion.is_completed,
-                    "note": completion.note,
-                }
-            )
+def _calculate_current_streak(user):
+    """Рассчет текущей серии последовательных дней с выполнением привычек"""
+    return calculate_user_streak(user)
 
-        data["habits"].append(habit_data)
 
-    response = HttpResponse(
-        json.dumps(data, ensure_ascii=False, indent=2), content_type="application/json"
-    )
-    response["Content-Disposition"] = (
-        f'attachment; filename="habits_{user.username}_{datetime.now().date()}.json"'
-    )
+def _calculate_next_expected_date(habit):
+    """Дата следующего ожидаемого выполнения по периодичности привычки"""
+    if habit.last_completed_at is None:
+        return timezone.localdate()
 
-    return response
+    next_date = timezone.localdate(habit.last_completed_at) + timedelta(
+        days=frequency_days(habit.frequency)
+    )
+    return max(next_date, timezone.localdate())
 
 
 class HabitCompletionViewSet(viewsets.ModelViewSet):
@@ -586,7 +625,7 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
     queryset = HabitCompletion.objects.all()
     serializer_class = HabitCompletionSerializer
     permission_classes = [HabitCompletionPermission]
-    pagination_class = StandardPagination
+    pagination_class = CompletionPagination
     filter_backends = [DjangoFilterBackend]
     ordering_fields = ["completed_at"]
     ordering = ["-completed_at"]
@@ -597,7 +636,7 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
         """
         if self.request.user.is_authenticated:
             return HabitCompletion.objects.filter(
-                habit__user=self.request.user
+                habit__user_id=self.request.user.pk
             ).select_related("habit")
 
         return HabitCompletion.objects.none()
@@ -606,7 +645,7 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
         """При создании проверяем, что привычка принадлежит пользователю"""
         habit = serializer.validated_data["habit"]
 
-        if habit.user != self.request.user:
+        if habit.user_id != self.request.user.pk:
             raise serializers.ValidationError(
                 "Вы можете добавлять выполнения только для своих привычек."
             )
@@ -623,140 +662,77 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
         detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
     )
     def stats(self, request):
-        """Статистика выполнения привычек пользователя"""
-        user = request.user
-
-        # Базовые метрики
-        total_habits = Habit.objects.filter(user=user).count()
-        pleasant_habits = Habit.objects.filter(user=user, is_pleasant=True).count()
-        useful_habits = Habit.objects.filter(user=user, is_pleasant=False).count()
-
-        # Выполнения сегодня
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-
-        completions_today = HabitCompletion.objects.filter(
-            habit__user=user, completed_at__range=[today_start, today_end]
-        ).count()
-
-        # Статистика за неделю
-        week_ago = timezone.now() - timedelta(days=7)
-
-        weekly_completions = (
-            HabitCompletion.objects.filter(habit__user=user, completed_at__gte=week_ago)
-            .values("completed_at__date")
-            .annotate(count=Count("id"))
-            .order_by("completed_at__date")
-        )
-
-        # Процент выполнения привычек
-        completion_stats = _calculate_completion_stats(user)
-
-        # Самые успешные привычки
-        successful_habits = (
-            Habit.objects.filter(user=user)
-            .annotate(
-                completion_count=Count("completions"),
-                last_completion_date=models.Max("completions__completed_at"),
-            )
-            .order_by("-completion_count")[:5]
-        )
+        """Статистика выполнения привычек пользователя.
 
-        successful_habits_data = [
-            {
-                "id": habit.id,
-                "action": habit.action,
-                "completion_count": habit.completion_count,
-                "last_completed": habit.last_completion_date,
-            }
-            for habit in successful_habits
-        ]
-
-        # Привычки, требующие внимания (не выполнялись более 3 дней)
-        attention_needed = (
-            Habit.objects.filter(user=user, completions__isnull=False)
-            .annotate(
-                last_completion=models.Max("completions__completed_at"),
-                days_since_last=ExpressionWrapper(
-                    timezone.now() - F("last_completion"), output_field=DurationField()
-                ),
-            )
-            .filter(days_since_last__gt=timedelta(days=3))
-            .values("id", "action", "last_completion")[:5]
-        )
+        Считается из одного запроса по привычкам (плюс серия пользователя)
+        и кэшируется на USER_STATS_CACHE_TIMEOUT; новые выполнения
+        сбрасывают кэш.
+        """
+        user = request.user
 
-        return Response(
-            {
-                "summary": {
-                    "total_habits": total_habits,
-                    "pleasant_habits": pleasant_habits,
-                    "useful_habits": useful_habits,
-                    "completions_today": completions_today,
-                },
-                "completion_rate": completion_stats,
-                "weekly_completions": list(weekly_completions),
-                "successful_habits": successful_habits_data,
-                "attention_needed": list(attention_needed),
-                "current_streak": _calculate_current_streak(user),
-            }
-        )
+        data = get_user_stats(user.pk)
+        if data is None:
+            data = _calculate_dashboard_stats(user)
+            set_user_stats(user.pk, data)
+        return Response(data)
 
     @action(
         detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated]
     )
     def progress(self, request, pk=None):
-        """Прогресс выполнения конкретной привычки"""
-        habit = self.get_object()
+        """Прогресс выполнения конкретной привычки.
+
+        Итоги и гистограмма по часам берутся из снимка HabitProgress,
+        серии — с привычки, данные за 30 дней — из дневных агрегатов.
+        """
+        habit = get_object_or_404(
+            Habit.objects.select_related("progress_snapshot"), pk=pk
+        )
 
         # Проверяем права доступа
-        if habit.user != request.user and not habit.is_public:
+        if habit.user_id != request.user.pk and not habit.is_public:
             return Response(
                 {"error": "У вас нет доступа к прогрессу этой привычки"},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Базовые метрики
-        total_completions = habit.completions.count()
+        snapshot = getattr(habit, "progress_snapshot", None) or HabitProgress(
+            habit=habit
+        )
 
-        # За последние 30 дней
-        month_ago = timezone.now() - timedelta(days=30)
-        recent_completions = habit.completions.filter(
-            completed_at__gte=month_ago
-        ).count()
+        # Выполнения по дням за последние 30 дней
+        now = timezone.now()
+        month_ago = timezone.localdate(now - timedelta(days=30))
+        week_ago = timezone.localdate(now - timedelta(days=7))
+        days = list(
+            habit.daily_stats.filter(date__gte=month_ago)
+            .order_by("date")
+            .values_list("date", "count")
+        )
+        recent_completions = sum(count for _, count in days)
 
         # Рассчет процента выполнения
-        expected_completions = 30 / habit.frequency_days
+        expected_completions = 30 / frequency_days(habit.frequency)
         completion_percentage = (
             (recent_completions / expected_completions * 100)
             if expected_completions > 0
             else 0
         )
 
-        # Текущая серия (streak)
-        current_streak = _calculate_habit_streak(habit)
-
-        # График выполнения за неделю
-        week_ago = timezone.now() - timedelta(days=7)
-
-        weekly_completions = (
-            habit.completions.filter(completed_at__gte=week_ago)
-            .values("completed_at__date")
-            .annotate(count=Count("id"))
-            .order_by("completed_at__date")
-        )
-
-        # Время суток, когда чаще всего выполняется
-        completion_times = habit.completions.values_list(
-            "completed_at__hour", flat=True
+        # Серии хранятся на привычке и обновляются при каждом выполнении
+        last_date = (
+            timezone.localdate(habit.last_completed_at)
+            if habit.last_completed_at
+            else None
         )
+        current_streak = active_streak(habit.current_streak, last_date)
 
-        # Медиана времени выполнения
-        times_list = list(completion_times)
-        if times_list:
-            times_list.sort()
-            median_time = times_list[len(times_list) // 2]
-        else:
-            median_time = None
+        # График выполнения за неделю
+        weekly_completions = [
+            {"completed_at__date": date, "count": count}
+            for date, count in days
+            if date >= week_ago
+        ]
 
         return Response(
             {
@@ -766,43 +742,50 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
                     "frequency": habit.frequency,
                 },
                 "completions": {
-                    "total": total_completions,
+                    "total": snapshot.total_completions,
                     "recent_30_days": recent_completions,
                     "percentage": round(completion_percentage, 1),
                     "expected": round(expected_completions, 1),
                 },
                 "streak": {
                     "current": current_streak,
-                    "longest": self._calculate_longest_streak(habit),
+                    "longest": habit.longest_streak,
                 },
-                "weekly_data": list(weekly_completions),
+                "weekly_data": weekly_completions,
                 "time_analysis": {
-                    "median_hour": median_time,
+                    # Медиана по гистограмме из 24 корзин
+                    "median_hour": snapshot.median_hour,
                     "scheduled_time": habit.time.hour if habit.time else None,
                 },
-                "next_expected": self._calculate_next_expected_date(habit),
+                "next_expected": _calculate_next_expected_date(habit),
             }
         )
 
     @action(
-        detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAuthenticated],
+        content_negotiation_class=ExportContentNegotiation,
     )
     def export(self, request):
-        """Экспорт привычек в различных форматах"""
-        format_type = request.query_params.get("format", "json")
-        user = request.user
+        """Экспорт привычек в различных форматах.
 
-        habits = Habit.objects.filter(user=user).select_related("related_habit")
+        ``?scope=completions`` выгружает всю историю выполнений. Ответ
+        отдается потоком, без сборки файла в памяти.
+        """
+        format_type = request.query_params.get("format", "json")
+        scope = request.query_params.get("scope", "habits")
 
-        if format_type == "csv":
-            return _export_to_csv(habits, user)
-        elif format_type == "json":
-            return _export_to_json(habits, user)
-        else:
+        response = streaming_export(request.user, scope, format_type)
+        if response is None:
             return Response(
-                {"error": "Unsupported format. Use csv or json."},
+                {
+                    "error": "Unsupported format. Use csv or json "
+                    "(scope: habits or completions)."
+                },
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return response
 
     @action(
         detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated]
@@ -817,44 +800,7 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
                 {"error": "No habit_ids provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        user = request.user
-        successes = []
-        errors = []
-
-        for habit_id in habit_ids:
-            try:
-                habit = Habit.objects.get(id=habit_id, user=user)
-
-                # Проверяем, можно ли выполнять привычку
-                if not habit.can_be_completed_today():
-                    errors.append(
-                        {
-                            "habit_id": habit_id,
-                            "error": f"Cannot complete habit more frequently than {habit.frequency_days} days",
-                        }
-                    )
-                    continue
-
-                # Создаем выполнение
-                completion = HabitCompletion.objects.create(
-                    habit=habit, is_completed=True, note=note
-                )
-
-                successes.append(
-                    {
-                        "habit_id": habit_id,
-                        "action": habit.action,
-                        "completion_id": completion.id,
-                        "completed_at": completion.completed_at,
-                    }
-                )
-
-            except Habit.DoesNotExist:
-                errors.append(
-                    {"habit_id": habit_id, "error": "Habit not found or access denied"}
-                )
-            except Exception as e:
-                errors.append({"habit_id": habit_id, "error": str(e)})
+        successes, errors = bulk_complete(request.user, habit_ids, note)
 
         return Response(
             {
@@ -898,6 +844,7 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
 
         # Массовое обновление
         updated_count = habits.update(is_public=is_public)
+        public_habits_changed.send(sender=Habit, habit_ids=habit_ids)
 
         return Response(
             {
@@ -906,3 +853,65 @@ class HabitCompletionViewSet(viewsets.ModelViewSet):
                 "message": f"Successfully updated {updated_count} habits",
             }
         )
+
+
+class ExportJobViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Фоновые выгрузки.
+
+    - POST /api/exports/ - поставить выгрузку в очередь (scope, format, compress)
+    - GET /api/exports/{id}/ - статус и прогресс
+    - GET /api/exports/{id}/download/ - скачать готовый файл
+    """
+
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Такая же выгрузка уже в работе — возвращаем ее, а не ставим вторую;
+        # зависшие задания сначала закрываются, чтобы не блокировать новые
+        fail_stale_export_jobs(self.get_queryset())
+        active = (
+            self.get_queryset()
+            .filter(
+                status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING],
+                **serializer.validated_data,
+            )
+            .first()
+        )
+        if active is not None:
+            return Response(self.get_serializer(active).data, status=status.HTTP_200_OK)
+
+        job = serializer.save(user=request.user)
+        transaction.on_commit(lambda: run_export_job.delay(job.pk))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """Скачать результат выгрузки (файл не пересчитывается)"""
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_DONE or not job.file:
+            return Response(
+                {"error": "Выгрузка еще не готова", "status": job.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        content_type = "application/gzip" if job.compress else None
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=os.path.basename(job.file.name),
+            content_type=content_type,
+        )
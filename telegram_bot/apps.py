@@ -7,7 +7,4 @@ class TelegramBotConfig(AppConfig):
     verbose_name = "Telegram Bot"
 
     def ready(self):
-        # Пока не импортируем сигналы, так как их нет
-        # Когда создадите signals.py, раскомментируйте:
-        # import telegram_bot.signals
-        pass
+        import telegram_bot.signals  # noqa: F401
@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию соответствуют лимитам Telegram Bot API:
+# ~30 сообщений в секунду на бота и ~1 сообщение в секунду в один чат
+DEFAULT_DELIVERY_SETTINGS = {
+    "MAX_WORKERS": 8,
+    "GLOBAL_RATE": 30,
+    "PER_CHAT_RATE": 1,
+    "MAX_RETRIES": 3,
+    "TIMEOUT": 10,
+    # Сколько per-chat bucket'ов хранить (вытесняются давно не использованные)
+    "MAX_CHAT_BUCKETS": 10000,
+}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def get_delivery_settings():
+    """Настройки доставки с подстановкой значений по умолчанию"""
+    return {**DEFAULT_DELIVERY_SETTINGS, **getattr(settings, "TELEGRAM_DELIVERY", {})}
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket: ``rate`` токенов в секунду"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        # Во время паузы токены не накапливаются
+        elapsed = max(now - max(self._updated, self._paused_until), 0)
+        self._updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def pause(self, seconds):
+        """Не выдавать токены ``seconds`` секунд (например, после 429)"""
+        with self._lock:
+            self._refill()
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            # После паузы — без всплеска накопленных токенов
+            self.tokens = min(self.tokens, 1.0)
+
+    def acquire(self):
+        """Забрать токен, при необходимости дождавшись его появления"""
+        while True:
+            with self._lock:
+                self._refill()
+                paused = self._paused_until - self._updated
+                if paused > 0:
+                    wait = paused
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+@dataclass
+class OutgoingMessage:
+    """Сообщение для отправки через sendMessage"""
+
+    chat_id: int
+    text: str
+    parse_mode: str = "HTML"
+    reply_markup: Optional[Dict[str, Any]] = None
+    # Произвольные данные вызывающего кода (пользователь, привычка и т.п.)
+    context: Any = None
+
+    def payload(self):
+        data = {"chat_id": self.chat_id, "text": self.text}
+        if self.parse_mode:
+            data["parse_mode"] = self.parse_mode
+        if self.reply_markup:
+            data["reply_markup"] = self.reply_markup
+        return data
+
+
+@dataclass
+class DeliveryResult:
+    """Результат доставки одного сообщения"""
+
+    message: OutgoingMessage
+    ok: bool
+    status_code: Optional[int] = None
+    error: str = ""
+    attempts: int = 0
+    response: Dict[str, Any] = field(default_factory=dict)
+
+
+class TelegramDeliveryEngine:
+    """Отправка сообщений в Telegram через пул keep-alive соединений.
+
+    Ограничивает параллелизм пулом потоков, соблюдает глобальный и
+    per-chat лимиты через token bucket и повторяет 429/5xx с учетом
+    ``retry_after`` из ответа Telegram. 429 приостанавливает глобальный
+    bucket, поэтому ждут все потоки, а не только получивший ответ.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        max_workers=None,
+        global_rate=None,
+        per_chat_rate=None,
+        max_retries=None,
+        timeout=None,
+        session=None,
+        max_chat_buckets=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        config = get_delivery_settings()
+
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers or config["MAX_WORKERS"]
+        self.per_chat_rate = per_chat_rate or config["PER_CHAT_RATE"]
+        self.max_retries = config["MAX_RETRIES"] if max_retries is None else max_retries
+        self.timeout = timeout or config["TIMEOUT"]
+        self.max_chat_buckets = max_chat_buckets or config["MAX_CHAT_BUCKETS"]
+        self._sleep = sleep
+
+        self.global_bucket = TokenBucket(
+            global_rate or config["GLOBAL_RATE"], clock=clock, sleep=sleep
+        )
+        # LRU: движок живет весь процесс, чатов — неограниченно много
+        self._chat_buckets = OrderedDict()
+        self._chat_buckets_lock = threading.Lock()
+
+        self.session = session or self._build_session()
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_workers, max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _chat_bucket(self, chat_id):
+        with self._chat_buckets_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.per_chat_rate, capacity=1)
+                self._chat_buckets[chat_id] = bucket
+                if len(self._chat_buckets) > self.max_chat_buckets:
+                    self._chat_buckets.popitem(last=False)
+            else:
+                self._chat_buckets.move_to_end(chat_id)
+            return bucket
+
+    def _retry_after(self, data):
+        retry_after = (data.get("parameters") or {}).get("retry_after")
+        if retry_after is None:
+            return None
+        return max(float(retry_after), 0)
+
+    def _back_off(self, attempt, data):
+        """retry_after от Telegram — пауза для всех потоков, иначе экспонента.
+
+        Пауза ставится и после последней попытки: остальные потоки все
+        равно должны ее выдержать. Повтор дождется ее в acquire().
+        """
+        retry_after = self._retry_after(data)
+        if retry_after is not None:
+            self.global_bucket.pause(retry_after)
+        elif attempt < self.max_retries:
+            self._sleep(0.5 * 2**attempt)
+
+    def call(self, method, payload):
+        """Один HTTP-запрос к Bot API без лимитов и повторов"""
+        response = self.session.post(
+            f"{self.base_url}/{method}", json=payload, timeout=self.timeout
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        return response.status_code, data
+
+    def send(self, message: OutgoingMessage) -> DeliveryResult:
+        """Отправка одного сообщения с лимитами и повторами"""
+        result = DeliveryResult(message=message, ok=False)
+        chat_bucket = self._chat_bucket(message.chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            chat_bucket.acquire()
+            self.global_bucket.acquire()
+            result.attempts = attempt + 1
+
+            try:
+                status_code, data = self.call("sendMessage", message.payload())
+            except requests.RequestException as e:
+                result.status_code = None
+                result.error = str(e)
+                data = {}
+            else:
+                result.status_code = status_code
+                result.response = data
+                if status_code == 200 and data.get("ok"):
+                    result.ok = True
+                    result.error = ""
+                    return result
+                result.error = data.get("description") or f"HTTP {status_code}"
+                if status_code not in RETRYABLE_STATUS_CODES:
+                    break
+
+            self._back_off(attempt, data)
+
+        logger.error(
+            f"Не удалось доставить сообщение в chat {message.chat_id}: {result.error}"
+        )
+        return result
+
+    def send_many(self, messages: Iterable[OutgoingMessage]) -> List[DeliveryResult]:
+        """Параллельная отправка; результаты в порядке входных сообщений"""
+        messages = list(messages)
+        if not messages:
+            return []
+
+        workers = min(self.max_workers, len(messages))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.send, messages))
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_delivery_engine(base_url):
+    """Общий на процесс движок доставки (и пул соединений) для base_url"""
+    with _engines_lock:
+        engine = _engines.get(base_url)
+        if engine is None:
+            engine = TelegramDeliveryEngine(base_url)
+            _engines[base_url] = engine
+        return engine
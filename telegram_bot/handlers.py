@@ -1,5 +1,6 @@
 import logging
 
+from django.contrib.auth import get_user_model
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -14,6 +15,7 @@ from .models import TelegramConnectionCode, TelegramUser
 from .services import TelegramBotService
 
 logger = logging.getLogger(__name__)
+User = get_user_model()
 bot_service = TelegramBotService()
 
 
@@ -38,13 +40,18 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def connect_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработчик команды /connect"""
-    from users.models import User
+    """Обработчик команды /connect.
 
+    Обращения к базе идут через асинхронный ORM (aget/acreate), чтобы не
+    блокировать цикл событий бота; связанные объекты загружаются сразу
+    (select_related) — ленивый запрос из корутины недопустим.
+    """
     user = update.effective_user
 
     try:
-        telegram_user = TelegramUser.objects.get(telegram_id=user.id)
+        telegram_user = await TelegramUser.objects.select_related("django_user").aget(
+            telegram_id=user.id
+        )
         await update.message.reply_text(
             f"✅ Ваш аккаунт уже привязан к пользователю {telegram_user.django_user.username}",
             parse_mode="HTML",
@@ -56,10 +63,10 @@ async def connect_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if context.args:
         identifier = context.args[0]
         try:
-            django_user = User.objects.get(username=identifier)
+            django_user = await User.objects.aget(username=identifier)
         except User.DoesNotExist:
             try:
-                django_user = User.objects.get(email=identifier)
+                django_user = await User.objects.aget(email=identifier)
             except User.DoesNotExist:
                 await update.message.reply_text(
                     "❌ Пользователь не найден. Укажите username или email после команды, например:\n"
@@ -81,7 +88,9 @@ async def connect_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    connection_code = TelegramConnectionCode.objects.create(django_user=django_user)
+    connection_code = await TelegramConnectionCode.objects.acreate(
+        django_user=django_user
+    )
 
     await update.message.reply_text(
         f"🔐 <b>Код привязки создан</b>\n\n"
@@ -111,15 +120,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_connection_code(update: Update, code: str):
     """Обработка кода привязки"""
     try:
-        connection_code = TelegramConnectionCode.objects.get(
-            code=code, is_used=False, telegram_id__isnull=True
-        )
+        connection_code = await TelegramConnectionCode.objects.select_related(
+            "django_user"
+        ).aget(code=code, is_used=False, telegram_id__isnull=True)
 
         if not connection_code.is_valid():
             await update.message.reply_text("❌ Срок действия кода истек")
             return
 
-        TelegramUser.objects.create(
+        await TelegramUser.objects.acreate(
             django_user=connection_code.django_user,
             telegram_id=update.effective_user.id,
             username=update.effective_user.username,
@@ -129,7 +138,7 @@ async def handle_connection_code(update: Update, code: str):
 
         connection_code.telegram_id = update.effective_user.id
         connection_code.is_used = True
-        connection_code.save()
+        await connection_code.asave(update_fields=["telegram_id", "is_used"])
 
         await update.message.reply_text(
             f"✅ Отлично! Ваш Telegram успешно привязан к аккаунту "
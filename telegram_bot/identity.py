@@ -0,0 +1,62 @@
+"""Кэш соответствия chat_id → пользователь для обработчиков бота.
+
+TelegramUser кэшируется вместе с пользователем Django и настройками
+уведомлений (один запрос с select_related), поэтому команды бота не
+обращаются к базе за идентификацией на каждое сообщение. Неподключенные
+чаты тоже кэшируются. Запись сбрасывается сигналами при подключении,
+отключении и изменении настроек; имя и email пользователя Django могут
+отставать не дольше TELEGRAM_IDENTITY_CACHE_TIMEOUT.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from habits.cache import schedule_invalidation
+
+from .models import TelegramUser
+
+IDENTITY_PREFIX = "telegram:identity"
+DEFAULT_IDENTITY_TIMEOUT = 300
+
+# Отметка в кэше для чатов без подключенного аккаунта
+NOT_CONNECTED = 0
+
+
+def identity_key(chat_id):
+    return f"{IDENTITY_PREFIX}:{chat_id}"
+
+
+def resolve_chat(chat_id):
+    """TelegramUser чата (с django_user и notification_settings) или None"""
+    key = identity_key(chat_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    telegram_user = (
+        TelegramUser.objects.select_related("django_user", "notification_settings")
+        .defer("django_user__password")
+        .filter(telegram_id=chat_id)
+        .first()
+    )
+    timeout = getattr(
+        settings, "TELEGRAM_IDENTITY_CACHE_TIMEOUT", DEFAULT_IDENTITY_TIMEOUT
+    )
+    cache.set(key, telegram_user or NOT_CONNECTED, timeout=timeout)
+    return telegram_user
+
+
+def notification_settings(telegram_user):
+    """Настройки уведомлений из кэшированного TelegramUser или None"""
+    try:
+        return telegram_user.notification_settings
+    except TelegramUser.notification_settings.RelatedObjectDoesNotExist:
+        return None
+
+
+def invalidate_chat(chat_id):
+    cache.delete(identity_key(chat_id))
+
+
+def schedule_chat_invalidation(chat_id):
+    schedule_invalidation(invalidate_chat, chat_id)
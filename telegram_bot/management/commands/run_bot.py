@@ -1,14 +1,16 @@
-import json
 import logging
+import signal
+import threading
 import time
 
-import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from telegram_bot.identity import notification_settings, resolve_chat
 from telegram_bot.models import TelegramConnectionCode, TelegramUser
+from telegram_bot.polling import ChatShardedDispatcher, UpdatePoller
 from telegram_bot.services import TelegramBotService
 
 logger = logging.getLogger(__name__)
@@ -99,7 +101,7 @@ def _handle_connect_command(chat_id, connection_code, bot_service, message):
 def _handle_stats_command(chat_id, bot_service):
     """Обработка команды статистики"""
     try:
-        telegram_user = TelegramUser.objects.filter(chat_id=chat_id).first()
+        telegram_user = resolve_chat(chat_id)
 
         if not telegram_user:
             bot_service.send_message(
@@ -156,21 +158,20 @@ def _handle_stats_command(chat_id, bot_service):
         logger.error(f"Ошибка статистики: {e}")
 
 
-def _answer_callback_query(callback_query_id, text):
+def _answer_callback_query(bot_service, callback_query_id, text):
     """Отправка ответа на callback query"""
     try:
-        response = requests.post(
-            f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/answerCallbackQuery",
-            json={
+        status_code, data = bot_service.delivery.call(
+            "answerCallbackQuery",
+            {
                 "callback_query_id": callback_query_id,
                 "text": text,
                 "show_alert": False,
             },
-            timeout=10,
         )
 
-        if response.status_code != 200:
-            logger.error(f"Ошибка ответа на callback query: {response.text}")
+        if status_code != 200:
+            logger.error(f"Ошибка ответа на callback query: {data}")
 
     except Exception as e:
         logger.error(f"Ошибка ответа на callback query: {e}")
@@ -189,7 +190,7 @@ def _handle_callback_query(chat_id, data, bot_service, callback_query):
             f"Обновите приложение для синхронизации.",
         )
 
-        _answer_callback_query(callback_query["id"], "Привычка отмечена!")
+        _answer_callback_query(bot_service, callback_query["id"], "Привычка отмечена!")
 
     elif data.startswith("postpone_"):
         habit_id = data.replace("postpone_", "")
@@ -199,13 +200,19 @@ def _handle_callback_query(chat_id, data, bot_service, callback_query):
             "⏰ <b>Напоминание отложено на 15 минут</b>\n\nВы получите новое напоминание через 15 минут.",
         )
 
-        _answer_callback_query(callback_query["id"], "Напоминание отложено")
+        _answer_callback_query(
+            bot_service, callback_query["id"], "Напоминание отложено"
+        )
+
+
+def _switch_state(enabled):
+    return "✅ Включены" if enabled else "❌ Выключены"
 
 
 def _handle_settings_command(chat_id, bot_service):
     """Обработка команды настроек"""
     try:
-        telegram_user = TelegramUser.objects.filter(chat_id=chat_id).first()
+        telegram_user = resolve_chat(chat_id)
 
         if not telegram_user:
             bot_service.send_message(
@@ -214,12 +221,22 @@ def _handle_settings_command(chat_id, bot_service):
             )
             return
 
+        # Без строки настроек рассылки пользователя пропускают (они фильтруют
+        # по notification_settings__enable_*), поэтому показываем «выключены»
+        notify = notification_settings(telegram_user)
+        if notify is None:
+            reminders = reports = alerts = False
+        else:
+            reminders = notify.enable_habit_reminders
+            reports = notify.enable_daily_reminders
+            alerts = notify.enable_streak_alerts
+
         response_text = (
             "⚙️ <b>Настройки уведомлений</b>\n\n"
             "🔔 <b>Текущие настройки:</b>\n"
-            "• Напоминания о привычках: ✅ Включены\n"
-            "• Ежедневные отчеты: ✅ Включены\n"
-            "• Уведомления о прогрессе: ✅ Включены\n\n"
+            f"• Напоминания о привычках: {_switch_state(reminders)}\n"
+            f"• Ежедневные отчеты: {_switch_state(reports)}\n"
+            f"• Уведомления о прогрессе: {_switch_state(alerts)}\n\n"
             "⚡ <b>Быстрые команды:</b>\n"
             "/notify_on - Включить все уведомления\n"
             "/notify_off - Выключить все уведомления\n\n"
@@ -271,7 +288,7 @@ def _handle_help_command(chat_id, bot_service, message):
 def _handle_status_command(chat_id, bot_service, message):
     """Обработка команды /status"""
     try:
-        telegram_user = TelegramUser.objects.filter(chat_id=chat_id).first()
+        telegram_user = resolve_chat(chat_id)
         if telegram_user:
             response_text = (
                 f"✅ <b>Аккаунт подключен!</b>\n\n"
@@ -371,43 +388,26 @@ def _process_update(update, bot_service):
 class Command(BaseCommand):
     help = "Запуск Telegram бота в режиме polling"
 
-    def _poll_updates(self, bot_service, offset):
-        """Основной цикл опроса обновлений"""
-        while True:
-            try:
-                offset = self._fetch_and_process_updates(bot_service, offset)
-                time.sleep(1)
-            except KeyboardInterrupt:
-                raise
-            except Exception as e:
-                logger.error(f"Ошибка в основном цикле: {e}")
-                time.sleep(5)
-
-    def _fetch_and_process_updates(self, bot_service, offset):
-        """Получение и обработка обновлений"""
-        try:
-            response = requests.get(
-                f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/getUpdates",
-                params={
-                    "offset": offset,
-                    "timeout": 10,
-                    "allowed_updates": json.dumps(["message", "callback_query"]),
-                },
-                timeout=15,
-            )
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Число воркеров (шардов по chat_id), по умолчанию 4",
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("ok"):
-                    for update in data["result"]:
-                        offset = update["update_id"] + 1
-                        _process_update(update, bot_service)
+    def _install_signal_handlers(self, stop):
+        """SIGINT/SIGTERM завершают опрос; полученные обновления дорабатываются"""
 
-            return offset
-        except requests.exceptions.Timeout:
-            return offset
+        def request_stop(signum, frame):
+            if not stop.is_set():
+                self.stdout.write(self.style.WARNING("\n👋 Останавливаем бота..."))
+            stop.set()
 
-    def handle(self, *args, **options):  # noqa: C901
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+    def handle(self, *args, **options):
         if not settings.TELEGRAM_BOT_TOKEN:
             self.stdout.write(
                 self.style.ERROR(
@@ -419,14 +419,22 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS("🤖 Запуск Telegram бота в режиме polling...")
         )
-        self.stdout.write("⚡ Бот будет проверять новые сообщения каждую секунду")
+        self.stdout.write(f"⚡ Воркеров: {options['workers']}")
         self.stdout.write("🛑 Для остановки нажмите Ctrl+C")
 
         bot_service = TelegramBotService(settings.TELEGRAM_BOT_TOKEN)
-        offset = 0
+        dispatcher = ChatShardedDispatcher(
+            lambda update: _process_update(update, bot_service),
+            workers=options["workers"],
+        )
+        poller = UpdatePoller(bot_service.base_url, dispatcher)
 
+        stop = threading.Event()
+        self._install_signal_handlers(stop)
         try:
-            self._poll_updates(bot_service, offset)
-            self.stdout.write(self.style.SUCCESS("\n✅ Бот остановлен"))
-        except KeyboardInterrupt:
-            self.stdout.write(self.style.WARNING("\n👋 Останавливаем бота..."))
+            poller.run(stop)
+        finally:
+            # Offset подтверждается только после обработки полученного
+            dispatcher.shutdown()
+            poller.close()
+        self.stdout.write(self.style.SUCCESS("✅ Бот остановлен"))
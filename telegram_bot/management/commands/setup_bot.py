@@ -3,6 +3,7 @@ import logging
 import requests
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.urls import reverse
 
 logger = logging.getLogger(__name__)
 
@@ -17,38 +18,41 @@ class Command(BaseCommand):
             required=True,
             help="Домен для webhook (например, https://example.com)",
         )
-        parser.add_argument(
-            "--secret-token",
-            type=str,
-            help="Секретный токен для проверки webhook (опционально)",
-        )
 
     def handle(self, *args, **options):
         token = settings.TELEGRAM_BOT_TOKEN
         domain = options["domain"]
-        secret_token = options.get("secret_token")
+        # Тот же секрет, что проверяет telegram_bot.views: другой токен
+        # зарегистрировал бы вебхук, отвечающий 403 на каждое обновление
+        secret_token = getattr(settings, "TELEGRAM_WEBHOOK_SECRET", "")
 
         if not token:
             self.stdout.write(self.style.ERROR("❌ TELEGRAM_BOT_TOKEN не настроен"))
             return
 
-        webhook_url = f"{domain}/telegram/webhook/"
+        # Без секрета вебхук отклоняет все обновления (telegram_bot.views)
+        if not secret_token:
+            self.stdout.write(
+                self.style.ERROR("❌ TELEGRAM_WEBHOOK_SECRET не настроен")
+            )
+            return
+
+        api_url = f"{settings.TELEGRAM_API_URL}/bot{token}"
+        webhook_url = f"{domain}{reverse('telegram-webhook')}"
 
         self.stdout.write("🌐 Настройка webhook для бота...")
         self.stdout.write(f"📡 Webhook URL: {webhook_url}")
-        self.stdout.write(f"🔑 Секретный токен: {secret_token or 'не установлен'}")
+        self.stdout.write("🔑 Секретный токен: установлен")
 
         payload = {
             "url": webhook_url,
             "allowed_updates": ["message", "callback_query"],
+            "secret_token": secret_token,
         }
 
-        if secret_token:
-            payload["secret_token"] = secret_token
-
         try:
             response = requests.post(
-                f"https://api.telegram.org/bot{token}/setWebhook",
+                f"{api_url}/setWebhook",
                 json=payload,
                 timeout=10,
             )
@@ -62,7 +66,7 @@ class Command(BaseCommand):
 
                     # Получаем информацию о webhook
                     info_response = requests.get(
-                        f"https://api.telegram.org/bot{token}/getWebhookInfo",
+                        f"{api_url}/getWebhookInfo",
                         timeout=10,
                     )
 
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:37
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_sent_date(apps, schema_editor):
+    """Заполняет sent_date и убирает дубли, нарушающие ключ идемпотентности"""
+    SentNotification = apps.get_model("telegram_bot", "SentNotification")
+
+    seen = set()
+    duplicates = []
+    batch = []
+    notifications = SentNotification.objects.order_by("id").only(
+        "id", "telegram_user_id", "habit_id", "notification_type", "sent_at"
+    )
+    for notification in notifications.iterator(chunk_size=2000):
+        notification.sent_date = timezone.localdate(notification.sent_at)
+        key = (
+            notification.telegram_user_id,
+            notification.habit_id,
+            notification.notification_type,
+            notification.sent_date,
+        )
+        if key in seen:
+            duplicates.append(notification.id)
+            continue
+        seen.add(key)
+        batch.append(notification)
+        if len(batch) >= 2000:
+            SentNotification.objects.bulk_update(batch, ["sent_date"])
+            batch = []
+
+    if batch:
+        SentNotification.objects.bulk_update(batch, ["sent_date"])
+    if duplicates:
+        SentNotification.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_habit_reminder_minute"),
+        ("telegram_bot", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sentnotification",
+            name="sent_date",
+            field=models.DateField(
+                default=django.utils.timezone.localdate, verbose_name="Дата отправки"
+            ),
+        ),
+        migrations.RunPython(fill_sent_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="sentnotification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("habit__isnull", False)),
+                fields=("telegram_user", "habit", "notification_type", "sent_date"),
+                name="unique_habit_notification_per_day",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sentnotification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("habit__isnull", True)),
+                fields=("telegram_user", "notification_type", "sent_date"),
+                name="unique_user_notification_per_day",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("telegram_bot", "0002_sentnotification_sent_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sentnotification",
+            index=models.Index(
+                fields=["telegram_user", "-sent_at"], name="sentnotif_user_recent_idx"
+            ),
+        ),
+    ]
@@ -51,6 +51,16 @@ class TelegramUser(models.Model):
     def __str__(self):
         return f"{self.django_user.username} ({self.telegram_id})"
 
+    @property
+    def user(self):
+        """Синоним django_user (используется сервисами и задачами)"""
+        return self.django_user
+
+    @property
+    def chat_id(self):
+        """ID личного чата с ботом совпадает с ID пользователя в Telegram"""
+        return self.telegram_id
+
 
 class NotificationSettings(models.Model):
     """Настройки уведомлений для пользователя"""
@@ -121,6 +131,10 @@ class SentNotification(models.Model):
     )
     message_text = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
+    # Локальная дата отправки — часть ключа идемпотентности
+    sent_date = models.DateField(
+        default=timezone.localdate, verbose_name="Дата отправки"
+    )
     is_delivered = models.BooleanField(default=False)
     error_message = models.TextField(blank=True)
 
@@ -130,6 +144,25 @@ class SentNotification(models.Model):
         ordering = ["-sent_at"]
         indexes = [
             models.Index(fields=["sent_at", "notification_type"]),
+            # История уведомлений пользователя (сортировка по умолчанию)
+            models.Index(
+                fields=["telegram_user", "-sent_at"],
+                name="sentnotif_user_recent_idx",
+            ),
+        ]
+        constraints = [
+            # Не больше одного уведомления данного типа о привычке в день
+            models.UniqueConstraint(
+                fields=["telegram_user", "habit", "notification_type", "sent_date"],
+                condition=models.Q(habit__isnull=False),
+                name="unique_habit_notification_per_day",
+            ),
+            # То же для уведомлений, не привязанных к привычке (отчеты)
+            models.UniqueConstraint(
+                fields=["telegram_user", "notification_type", "sent_date"],
+                condition=models.Q(habit__isnull=True),
+                name="unique_user_notification_per_day",
+            ),
         ]
 
     def __str__(self):
@@ -0,0 +1,55 @@
+from django.utils import timezone
+
+from .models import SentNotification
+
+
+class NotificationLog:
+    """Накопитель истории уведомлений за один запуск задачи.
+
+    Записи сбрасываются пачками через bulk_create; повторы по ключу
+    (пользователь, привычка, тип, локальная дата) отбрасываются самой
+    базой (ON CONFLICT DO NOTHING), без предварительной проверки.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = []
+        self.flushed = 0
+
+    def add(
+        self,
+        telegram_user,
+        notification_type,
+        message_text,
+        habit=None,
+        is_delivered=True,
+        error_message="",
+    ):
+        now = timezone.now()
+        self.pending.append(
+            SentNotification(
+                telegram_user=telegram_user,
+                habit=habit,
+                notification_type=notification_type,
+                message_text=message_text,
+                sent_at=now,
+                sent_date=timezone.localdate(now),
+                is_delivered=is_delivered,
+                error_message=error_message,
+            )
+        )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записать накопленное; возвращает число отправленных в базу строк"""
+        if not self.pending:
+            return 0
+
+        SentNotification.objects.bulk_create(
+            self.pending, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        count = len(self.pending)
+        self.flushed += count
+        self.pending = []
+        return count
@@ -0,0 +1,172 @@
+"""Получение обновлений через getUpdates (режим polling, команда run_bot).
+
+Обновления раскладываются по потокам-воркерам по ``chat_id``: сообщения
+одного чата обрабатываются по порядку, разные чаты — параллельно, и
+медленный обработчик задерживает только свой шард. Offset подтверждается
+в Telegram только для обработанного префикса обновлений, поэтому при
+падении необработанные обновления будут получены снова.
+"""
+
+import json
+import logging
+import queue
+import threading
+
+import requests
+from django.db import close_old_connections, connection
+
+from .updates import update_chat_id
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class ChatShardedDispatcher:
+    """Пул воркеров с очередью на шард ``chat_id % workers``"""
+
+    def __init__(self, handler, workers=4):
+        self.handler = handler
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._progress = threading.Condition()
+        self._pending = set()
+        self._last_seen = None
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(updates,),
+                name=f"telegram-updates-{index}",
+                daemon=True,
+            )
+            for index, updates in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _shard(self, update):
+        return abs(update_chat_id(update) or 0) % len(self._queues)
+
+    def submit(self, update):
+        """Поставить обновление в очередь; False, если оно уже получено"""
+        update_id = update["update_id"]
+        with self._progress:
+            if self._last_seen is not None and update_id <= self._last_seen:
+                return False
+            self._last_seen = update_id
+            self._pending.add(update_id)
+        self._queues[self._shard(update)].put(update)
+        return True
+
+    @property
+    def offset(self):
+        """Первое необработанное обновление (offset для getUpdates)"""
+        with self._progress:
+            if self._pending:
+                return min(self._pending)
+            if self._last_seen is None:
+                return 0
+            return self._last_seen + 1
+
+    @property
+    def pending(self):
+        with self._progress:
+            return len(self._pending)
+
+    def wait_for_progress(self, timeout):
+        """Подождать, пока какой-нибудь воркер закончит обновление"""
+        with self._progress:
+            self._progress.wait(timeout)
+
+    def _work(self, updates):
+        while True:
+            update = updates.get()
+            if update is None:
+                break
+            try:
+                close_old_connections()
+                self.handler(update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления {update['update_id']}: {e}")
+            finally:
+                close_old_connections()
+                with self._progress:
+                    self._pending.discard(update["update_id"])
+                    self._progress.notify_all()
+        connection.close()
+
+    def shutdown(self):
+        """Дождаться обработки уже полученных обновлений и остановить воркеры"""
+        for updates in self._queues:
+            updates.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class UpdatePoller:
+    """Long polling getUpdates через одно keep-alive соединение"""
+
+    def __init__(
+        self,
+        base_url,
+        dispatcher,
+        session=None,
+        poll_timeout=10,
+        idle_delay=1,
+        error_delay=5,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.dispatcher = dispatcher
+        self.session = session or requests.Session()
+        self.poll_timeout = poll_timeout
+        self.idle_delay = idle_delay
+        self.error_delay = error_delay
+
+    def fetch(self, offset, timeout, limit=100):
+        response = self.session.get(
+            f"{self.base_url}/getUpdates",
+            params={
+                "offset": offset,
+                "timeout": timeout,
+                "limit": limit,
+                "allowed_updates": json.dumps(ALLOWED_UPDATES),
+            },
+            timeout=timeout + 5,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("ok"):
+            raise requests.RequestException(data.get("description", "getUpdates"))
+        return data["result"]
+
+    def poll_once(self):
+        """Один запрос getUpdates; возвращает число новых обновлений.
+
+        Пока обновления из подтверждаемого префикса в обработке, Telegram
+        отдает их снова — такие пропускаются, а если новых нет, цикл ждет
+        продвижения воркеров вместо повторного запроса вхолостую.
+        """
+        updates = self.fetch(self.dispatcher.offset, self.poll_timeout)
+        submitted = sum(self.dispatcher.submit(update) for update in updates)
+        if updates and not submitted:
+            self.dispatcher.wait_for_progress(self.idle_delay)
+        return submitted
+
+    def run(self, stop):
+        """Опрашивать до установки события ``stop``"""
+        while not stop.is_set():
+            try:
+                self.poll_once()
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                stop.wait(self.error_delay)
+
+    def close(self):
+        """Подтвердить обработанные обновления и закрыть соединение"""
+        offset = self.dispatcher.offset
+        try:
+            if offset:
+                self.fetch(offset, timeout=0, limit=1)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Не удалось подтвердить offset: {e}")
+        finally:
+            self.session.close()
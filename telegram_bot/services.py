@@ -1,10 +1,11 @@
 import logging
-from typing import Any, Dict
+from typing import Optional
 
-import requests
 from django.conf import settings
 from django.utils import timezone
 
+from .delivery import DeliveryResult, OutgoingMessage, get_delivery_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,50 +14,55 @@ class TelegramBotService:
 
     def __init__(self, token=None):
         self.token = token or settings.TELEGRAM_BOT_TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self.base_url = f"{settings.TELEGRAM_API_URL}/bot{self.token}"
 
         if not self.token:
             logger.warning("Telegram bot token is not configured")
 
+    @property
+    def delivery(self):
+        """Общий движок доставки с пулом keep-alive соединений"""
+        return get_delivery_engine(self.base_url)
+
     def send_message(self, chat_id, text, parse_mode="HTML", reply_markup=None):
         """Отправка сообщения в Telegram"""
+        return self._send_built(
+            OutgoingMessage(
+                chat_id=chat_id,
+                text=text,
+                parse_mode=parse_mode,
+                reply_markup=reply_markup,
+            )
+        )
+
+    def deliver(self, message):
+        """Отправка подготовленного сообщения с лимитами и повторами"""
         if not self.token:
             logger.error("Cannot send message: Telegram bot token not configured")
             return None
 
-        try:
-            payload = {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": parse_mode,
-            }
+        result = self.delivery.send(message)
+        if result.ok:
+            logger.info(f"Сообщение отправлено в Telegram chat {message.chat_id}")
+        return result
 
-            if reply_markup:
-                payload["reply_markup"] = reply_markup
+    def send_messages(self, messages):
+        """Параллельная отправка пачки сообщений.
 
-            response = requests.post(
-                f"{self.base_url}/sendMessage", json=payload, timeout=10
-            )
+        Возвращает список DeliveryResult в порядке входных сообщений.
+        """
+        messages = list(messages)
+        if not self.token:
+            logger.error("Cannot send messages: Telegram bot token not configured")
+            return [
+                DeliveryResult(message=m, ok=False, error="Bot token not configured")
+                for m in messages
+            ]
 
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("ok"):
-                    self.logger.info(f"Сообщение отправлено в Telegram chat {chat_id}")
-                    return True  # ← Должен возвращать True
-                else:
-                    self.logger.error(f"Telegram API error: {data.get('description')}")
-                    return False  # ← Должен возвращать False
-            else:
-                self.logger.error(
-                    f"Telegram API error: {response.status_code} - {response.text}"
-                )
-                return False  # ← Должен возвращать False
-        except Exception as e:
-            self.logger.error(f"Unexpected error sending Telegram message: {e}")
-            return False  # ← Должен возвращать False
+        return self.delivery.send_many(messages)
 
-    def send_habit_reminder(self, chat_id, habit):
-        """Отправка напоминания о привычке"""
+    def build_habit_reminder(self, chat_id, habit, context=None):
+        """Сообщение-напоминание о привычке"""
         time_str = habit.time.strftime("%H:%M") if habit.time else "??:??"
 
         message = (
@@ -80,17 +86,20 @@ class TelegramBotService:
             ]
         }
 
-        return self.send_message(chat_id=chat_id, text=message, reply_markup=keyboard)
+        return OutgoingMessage(
+            chat_id=chat_id, text=message, reply_markup=keyboard, context=context
+        )
 
-    def send_daily_summary(self, chat_id: int, user) -> Dict[str, Any]:
-        """Отправка ежедневного отчета"""
+    def send_habit_reminder(self, chat_id, habit):
+        """Отправка напоминания о привычке"""
+        return self._send_built(self.build_habit_reminder(chat_id, habit))
+
+    def build_daily_summary(self, chat_id: int, user, context=None) -> OutgoingMessage:
+        """Сообщение с ежедневным отчетом"""
 
-        from habits.models import HabitCompletion
+        from habits.services import completions_on
 
-        today = timezone.now().date()
-        completions_today = HabitCompletion.objects.filter(
-            habit__user=user, completed_at__date=today
-        ).count()
+        completions_today = completions_on(user, timezone.localdate())
 
         total_habits = user.habits.count()
         completion_rate = (
@@ -99,7 +108,7 @@ class TelegramBotService:
 
         # Находим ближайшие привычки
         now = timezone.now()
-        next_habits = user.hits.filter(time__gt=now.time()).order_by("time")[:3]
+        next_habits = user.habits.filter(time__gt=now.time()).order_by("time")[:3]
 
         next_habits_text = (
             "\n".join(
@@ -119,22 +128,25 @@ class TelegramBotService:
             f"💪 Продолжайте в том же духе!"
         )
 
-        return self.send_message(chat_id=chat_id, text=message)
+        return OutgoingMessage(chat_id=chat_id, text=message, context=context)
 
-    def send_weekly_report(self, chat_id: int, user) -> Dict[str, Any]:
-        """Отправка еженедельного отчета"""
+    def send_daily_summary(self, chat_id: int, user) -> Optional[bool]:
+        """Отправка ежедневного отчета"""
+        return self._send_built(self.build_daily_summary(chat_id, user))
+
+    def build_weekly_report(self, chat_id: int, user, context=None) -> OutgoingMessage:
+        """Сообщение с еженедельным отчетом"""
         from datetime import timedelta
 
-        from django.db.models import Count
+        from django.db.models import Sum
+        from django.db.models.functions import Coalesce
 
-        from habits.models import HabitCompletion
+        from habits.services import completions_since
 
-        week_ago = timezone.now() - timedelta(days=7)
+        week_ago = timezone.localdate() - timedelta(days=7)
 
         # Статистика за неделю
-        weekly_completions = HabitCompletion.objects.filter(
-            habit__user=user, completed_at__gte=week_ago
-        ).count()
+        weekly_completions = completions_since(user, week_ago)
 
         # Процент выполнения
         habits = user.habits.all()
@@ -145,7 +157,7 @@ class TelegramBotService:
 
         # Самая успешная привычка
         successful_habit = (
-            habits.annotate(completion_count=Count("completions"))
+            habits.annotate(completion_count=Coalesce(Sum("daily_stats__count"), 0))
             .order_by("-completion_count")
             .first()
         )
@@ -164,37 +176,18 @@ class TelegramBotService:
             f"💪 Отличная работа! Продолжайте формировать полезные привычки!"
         )
 
-        return self.send_message(chat_id=chat_id, text=message)
-
-    def _calculate_streak(self, user):
-        """Рассчет текущей серии последовательных дней"""
-        from datetime import timedelta
-
-        from habits.models import HabitCompletion
+        return OutgoingMessage(chat_id=chat_id, text=message, context=context)
 
-        # Получаем все уникальные даты выполнения за последние 30 дней
-        month_ago = timezone.now() - timedelta(days=30)
-
-        completion_dates = (
-            HabitCompletion.objects.filter(
-                habit__user=user, completed_at__gte=month_ago
-            )
-            .dates("completed_at", "day")
-            .order_by("-completed_at")
-        )
-
-        if not completion_dates:
-            return 0
+    def send_weekly_report(self, chat_id: int, user) -> Optional[bool]:
+        """Отправка еженедельного отчета"""
+        return self._send_built(self.build_weekly_report(chat_id, user))
 
-        # Находим самую длинную последовательность
-        streak = 1
-        current_date = completion_dates[0]
+    def _send_built(self, message: OutgoingMessage) -> Optional[bool]:
+        result = self.deliver(message)
+        return result.ok if result else None
 
-        for next_date in completion_dates[1:]:
-            if (current_date - next_date).days == 1:
-                streak += 1
-                current_date = next_date
-            else:
-                break
+    def _calculate_streak(self, user):
+        """Рассчет текущей серии последовательных дней"""
+        from habits.services import calculate_user_streak
 
-        return streak
+        return calculate_user_streak(user)
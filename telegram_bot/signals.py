@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .identity import schedule_chat_invalidation
+from .models import NotificationSettings, TelegramUser
+
+
+@receiver(post_init, sender=TelegramUser)
+def remember_chat(sender, instance, **kwargs):
+    """Исходный chat_id: при переносе привязки сбрасывается и старый чат"""
+    # __dict__, чтобы не загружать отложенное поле
+    instance._loaded_chat_id = instance.__dict__.get("telegram_id")
+
+
+@receiver(post_save, sender=TelegramUser)
+def telegram_user_saved(sender, instance, **kwargs):
+    """Подключение или изменение привязки сбрасывает кэш чата"""
+    schedule_chat_invalidation(instance.telegram_id)
+    previous = getattr(instance, "_loaded_chat_id", None)
+    if previous is not None and previous != instance.telegram_id:
+        schedule_chat_invalidation(previous)
+    instance._loaded_chat_id = instance.telegram_id
+
+
+@receiver(post_delete, sender=TelegramUser)
+def telegram_user_deleted(sender, instance, **kwargs):
+    """Отключение аккаунта сбрасывает кэш чата"""
+    schedule_chat_invalidation(instance.telegram_id)
+
+
+@receiver([post_save, post_delete], sender=NotificationSettings)
+def notification_settings_changed(sender, instance, **kwargs):
+    """Изменение настроек уведомлений сбрасывает кэш чата"""
+    if NotificationSettings.telegram_user.field.is_cached(instance):
+        chat_id = instance.telegram_user.telegram_id
+    else:
+        chat_id = (
+            TelegramUser.objects.filter(pk=instance.telegram_user_id)
+            .values_list("telegram_id", flat=True)
+            .first()
+        )
+    if chat_id is not None:
+        schedule_chat_invalidation(chat_id)
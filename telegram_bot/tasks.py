@@ -1,11 +1,14 @@
 import logging
 
+from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 
 from habits.models import Habit
 
 from .models import TelegramUser
 from .services import TelegramBotService
+from .updates import dispatch_update, update_chat_id
 
 logger = logging.getLogger(__name__)
 
@@ -68,3 +71,32 @@ def send_scheduled_reminders():
 
     logger.info(f"Отправлено {reminders_sent} напоминаний")
     return reminders_sent
+
+
+def update_queue(chat_id):
+    """Очередь-шард для обновлений чата.
+
+    Все обновления одного чата попадают в одну очередь; каждую очередь
+    обслуживает воркер с ``--concurrency=1``, поэтому порядок внутри чата
+    сохраняется, а разные чаты обрабатываются параллельно.
+    """
+    prefix = getattr(settings, "TELEGRAM_UPDATE_QUEUE", "telegram-updates")
+    shards = getattr(settings, "TELEGRAM_UPDATE_SHARDS", 1)
+    return f"{prefix}.{abs(chat_id or 0) % shards}"
+
+
+def enqueue_update(update):
+    """Поставить сырое обновление Telegram в очередь его чата"""
+    process_update.apply_async(
+        args=[update], queue=update_queue(update_chat_id(update))
+    )
+
+
+@shared_task
+def process_update(update):
+    """Обработка обновления Telegram, полученного вебхуком"""
+    try:
+        dispatch_update(update)
+    except Exception as e:
+        # Повтор привел бы к повторным ответам пользователю
+        logger.error(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from telegram_bot.handlers import connect_command, handle_connection_code
+from telegram_bot.models import TelegramConnectionCode, TelegramUser
+
+User = get_user_model()
+
+# Пользователей в нагрузочном тесте на каждый сценарий
+LOAD_USERS = 100
+
+# Допустимая задержка цикла событий (сек)
+MAX_LOOP_LAG = 0.2
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        # Имитация сетевого вызова Telegram API
+        await asyncio.sleep(0.01)
+        self.replies.append(text)
+
+
+def make_update(telegram_id, username="tg"):
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(
+            id=telegram_id, username=username, first_name="Имя", last_name=None
+        ),
+        message=FakeMessage(),
+    )
+
+
+def sequential_codes():
+    counter = itertools.count(100000)
+    return lambda length, allowed_chars: str(next(counter))
+
+
+async def measure_lag(done, interval=0.005):
+    """Максимальная задержка пробуждения корутины, пока идет нагрузка"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not done.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+class AsyncHandlersTestCase(TestCase):
+    """Обработчики бота обращаются к базе через асинхронный ORM"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="async", email="a@example.com")
+
+    async def test_connect_linked_account(self):
+        await TelegramUser.objects.acreate(django_user=self.user, telegram_id=500)
+        update = make_update(500)
+
+        await connect_command(update, SimpleNamespace(args=[]))
+
+        self.assertIn("async", update.message.replies[0])
+
+    async def test_connect_by_email_creates_code(self):
+        update = make_update(501)
+
+        await connect_command(update, SimpleNamespace(args=["a@example.com"]))
+
+        code = await TelegramConnectionCode.objects.aget(django_user=self.user)
+        self.assertIn(code.code, update.message.replies[0])
+
+    async def test_connection_code_links_account(self):
+        code = await TelegramConnectionCode.objects.acreate(django_user=self.user)
+        update = make_update(502, username="linked")
+
+        await handle_connection_code(update, code.code)
+
+        telegram_user = await TelegramUser.objects.aget(telegram_id=502)
+        await code.arefresh_from_db()
+        self.assertEqual(telegram_user.django_user_id, self.user.pk)
+        self.assertEqual((code.is_used, code.telegram_id), (True, 502))
+
+
+class AsyncHandlersLoadTestCase(TestCase):
+    """Сотни одновременных пользователей не останавливают цикл событий"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(username=f"load{index}", email=f"load{index}@example.com")
+            for index in range(LOAD_USERS * 2)
+        )
+        TelegramUser.objects.bulk_create(
+            TelegramUser(django_user=user, telegram_id=10_000 + index)
+            for index, user in enumerate(users[:LOAD_USERS])
+        )
+
+    @patch("telegram_bot.models.get_random_string", new_callable=sequential_codes)
+    async def test_concurrent_users(self, _):
+        # Привязанные пользователи, запросы кода и неверные коды
+        linked = [
+            (connect_command, make_update(10_000 + index), SimpleNamespace(args=[]))
+            for index in range(LOAD_USERS)
+        ]
+        new = [
+            (
+                connect_command,
+                make_update(20_000 + index),
+                SimpleNamespace(args=[f"load{LOAD_USERS + index}"]),
+            )
+            for index in range(LOAD_USERS)
+        ]
+        invalid = [
+            (handle_connection_code, make_update(30_000 + index), "000000")
+            for index in range(LOAD_USERS)
+        ]
+        calls = linked + new + invalid
+
+        done = asyncio.Event()
+        lag = asyncio.create_task(measure_lag(done))
+        await asyncio.gather(*(handler(update, arg) for handler, update, arg in calls))
+        done.set()
+
+        self.assertTrue(all(len(update.message.replies) == 1 for _, update, _ in calls))
+        self.assertEqual(await TelegramConnectionCode.objects.acount(), LOAD_USERS)
+        self.assertLess(await lag, MAX_LOOP_LAG)
@@ -0,0 +1,165 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from telegram_bot.delivery import OutgoingMessage, TelegramDeliveryEngine, TokenBucket
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Имитация sendMessage: сценарий ответов задается по chat_id"""
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        payload = json.loads(self.rfile.read(length))
+        server = self.server
+
+        with server.lock:
+            server.requests.append(payload)
+            script = server.scripts.get(payload["chat_id"], [])
+            status, body = script.pop(0) if script else (200, {"ok": True})
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeTelegramServerMixin:
+    """Локальный HTTP-сервер вместо api.telegram.org"""
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTelegramHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.scripts = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/bottest"
+        self.sleeps = []
+        self.clock = [0.0]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.clock[0] += seconds
+
+    def make_engine(self, **kwargs):
+        options = {
+            "max_workers": 4,
+            "global_rate": 1000,
+            "per_chat_rate": 1000,
+            "max_retries": 2,
+            "timeout": 5,
+            "clock": lambda: self.clock[0],
+            "sleep": self.sleep,
+        }
+        options.update(kwargs)
+        return TelegramDeliveryEngine(self.base_url, **options)
+
+
+class TelegramDeliveryEngineTestCase(FakeTelegramServerMixin, SimpleTestCase):
+    """Доставка через пул соединений против фейкового сервера Telegram"""
+
+    def test_send_many_reports_results_in_order(self):
+        """Результаты возвращаются в порядке сообщений"""
+        engine = self.make_engine()
+        messages = [OutgoingMessage(chat_id=i, text=f"msg {i}") for i in range(20)]
+
+        results = engine.send_many(messages)
+
+        self.assertEqual([r.message.chat_id for r in results], list(range(20)))
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(self.server.requests), 20)
+
+    def test_retry_after_is_respected(self):
+        """429 повторяется с паузой из parameters.retry_after"""
+        self.server.scripts[1] = [
+            (429, {"ok": False, "parameters": {"retry_after": 3}}),
+        ]
+        engine = self.make_engine()
+
+        result = engine.send(OutgoingMessage(chat_id=1, text="hi"))
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(self.sleeps, [3.0])
+
+    def test_retry_after_pauses_all_chats(self):
+        """После 429 глобальный лимит ждет и для других чатов"""
+        self.server.scripts[1] = [
+            (429, {"ok": False, "parameters": {"retry_after": 5}}),
+        ]
+        engine = self.make_engine(max_retries=0)
+
+        self.assertFalse(engine.send(OutgoingMessage(chat_id=1, text="hi")).ok)
+        self.assertTrue(engine.send(OutgoingMessage(chat_id=2, text="hi")).ok)
+
+        self.assertEqual(self.sleeps, [5.0])
+
+    def test_chat_buckets_are_bounded(self):
+        """Per-chat bucket'ы вытесняются по LRU"""
+        engine = self.make_engine(max_chat_buckets=2)
+
+        first = engine._chat_bucket(1)
+        engine._chat_bucket(2)
+        self.assertIs(engine._chat_bucket(1), first)
+        engine._chat_bucket(3)
+
+        self.assertEqual(list(engine._chat_buckets), [1, 3])
+
+    def test_server_errors_are_retried_until_limit(self):
+        """5xx повторяются, после исчерпания попыток сообщение не доставлено"""
+        self.server.scripts[2] = [(502, {"ok": False})] * 3
+        engine = self.make_engine()
+
+        result = engine.send(OutgoingMessage(chat_id=2, text="hi"))
+
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(result.status_code, 502)
+
+    def test_client_errors_are_not_retried(self):
+        """400 (например, бот заблокирован) не повторяется"""
+        self.server.scripts[3] = [
+            (400, {"ok": False, "description": "Bad Request: chat not found"}),
+        ]
+        engine = self.make_engine()
+
+        result = engine.send(OutgoingMessage(chat_id=3, text="hi"))
+
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 1)
+        self.assertIn("chat not found", result.error)
+        self.assertEqual(self.sleeps, [])
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    """Token bucket на искусственных часах"""
+
+    def test_waits_when_bucket_is_empty(self):
+        clock = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: clock[0], sleep=sleep)
+
+        for _ in range(4):
+            bucket.acquire()
+
+        # Два токена из начального запаса, затем по 0.5 с на каждый
+        self.assertEqual(sleeps, [0.5, 0.5])
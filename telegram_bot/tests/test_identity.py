@@ -0,0 +1,86 @@
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from telegram_bot.identity import notification_settings, resolve_chat
+from telegram_bot.management.commands.run_bot import _handle_settings_command
+from telegram_bot.models import NotificationSettings, TelegramUser
+from telegram_bot.updates import handle_status
+
+User = get_user_model()
+
+
+class ChatIdentityTestCase(TestCase):
+    """Кэш chat_id → пользователь для команд бота"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="chat", email="chat@example.com")
+
+    def setUp(self):
+        cache.clear()
+        self.telegram_user = TelegramUser.objects.create(
+            django_user=self.user, telegram_id=700
+        )
+        self.settings = NotificationSettings.objects.create(
+            telegram_user=self.telegram_user
+        )
+
+    def test_resolved_once_then_cached(self):
+        with self.assertNumQueries(1):
+            resolve_chat(700)
+
+        with self.assertNumQueries(0):
+            telegram_user = resolve_chat(700)
+            self.assertEqual(telegram_user.django_user_id, self.user.pk)
+            self.assertEqual(telegram_user.user.username, "chat")
+            self.assertTrue(notification_settings(telegram_user).enable_habit_reminders)
+
+    def test_unknown_chat_cached(self):
+        self.assertIsNone(resolve_chat(701))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_chat(701))
+
+    def test_settings_change_invalidates(self):
+        resolve_chat(700)
+
+        self.settings.enable_habit_reminders = False
+        self.settings.save()
+
+        telegram_user = resolve_chat(700)
+        self.assertFalse(notification_settings(telegram_user).enable_habit_reminders)
+
+    def test_disconnect_and_move_invalidate(self):
+        resolve_chat(700)
+        telegram_user = TelegramUser.objects.get(telegram_id=700)
+        telegram_user.telegram_id = 702
+        telegram_user.save()
+
+        self.assertIsNone(resolve_chat(700))
+        self.assertEqual(resolve_chat(702).pk, telegram_user.pk)
+
+        telegram_user.delete()
+        self.assertIsNone(resolve_chat(702))
+
+    def test_status_command_without_identity_queries(self):
+        resolve_chat(700)
+        bot_service = Mock()
+
+        # Остается только подсчет привычек
+        with self.assertNumQueries(1):
+            handle_status(700, bot_service)
+
+        self.assertIn("chat", bot_service.send_message.call_args.kwargs["text"])
+
+    def test_settings_command_without_settings_row(self):
+        """Без строки настроек /settings показывает, что уведомления выключены"""
+        self.settings.delete()
+        bot_service = Mock()
+
+        _handle_settings_command(700, bot_service)
+
+        text = bot_service.send_message.call_args.args[1]
+        self.assertNotIn("✅", text)
+        self.assertIn("Напоминания о привычках: ❌ Выключены", text)
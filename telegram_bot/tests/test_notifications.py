@@ -0,0 +1,60 @@
+from datetime import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from habits.models import Habit
+from telegram_bot.models import SentNotification, TelegramUser
+from telegram_bot.notifications import NotificationLog
+
+User = get_user_model()
+
+
+class NotificationLogTestCase(TestCase):
+    """Пакетная запись истории уведомлений с ключом идемпотентности"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="notify", password="pass123")
+        self.telegram_user = TelegramUser.objects.create(
+            django_user=self.user, telegram_id=2002
+        )
+        self.habits = [
+            Habit.objects.create(
+                user=self.user,
+                place="Дом",
+                time=time(9, i),
+                action=f"Привычка {i}",
+                duration=60,
+            )
+            for i in range(3)
+        ]
+
+    def test_flush_is_single_insert(self):
+        """Накопленные записи сбрасываются одним запросом"""
+        log = NotificationLog()
+        for habit in self.habits:
+            log.add(self.telegram_user, "habit_reminder", "text", habit=habit)
+
+        with self.assertNumQueries(1):
+            log.flush()
+
+        self.assertEqual(SentNotification.objects.count(), 3)
+
+    def test_duplicates_are_ignored_by_database(self):
+        """Повтор ключа за тот же день отбрасывается без ошибки"""
+        for _ in range(2):
+            log = NotificationLog()
+            log.add(self.telegram_user, "habit_reminder", "text", habit=self.habits[0])
+            log.add(self.telegram_user, "daily_summary", "Ежедневный отчет")
+            log.flush()
+
+        self.assertEqual(SentNotification.objects.count(), 2)
+
+    def test_auto_flush_on_batch_size(self):
+        """При заполнении пачки запись происходит автоматически"""
+        log = NotificationLog(batch_size=2)
+        for habit in self.habits:
+            log.add(self.telegram_user, "habit_reminder", "text", habit=habit)
+
+        self.assertEqual(SentNotification.objects.count(), 2)
+        self.assertEqual(len(log.pending), 1)
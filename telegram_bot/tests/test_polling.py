@@ -0,0 +1,113 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from telegram_bot.polling import ChatShardedDispatcher, UpdatePoller
+
+
+def update(update_id, chat_id):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}}}
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.result = result
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"ok": True, "result": self.result}
+
+
+class FakeSession:
+    """getUpdates, отдающий неподтвержденные обновления начиная с offset"""
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.offsets = []
+        self.closed = False
+
+    def get(self, url, params, timeout):
+        self.offsets.append(params["offset"])
+        return FakeResponse(
+            [item for item in self.updates if item["update_id"] >= params["offset"]]
+        )
+
+    def close(self):
+        self.closed = True
+
+
+class ChatShardedDispatcherTestCase(SimpleTestCase):
+    """Воркеры по chat_id: порядок в чате, параллелизм между чатами"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.processed = []
+        self.lock = threading.Lock()
+
+    def handler(self, item):
+        chat_id = item["message"]["chat"]["id"]
+        if chat_id == 1:
+            # Медленный обработчик первого чата
+            self.release.wait(5)
+        with self.lock:
+            self.processed.append((chat_id, item["update_id"]))
+
+    def test_slow_chat_does_not_block_others(self):
+        dispatcher = ChatShardedDispatcher(self.handler, workers=2)
+        for item in (update(10, 1), update(11, 2), update(12, 1), update(13, 2)):
+            dispatcher.submit(item)
+
+        while dispatcher.pending > 2:
+            dispatcher.wait_for_progress(1)
+        # Второй чат обработан, первый ждет — offset не проходит дальше 10
+        self.assertEqual(self.processed, [(2, 11), (2, 13)])
+        self.assertEqual(dispatcher.offset, 10)
+
+        self.release.set()
+        dispatcher.shutdown()
+
+        # Порядок внутри чата сохраняется
+        self.assertEqual([uid for chat, uid in self.processed if chat == 1], [10, 12])
+        self.assertEqual(dispatcher.offset, 14)
+
+    def test_duplicate_updates_are_skipped(self):
+        dispatcher = ChatShardedDispatcher(self.handler, workers=2)
+        self.release.set()
+
+        self.assertTrue(dispatcher.submit(update(5, 2)))
+        self.assertFalse(dispatcher.submit(update(5, 2)))
+        dispatcher.shutdown()
+
+        self.assertEqual(self.processed, [(2, 5)])
+
+
+class UpdatePollerTestCase(SimpleTestCase):
+    """Цикл опроса подтверждает offset только после обработки"""
+
+    def test_poll_and_close_commit_processed_offset(self):
+        processed = []
+        dispatcher = ChatShardedDispatcher(processed.append, workers=2)
+        session = FakeSession([update(1, 1), update(2, 2)])
+        poller = UpdatePoller("http://telegram.test/botTOKEN", dispatcher, session)
+
+        self.assertEqual(poller.poll_once(), 2)
+        dispatcher.shutdown()
+        poller.close()
+
+        self.assertEqual(len(processed), 2)
+        # Первый запрос без offset, финальный подтверждает оба обновления
+        self.assertEqual(session.offsets, [0, 3])
+        self.assertTrue(session.closed)
+
+    def test_run_stops_on_event(self):
+        dispatcher = ChatShardedDispatcher(lambda item: None, workers=1)
+        stop = threading.Event()
+        session = FakeSession([])
+        session.get = lambda *args, **kwargs: stop.set() or FakeResponse([])
+
+        UpdatePoller("http://telegram.test/botTOKEN", dispatcher, session).run(stop)
+        dispatcher.shutdown()
+
+        self.assertTrue(stop.is_set())
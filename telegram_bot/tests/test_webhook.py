@@ -0,0 +1,144 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from telegram_bot.models import TelegramUser
+from telegram_bot.tasks import process_update, update_queue
+
+
+def message_update(chat_id, text, update_id=1):
+    return {
+        "update_id": update_id,
+        "message": {"chat": {"id": chat_id}, "text": text},
+    }
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET="s3cret", TELEGRAM_UPDATE_SHARDS=4)
+class TelegramWebhookTestCase(TestCase):
+    """Вебхук проверяет секрет и только ставит обновление в очередь"""
+
+    url = "/telegram/webhook/telegram/"
+
+    def post(self, payload, secret="s3cret"):
+        headers = {"HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN": secret} if secret else {}
+        return self.client.post(
+            self.url,
+            data=payload if isinstance(payload, str) else json.dumps(payload),
+            content_type="application/json",
+            **headers,
+        )
+
+    @patch("telegram_bot.tasks.process_update.apply_async")
+    def test_enqueues_update_by_chat_shard(self, apply_async):
+        """Обновление уходит в очередь шарда своего чата"""
+        update = message_update(42, "/help")
+
+        response = self.post(update)
+
+        self.assertEqual(response.status_code, 200)
+        apply_async.assert_called_once_with(args=[update], queue="telegram-updates.2")
+
+    @patch("telegram_bot.tasks.process_update.apply_async")
+    def test_rejects_wrong_secret(self, apply_async):
+        """Без верного секретного токена обновление отклоняется"""
+        self.assertEqual(
+            self.post(message_update(42, "/help"), "wrong").status_code, 403
+        )
+        self.assertEqual(self.post(message_update(42, "/help"), None).status_code, 403)
+        apply_async.assert_not_called()
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET="")
+    @patch("telegram_bot.tasks.process_update.apply_async")
+    def test_rejects_without_configured_secret(self, apply_async):
+        """Без настроенного секрета вебхук закрыт"""
+        with self.assertLogs("telegram_bot.views", level="ERROR"):
+            response = self.post(message_update(42, "/help"), None)
+
+        self.assertEqual(response.status_code, 403)
+        apply_async.assert_not_called()
+
+    @override_settings(TELEGRAM_BOT_TOKEN="token", TELEGRAM_WEBHOOK_SECRET="")
+    @patch("telegram_bot.management.commands.setup_bot.requests.post")
+    def test_setup_bot_requires_secret(self, post):
+        out = StringIO()
+        call_command("setup_bot", domain="https://example.com", stdout=out)
+
+        post.assert_not_called()
+        self.assertIn("TELEGRAM_WEBHOOK_SECRET", out.getvalue())
+
+    @override_settings(
+        TELEGRAM_BOT_TOKEN="token", TELEGRAM_API_URL="http://telegram.local"
+    )
+    @patch("telegram_bot.management.commands.setup_bot.requests.get")
+    @patch("telegram_bot.management.commands.setup_bot.requests.post")
+    def test_setup_bot_registers_configured_secret(self, post, get):
+        post.return_value.status_code = 200
+        post.return_value.json.return_value = {"ok": True}
+
+        call_command("setup_bot", domain="https://example.com", stdout=StringIO())
+
+        url = post.call_args.args[0]
+        self.assertEqual(url, "http://telegram.local/bottoken/setWebhook")
+        self.assertEqual(post.call_args.kwargs["json"]["secret_token"], "s3cret")
+
+    @patch("telegram_bot.tasks.process_update.apply_async")
+    def test_invalid_json(self, apply_async):
+        self.assertEqual(self.post("{not json").status_code, 400)
+        apply_async.assert_not_called()
+
+    @patch("telegram_bot.tasks.process_update.apply_async", side_effect=OSError)
+    def test_queue_unavailable(self, apply_async):
+        """Недоступная очередь — 500, чтобы Telegram повторил доставку"""
+        self.assertEqual(self.post(message_update(42, "/help")).status_code, 500)
+
+    def test_same_chat_same_queue(self):
+        """Обновления одного чата всегда попадают в одну очередь"""
+        self.assertEqual(update_queue(42), update_queue(42))
+        self.assertNotEqual(update_queue(42), update_queue(43))
+
+
+class ProcessUpdateTestCase(TestCase):
+    """Обработка обновления в воркере"""
+
+    @patch("telegram_bot.updates.TelegramBotService")
+    def test_dispatches_command(self, service):
+        process_update(message_update(42, "/help"))
+
+        send_message = service.return_value.send_message
+        send_message.assert_called_once()
+        self.assertEqual(send_message.call_args.kwargs["chat_id"], 42)
+        self.assertIn("Доступные команды", send_message.call_args.kwargs["text"])
+
+    @patch("telegram_bot.updates.TelegramBotService")
+    def test_dispatches_callback(self, service):
+        process_update(
+            {
+                "update_id": 2,
+                "callback_query": {
+                    "message": {"chat": {"id": 7}},
+                    "data": "postpone_1",
+                },
+            }
+        )
+
+        self.assertEqual(
+            service.return_value.send_message.call_args.kwargs["chat_id"], 7
+        )
+
+    @patch("telegram_bot.updates.TelegramBotService")
+    def test_connect_binds_chat(self, service):
+        user = get_user_model().objects.create_user(username="botuser")
+
+        process_update(message_update(42, "/connect botuser"))
+        process_update(message_update(43, "/connect botuser", update_id=2))
+
+        telegram_user = TelegramUser.objects.get(django_user=user)
+        self.assertEqual(telegram_user.telegram_id, 43)
+        self.assertIn(
+            "Подключение обновлено",
+            service.return_value.send_message.call_args.kwargs["text"],
+        )
@@ -0,0 +1,238 @@
+"""Обработка обновлений Telegram (вне HTTP-запроса вебхука).
+
+Вебхук только ставит обновление в очередь (telegram_bot.tasks), а
+обработчики ниже выполняются в Celery-воркере.
+"""
+
+import logging
+
+from django.contrib.auth import get_user_model
+
+from .identity import resolve_chat
+from .models import TelegramUser
+from .services import TelegramBotService
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def update_chat_id(update):
+    """ID чата, к которому относится обновление (None для прочих типов)"""
+    if "message" in update:
+        return update["message"]["chat"]["id"]
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    return None
+
+
+def dispatch_update(update):
+    """Выполнить обработчик, соответствующий обновлению"""
+    # Обрабатываем сообщение
+    if "message" in update:
+        message = update["message"]
+        chat_id = message["chat"]["id"]
+        text = message.get("text", "").strip()
+
+        # Обработка команд
+        if text.startswith("/"):
+            handle_command(chat_id, text)
+        else:
+            # Обработка обычных сообщений
+            handle_message(chat_id, text)
+
+    # Обработка callback query (нажатия на кнопки)
+    elif "callback_query" in update:
+        callback_query = update["callback_query"]
+        chat_id = callback_query["message"]["chat"]["id"]
+
+        handle_callback_query(chat_id, callback_query["data"])
+
+
+def handle_command(chat_id, text):
+    """Обработка команд"""
+    bot_service = TelegramBotService()
+
+    if text == "/start":
+        message = (
+            "👋 Привет! Я бот для трекинга привычек HabitFlow.\n\n"
+            "📋 Для подключения к вашему аккаунту:\n"
+            "1. Откройте приложение HabitFlow\n"
+            "2. Перейдите в настройки профиля\n"
+            "3. Скопируйте код подключения\n"
+            "4. Отправьте его мне в формате:\n"
+            "   <code>/connect ВАШ_КОД</code>\n\n"
+            "ℹ️ Команды:\n"
+            "/start - Начать работу\n"
+            "/help - Помощь\n"
+            "/connect - Подключить аккаунт\n"
+            "/disconnect - Отключить аккаунт\n"
+            "/status - Статус подключения"
+        )
+
+        bot_service.send_message(chat_id=chat_id, text=message)
+
+    elif text.startswith("/connect"):
+        # Извлекаем код подключения
+        parts = text.split()
+        if len(parts) != 2:
+            bot_service.send_message(
+                chat_id=chat_id,
+                text="❌ Неверный формат команды. Используйте: /connect КОД_ПОДКЛЮЧЕНИЯ",
+            )
+            return
+
+        connection_code = parts[1]
+        handle_connection(chat_id, connection_code, bot_service)
+
+    elif text == "/disconnect":
+        handle_disconnect(chat_id, bot_service)
+
+    elif text == "/status":
+        handle_status(chat_id, bot_service)
+
+    elif text == "/help":
+        message = (
+            "ℹ️ <b>Доступные команды:</b>\n\n"
+            "/start - Начало работы\n"
+            "/connect КОД - Подключить аккаунт\n"
+            "/disconnect - Отключить аккаунт\n"
+            "/status - Статус подключения\n"
+            "/help - Эта справка\n\n"
+            "🔔 После подключения вы будете получать:\n"
+            "• Напоминания о привычках\n"
+            "• Ежедневные отчеты\n"
+            "• Уведомления о прогрессе"
+        )
+
+        bot_service.send_message(chat_id=chat_id, text=message)
+
+    else:
+        bot_service.send_message(
+            chat_id=chat_id,
+            text="❌ Неизвестная команда. Используйте /help для списка команд",
+        )
+
+
+def handle_connection(chat_id, connection_code, bot_service):
+    """Обработка подключения пользователя"""
+    try:
+        # Здесь должна быть логика проверки кода подключения
+        # Для начала используем простой вариант - ищем пользователя по username
+        user = User.objects.filter(username=connection_code).first()
+
+        if not user:
+            bot_service.send_message(
+                chat_id=chat_id,
+                text="❌ Код подключения не найден. Убедитесь что код правильный.",
+            )
+            return
+
+        # Создаем или обновляем запись TelegramUser
+        telegram_user, created = TelegramUser.objects.update_or_create(
+            django_user=user, defaults={"telegram_id": chat_id}
+        )
+
+        if created:
+            message = (
+                f"✅ Аккаунт успешно подключен!\n\n"
+                f"👤 Пользователь: {user.username}\n"
+                f"📧 Email: {user.email}\n\n"
+                f"🔔 Теперь вы будете получать:\n"
+                f"• Напоминания о привычках\n"
+                f"• Ежедневные отчеты в 21:00\n"
+                f"• Уведомления о прогрессе\n\n"
+                f"Используйте /status для проверки подключения."
+            )
+        else:
+            message = (
+                "✅ Подключение обновлено!\n\n"
+                "Теперь вы будете получать уведомления в этот чат."
+            )
+
+        bot_service.send_message(chat_id=chat_id, text=message)
+
+    except Exception as e:
+        logger.error(f"Ошибка подключения: {e}")
+        bot_service.send_message(
+            chat_id=chat_id, text="❌ Ошибка подключения. Попробуйте позже."
+        )
+
+
+def handle_disconnect(chat_id, bot_service):
+    """Отключение аккаунта"""
+    try:
+        telegram_user = TelegramUser.objects.filter(telegram_id=chat_id).first()
+
+        if telegram_user:
+            telegram_user.delete()
+            message = "✅ Аккаунт отключен. Вы больше не будете получать уведомления."
+        else:
+            message = "ℹ️ Аккаунт не был подключен."
+
+        bot_service.send_message(chat_id=chat_id, text=message)
+
+    except Exception as e:
+        logger.error(f"Ошибка отключения: {e}")
+        bot_service.send_message(
+            chat_id=chat_id, text="❌ Ошибка отключения. Попробуйте позже."
+        )
+
+
+def handle_status(chat_id, bot_service):
+    """Проверка статуса подключения"""
+    try:
+        telegram_user = resolve_chat(chat_id)
+
+        if telegram_user:
+            user = telegram_user.user
+            message = (
+                f"✅ <b>Аккаунт подключен</b>\n\n"
+                f"👤 Пользователь: {user.username}\n"
+                f"📧 Email: {user.email}\n"
+                f"📅 Привычек: {user.habits.count()}\n"
+                f"🔗 Подключено: {telegram_user.created_at.strftime('%d.%m.%Y %H:%M')}"
+            )
+        else:
+            message = (
+                "❌ <b>Аккаунт не подключен</b>\n\n"
+                "Для подключения:\n"
+                "1. Откройте приложение HabitFlow\n"
+                "2. Скопируйте код подключения из настроек\n"
+                "3. Отправьте: /connect ВАШ_КОД"
+            )
+
+        bot_service.send_message(chat_id=chat_id, text=message)
+
+    except Exception as e:
+        logger.error(f"Ошибка проверки статуса: {e}")
+
+
+def handle_message(chat_id, text):
+    """Обработка обычных сообщений"""
+    bot_service = TelegramBotService()
+
+    # Простой эхо - для тестирования
+    bot_service.send_message(
+        chat_id=chat_id,
+        text=f"Вы сказали: {text}\n\nИспользуйте /help для списка команд",
+    )
+
+
+def handle_callback_query(chat_id, callback_data):
+    """Обработка нажатий на inline кнопки"""
+    bot_service = TelegramBotService()
+
+    if callback_data.startswith("complete_"):
+        # Обработка отметки выполнения привычки
+        habit_id = callback_data.replace("complete_", "")
+        bot_service.send_message(
+            chat_id=chat_id,
+            text=f"✅ Привычка {habit_id} отмечена как выполненная!\n\nОбновите приложение для синхронизации.",
+        )
+
+    elif callback_data.startswith("postpone_"):
+        # Отложить напоминание
+        habit_id = callback_data.replace("postpone_", "")
+        bot_service.send_message(
+            chat_id=chat_id, text="⏰ Напоминание отложено на 15 минут."
+        )
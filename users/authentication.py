@@ -0,0 +1,123 @@
+"""JWT-аутентификация без запросов к базе в установившемся режиме.
+
+Строка пользователя кэшируется на USER_AUTH_CACHE_TIMEOUT секунд и
+сбрасывается сигналами при изменении пользователя. Отозванные при выходе
+access-токены хранятся в кэше по ``jti`` до истечения их срока. Кэш
+пользователя и отметка об отзыве читаются одним запросом ``get_many``.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from habits.cache import schedule_invalidation
+
+USER_AUTH_PREFIX = "users:auth"
+REVOKED_PREFIX = "users:revoked"
+DEFAULT_USER_AUTH_TIMEOUT = 60
+
+# Поля пользователя в кэше; остальные (в т.ч. password) отложены
+# и загружаются из базы только при обращении к ним
+CACHED_USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    # Читаются профилем (UserProfileSerializer)
+    "date_joined",
+    "last_login",
+)
+
+
+def user_auth_key(user_id):
+    return f"{USER_AUTH_PREFIX}:{user_id}"
+
+
+def revoked_key(jti):
+    return f"{REVOKED_PREFIX}:{jti}"
+
+
+def invalidate_user_auth(user_id):
+    cache.delete(user_auth_key(user_id))
+
+
+def schedule_user_auth_invalidation(user_id):
+    schedule_invalidation(invalidate_user_auth, user_id)
+
+
+def revoke_token(token):
+    """Отозвать access-токен до истечения его срока действия"""
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti is None:
+        return
+    timeout = int(token.get("exp", 0) - time.time())
+    if timeout > 0:
+        cache.set(revoked_key(jti), True, timeout=timeout)
+
+
+def cached_user(values):
+    """Пользователь из кэшированных полей (остальные поля отложены)"""
+    user_model = get_user_model()
+    # from_db ждет значения в порядке полей модели
+    field_names = [
+        field.attname
+        for field in user_model._meta.concrete_fields
+        if field.attname in values
+    ]
+    return user_model.from_db(
+        DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names]
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication с кэшем пользователя и списком отозванных токенов"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_key = user_auth_key(user_id)
+        keys = [user_key]
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None:
+            keys.append(revoked_key(jti))
+        found = cache.get_many(keys)
+
+        if jti is not None and found.get(revoked_key(jti)):
+            raise AuthenticationFailed(_("Token is blacklisted"), code="token_revoked")
+
+        # Проверка смены пароля требует хеш пароля — кэш не используется
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        values = found.get(user_key)
+        if values is None:
+            values = (
+                self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values(*CACHED_USER_FIELDS)
+                .first()
+            )
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            timeout = getattr(
+                settings, "USER_AUTH_CACHE_TIMEOUT", DEFAULT_USER_AUTH_TIMEOUT
+            )
+            cache.set(user_key, values, timeout=timeout)
+
+        if not values["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return cached_user(values)
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import schedule_user_auth_invalidation
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_auth_changed(sender, instance, **kwargs):
+    """Изменение пользователя сбрасывает его кэш аутентификации"""
+    schedule_user_auth_invalidation(instance.pk)
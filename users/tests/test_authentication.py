@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import CachedJWTAuthentication, user_auth_key
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    """Аутентификация по JWT без запросов к базе при теплом кэше"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="jwtuser", email="jwt@example.com", password="testpass123"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_warm_cache_skips_user_query(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        authentication = CachedJWTAuthentication()
+
+        with self.assertNumQueries(1):
+            user, _ = authentication.authenticate(request)
+        # Повторные запросы — только кэш
+        with self.assertNumQueries(0):
+            cached, _ = authentication.authenticate(request)
+
+        self.assertEqual(cached.pk, self.user.pk)
+        self.assertEqual(cached.username, "jwtuser")
+        self.assertTrue(cached.is_authenticated)
+
+    def test_warm_profile_has_no_user_queries(self):
+        """Профиль из теплого кэша не догружает отложенные поля пользователя"""
+        self.client.get("/api/users/profile/")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/users/profile/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [q["sql"] for q in queries.captured_queries if '"auth_user"' in q["sql"]],
+            [],
+        )
+
+    def test_cached_user_saves_only_loaded_fields(self):
+        self.client.get("/api/users/profile/")
+        response = self.client.patch(
+            "/api/users/profile/", {"first_name": "Новое"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Новое")
+        self.assertTrue(self.user.check_password("testpass123"))
+
+    def test_user_change_invalidates_cache(self):
+        self.client.get("/api/users/profile/")
+        self.assertIsNotNone(cache.get(user_auth_key(self.user.pk)))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(cache.get(user_auth_key(self.user.pk)))
+        response = self.client.get("/api/users/profile/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_access_token(self):
+        response = self.client.post("/api/users/logout/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get("/api/users/profile/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Новый токен того же пользователя продолжает работать
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        response = self.client.get("/api/users/profile/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -6,10 +6,13 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from .authentication import revoke_token
 from .serializers import UserProfileSerializer, UserRegisterSerializer
 
 User = get_user_model()
@@ -108,6 +111,27 @@ class LogoutView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    def post(self, request):
+        """Отзыв refresh-токена (в базе) и текущего access-токена (в кэше)"""
+        refresh = request.data.get("refresh")
+        if refresh:
+            try:
+                token = RefreshToken(refresh)
+                if token[api_settings.USER_ID_CLAIM] != request.user.pk:
+                    raise TokenError("Token belongs to another user")
+                token.blacklist()
+            except (TokenError, KeyError):
+                return Response(
+                    {"error": "Недействительный refresh-токен"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        # request.auth — провалидированный access-токен запроса
+        if isinstance(request.auth, Token):
+            revoke_token(request.auth)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])